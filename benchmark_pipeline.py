@@ -0,0 +1,284 @@
+"""
+端到端流水线基准测试
+
+在本地模拟API服务上运行 VisionProcessor + AIEnhancedOCR + MarkdownGenerator，
+统计吞吐量(页/分钟)、各阶段延迟分位数、峰值内存和每页API调用次数，结果写入JSON，
+便于在不同版本之间对比性能回归。
+
+使用方式:
+    python benchmark_pipeline.py --pages 200 --workers 4 --output bench_results.json
+    python benchmark_pipeline.py --compare bench_results_old.json
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from create_test_image import create_benchmark_corpus
+from src.utils.mock_server import MockAPIServer, MockServerSettings, LatencyModel
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+STAGES = ['vision', 'ai_enhance', 'document', 'total']
+
+
+def percentiles(values, points=(50, 90, 95, 99)) -> dict:
+    """计算延迟分位数 (最近秩法)"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {}
+    for p in points:
+        rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+        result[f"p{p}"] = round(ordered[rank], 4)
+    result['mean'] = round(sum(ordered) / len(ordered), 4)
+    result['max'] = round(ordered[-1], 4)
+    return result
+
+
+class RSSSampler:
+    """后台线程定期采样常驻内存，记录峰值"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _current_rss(self) -> int:
+        if psutil:
+            return psutil.Process().memory_info().rss
+        return 0
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self._current_rss())
+            self._stop.wait(self.interval)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._current_rss())
+
+    def peak_mb(self) -> float:
+        """峰值RSS (MB)；无psutil时使用进程生命周期内的ru_maxrss"""
+        peak = self.peak_bytes
+        if not peak and resource:
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak = maxrss if sys.platform == 'darwin' else maxrss * 1024
+        return round(peak / 1024 / 1024, 1)
+
+
+def run_page(page_path: Path, vision_processor, ai_ocr, doc_generator) -> dict:
+    """
+    处理单页并记录各阶段耗时
+
+    Returns:
+        页面耗时记录
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    vision_result = vision_processor.process_image(str(page_path), uploaded_file=None)
+    timings['vision'] = time.perf_counter() - start
+
+    if not vision_result['success']:
+        return {'page': page_path.name, 'success': False, 'error': vision_result.get('error'), 'timings': timings}
+
+    stage_start = time.perf_counter()
+    enhanced_result = ai_ocr.process_image_with_ai(vision_result, f"英语教材 - {page_path.name}")
+    timings['ai_enhance'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    doc_generator.generate_lesson_document(enhanced_result, filename=f"{page_path.stem}.md")
+    timings['document'] = time.perf_counter() - stage_start
+
+    timings['total'] = time.perf_counter() - start
+    return {'page': page_path.name, 'success': True, 'timings': timings}
+
+
+def run_benchmark(args) -> dict:
+    """运行基准测试并返回结果"""
+    corpus_dir = Path(args.corpus)
+    manifest_path = corpus_dir / "manifest.json"
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    else:
+        manifest = {}
+    if manifest.get('pages') != args.pages or manifest.get('seed') != args.seed:
+        manifest = create_benchmark_corpus(str(corpus_dir), args.pages, args.seed)
+    pages = [corpus_dir / entry['file'] for entry in manifest['entries']]
+
+    settings = MockServerSettings(
+        seed=args.seed,
+        chat_latency=LatencyModel.parse(args.chat_latency),
+        vision_latency=LatencyModel.parse(args.vision_latency),
+        github_latency=LatencyModel.parse(args.github_latency),
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+    )
+
+    # 流水线中的st.*调用在脚本模式下只会产生警告，这里屏蔽掉
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    with MockAPIServer(settings) as server, tempfile.TemporaryDirectory() as output_dir:
+        server.apply_to_config()
+
+        from src import __version__
+        from src.core.vision_processor import create_vision_processor
+        from src.core.ai_analyzer import create_ai_enhanced_ocr
+        from src.core.document_generator import create_document_generator
+
+        quiet = open(os.devnull, 'w') if not args.verbose else None
+        with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+            vision_processor = create_vision_processor()
+            ai_ocr = create_ai_enhanced_ocr()
+            doc_generator = create_document_generator(output_dir)
+            server.reset_stats()
+
+            with RSSSampler() as sampler:
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                    records = list(executor.map(
+                        lambda p: run_page(p, vision_processor, ai_ocr, doc_generator), pages
+                    ))
+                wall_seconds = time.perf_counter() - start
+        if quiet:
+            quiet.close()
+
+        api_stats = server.stats()
+
+    succeeded = [r for r in records if r['success']]
+    api_calls = sum(api_stats['requests'].values())
+
+    return {
+        'version': __version__,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'settings': {
+            'pages': args.pages,
+            'seed': args.seed,
+            'workers': args.workers,
+            'chat_latency': args.chat_latency,
+            'vision_latency': args.vision_latency,
+            'github_latency': args.github_latency,
+            'rate_429': args.rate_429,
+            'rate_5xx': args.rate_5xx
+        },
+        'corpus_sha256': manifest['corpus_sha256'],
+        'throughput': {
+            'wall_seconds': round(wall_seconds, 3),
+            'pages_succeeded': len(succeeded),
+            'pages_failed': len(records) - len(succeeded),
+            'pages_per_minute': round(len(succeeded) / wall_seconds * 60, 2) if wall_seconds else 0.0
+        },
+        'stages': {
+            stage: percentiles([r['timings'][stage] for r in succeeded if stage in r['timings']])
+            for stage in STAGES
+        },
+        'memory': {
+            'peak_rss_mb': sampler.peak_mb()
+        },
+        'api': {
+            'calls_total': api_calls,
+            'calls_per_page': round(api_calls / len(records), 2) if records else 0.0,
+            'tokens_per_page': round(api_stats['tokens']['total'] / len(records), 1) if records else 0.0,
+            'injected_errors': api_stats['injected_errors'],
+            'requests': api_stats['requests']
+        },
+        'errors': [{'page': r['page'], 'error': r.get('error')} for r in records if not r['success']][:20]
+    }
+
+
+def compare_results(current: dict, baseline: dict) -> list:
+    """对比两次基准结果，返回可读的差异行"""
+    lines = []
+
+    def delta(name, new, old, higher_is_better):
+        if not old:
+            return
+        change = (new - old) / old * 100
+        worse = change < 0 if higher_is_better else change > 0
+        flag = "⚠️ 退化" if worse and abs(change) >= 5 else ""
+        lines.append(f"{name}: {old} -> {new} ({change:+.1f}%) {flag}".rstrip())
+
+    delta("页/分钟", current['throughput']['pages_per_minute'], baseline['throughput']['pages_per_minute'], True)
+    for stage in STAGES:
+        new_p95 = current['stages'].get(stage, {}).get('p95')
+        old_p95 = baseline['stages'].get(stage, {}).get('p95')
+        if new_p95 is not None and old_p95 is not None:
+            delta(f"{stage} p95(秒)", new_p95, old_p95, False)
+    delta("峰值RSS(MB)", current['memory']['peak_rss_mb'], baseline['memory']['peak_rss_mb'], False)
+    delta("每页API调用", current['api']['calls_per_page'], baseline['api']['calls_per_page'], False)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="英语学习助手端到端流水线基准测试")
+    parser.add_argument("--corpus", default="benchmark_corpus", help="语料库目录 (不存在时自动生成)")
+    parser.add_argument("--pages", type=int, default=200, help="语料库页面数量")
+    parser.add_argument("--seed", type=int, default=2025, help="语料库和模拟服务的随机种子")
+    parser.add_argument("--workers", type=int, default=1, help="并发处理的页面数")
+    parser.add_argument("--chat-latency", default="lognormal:0.05:0.25", help="模拟文本接口延迟分布")
+    parser.add_argument("--vision-latency", default="lognormal:0.2:0.25", help="模拟视觉接口延迟分布")
+    parser.add_argument("--github-latency", default="uniform:0.02:0.06", help="模拟GitHub接口延迟分布")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="注入429限流的比例")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="注入5xx错误的比例")
+    parser.add_argument("--output", default="bench_results.json", help="结果JSON文件")
+    parser.add_argument("--compare", help="与之前的结果JSON对比")
+    parser.add_argument("--verbose", action="store_true", help="显示流水线的调试输出")
+    args = parser.parse_args()
+
+    print(f"[基准测试] 页面: {args.pages}, 并发: {args.workers}")
+    results = run_benchmark(args)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"[基准测试] 吞吐量: {results['throughput']['pages_per_minute']} 页/分钟")
+    print(f"[基准测试] 总耗时p95: {results['stages']['total'].get('p95')} 秒")
+    print(f"[基准测试] 峰值RSS: {results['memory']['peak_rss_mb']} MB")
+    print(f"[基准测试] 每页API调用: {results['api']['calls_per_page']}")
+    print(f"[基准测试] 结果已写入: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"[基准测试] 与 {args.compare} ({baseline.get('version')}) 对比:")
+        for line in compare_results(results, baseline):
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
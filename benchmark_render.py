@@ -0,0 +1,209 @@
+"""
+文档渲染基准测试
+
+使用确定性的合成分析结果，测量模板渲染层在数千篇课文上的性能:
+冷启动(空字节码缓存)与热启动的模板加载耗时、Markdown/HTML渲染吞吐量、
+Markdown转HTML缓存命中后的耗时，以及写入输出目录的整体耗时，结果写入JSON。
+
+使用方式:
+    python benchmark_render.py --lessons 5000 --output render_results.json
+"""
+
+import argparse
+import contextlib
+import html
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+WORDS = [
+    "family", "mother", "father", "school", "teacher", "friend", "apple", "library",
+    "weekend", "birthday", "holiday", "science", "history", "music", "garden", "river",
+    "morning", "evening", "breakfast", "classroom", "festival", "weather", "sweater", "museum"
+]
+
+
+def make_analysis_result(rng: random.Random, index: int) -> dict:
+    """生成一篇确定性的合成课文分析结果"""
+    unit = index % 12 + 1
+    sentences = [
+        f"{rng.choice(WORDS).capitalize()} is {rng.choice(['big', 'new', 'nice', 'old'])} and {rng.choice(WORDS)}."
+        for _ in range(rng.randint(8, 20))
+    ]
+    vocabulary = [
+        {
+            'word': word,
+            'meaning': f"释义{word}",
+            'level': rng.choice(['primary', 'middle']),
+            'example': f"I like the {word}."
+        }
+        for word in rng.sample(WORDS, rng.randint(5, 15))
+    ]
+    return {
+        'raw_ocr': '\n'.join(sentences),
+        'corrected_text': '\n'.join(sentences),
+        'confidence': round(rng.uniform(0.7, 0.99), 4),
+        'corrections': [
+            {'original': 'rn', 'corrected': 'm', 'reason': 'OCR字形混淆'}
+            for _ in range(rng.randint(0, 3))
+        ],
+        'analysis': {
+            'unit': unit,
+            'title': f"Lesson {index + 1}",
+            'content_type': rng.choice(['text', 'dialogue', 'exercise']),
+            'main_content': ' '.join(sentences[:3]),
+            'vocabulary': vocabulary,
+            'grammar_points': [f"语法点{i + 1}" for i in range(rng.randint(1, 4))]
+        }
+    }
+
+
+# HTML输出中需要转义的字符，检查识别原文 (代码块) 和校正文本中只被转义一次
+ESCAPE_PROBE = 'Tom & Jerry said "hi" <b>it\'s</b> 1 < 2 > 0'
+
+
+def check_html_escaping(renderer, generator):
+    """
+    检查HTML输出中的识别文本: 去掉标签并反转义后与原文一致，且原始HTML不会成为标签
+
+    Raises:
+        AssertionError: 转义不正确 (例如被转义了两次)
+    """
+    result = {
+        'raw_ocr': ESCAPE_PROBE,
+        'corrected_text': ESCAPE_PROBE,
+        'analysis': {'unit': 1, 'title': 'Escape check'}
+    }
+    page = renderer.render("lesson", generator._lesson_context(result), "html")
+    code = page.split('<pre><code>', 1)[1].split('</code></pre>', 1)[0]
+    quote = page.split('<blockquote>', 1)[1].split('</blockquote>', 1)[0]
+    quote = quote.strip().removeprefix('<p>').removesuffix('</p>')
+    for name, fragment in (('识别原文', code.strip()), ('校正文本', quote)):
+        assert '<b>' not in fragment, f"{name}中的HTML没有转义: {fragment}"
+        assert html.unescape(fragment) == ESCAPE_PROBE, f"{name}转义不正确: {fragment}"
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run_benchmark(args) -> dict:
+    """运行渲染基准测试并返回结果"""
+    # 模块中的st.*调用在脚本模式下只会产生警告，这里屏蔽掉
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    from src import __version__
+    from src.core.template_engine import TemplateRenderer
+    from src.core.document_generator import MarkdownGenerator
+
+    rng = random.Random(args.seed)
+    results = [make_analysis_result(rng, i) for i in range(args.lessons)]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir = Path(work_dir)
+        cache_dir = work_dir / "template_cache"
+        generator = MarkdownGenerator(str(work_dir / "output"), incremental=False)
+        contexts = [generator._lesson_context(result) for result in results]
+        check_html_escaping(TemplateRenderer(), generator)
+
+        # 模板加载: 空字节码缓存 (需要编译) 与已有缓存 (直接加载字节码)
+        cold_renderer = TemplateRenderer(cache_dir=str(cache_dir))
+        cold_load = timed(lambda: cold_renderer.render("lesson", contexts[0], "html"))
+        warm_renderer = TemplateRenderer(cache_dir=str(cache_dir))
+        warm_load = timed(lambda: warm_renderer.render("lesson", contexts[0], "html"))
+
+        renderer = TemplateRenderer(cache_dir=str(cache_dir), html_cache_size=args.lessons)
+        markdown_seconds = timed(lambda: [renderer.render("lesson", c, "markdown") for c in contexts])
+        html_cold_seconds = timed(lambda: [renderer.render("lesson", c, "html") for c in contexts])
+        html_warm_seconds = timed(lambda: [renderer.render("lesson", c, "html") for c in contexts])
+
+        # 完整的生成流程 (渲染 + 写文件 + 构建清单)
+        generator.renderer = renderer
+        with generator.batch():
+            build_seconds = timed(lambda: [
+                generator.generate_lesson_document(result, filename=f"lesson_{i + 1}.md")
+                for i, result in enumerate(results)
+            ])
+
+        # 增量构建: 输入未变化时全部跳过
+        generator.incremental = True
+        with generator.batch():
+            generator.build_stats = {'written': 0, 'skipped': 0}
+            noop_seconds = timed(lambda: [
+                generator.generate_lesson_document(result, filename=f"lesson_{i + 1}.md")
+                for i, result in enumerate(results)
+            ])
+        output_bytes = sum(f.stat().st_size for f in (work_dir / "output" / "lessons").iterdir())
+
+    def per_second(seconds):
+        return round(args.lessons / seconds, 1) if seconds else 0.0
+
+    return {
+        'version': __version__,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'settings': {
+            'lessons': args.lessons,
+            'seed': args.seed
+        },
+        'template_load_ms': {
+            'cold_bytecode_cache': round(cold_load * 1000, 2),
+            'warm_bytecode_cache': round(warm_load * 1000, 2)
+        },
+        'lessons_per_second': {
+            'markdown': per_second(markdown_seconds),
+            'html_uncached': per_second(html_cold_seconds),
+            'html_cached': per_second(html_warm_seconds),
+            'build_to_disk': per_second(build_seconds),
+            'incremental_noop': per_second(noop_seconds)
+        },
+        'html_cache': renderer.stats,
+        'incremental': generator.build_stats,
+        'output_mb': round(output_bytes / 1024 / 1024, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="英语学习助手文档渲染基准测试")
+    parser.add_argument("--lessons", type=int, default=5000, help="渲染的课文数量")
+    parser.add_argument("--seed", type=int, default=2025, help="合成数据的随机种子")
+    parser.add_argument("--output", default="render_results.json", help="结果JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="显示调试输出")
+    args = parser.parse_args()
+
+    print(f"[渲染基准] 课文数量: {args.lessons}")
+    quiet = open(os.devnull, 'w') if not args.verbose else None
+    with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+        results = run_benchmark(args)
+    if quiet:
+        quiet.close()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    load = results['template_load_ms']
+    print(f"[渲染基准] 模板加载: 冷启动 {load['cold_bytecode_cache']} ms, 字节码缓存 {load['warm_bytecode_cache']} ms")
+    for name, value in results['lessons_per_second'].items():
+        print(f"[渲染基准] {name}: {value} 篇/秒")
+    print(f"[渲染基准] 结果已写入: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
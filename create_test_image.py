@@ -1,8 +1,43 @@
 """
 创建与你提供的英语教材图片相似的测试内容
+
+也可以生成确定性的基准测试语料库（数百张不同尺寸和文字密度的教材页面）:
+    python create_test_image.py --corpus benchmark_corpus --pages 300
 """
+import argparse
+import hashlib
+import json
+import random
+from pathlib import Path
+
 from PIL import Image, ImageDraw, ImageFont
 
+# 基准语料库的页面尺寸 (手机拍照 / A5 / A4 150dpi / A4 300dpi)
+CORPUS_PAGE_SIZES = [(800, 1200), (1240, 1754), (1654, 2339), (2480, 3508)]
+
+# 文字密度: 名称 -> (每页行数, 字号相对页宽的比例)
+CORPUS_DENSITIES = {
+    'sparse': (12, 0.030),
+    'normal': (28, 0.022),
+    'dense': (50, 0.016),
+}
+
+CORPUS_SPEAKERS = ["Ms Gao", "Peter", "Emma", "Fu Xing", "Helen", "Class"]
+CORPUS_SENTENCES = [
+    "Good morning, class.",
+    "Sit down, please.",
+    "Hi, everyone! I'm Peter Brown.",
+    "Nice to meet you too!",
+    "What's this in English? It's a map.",
+    "Spell it, please. M-A-P.",
+    "What color is it? It's red.",
+    "Where is my schoolbag? It's on the desk.",
+    "Do you like bananas? Yes, I do.",
+    "Let's play soccer after school.",
+    "My birthday is on May 3rd.",
+    "How much are these socks? They're two dollars.",
+]
+
 def create_english_textbook_image():
     """创建英语教材样式的测试图片"""
     # 创建白色背景图片
@@ -81,5 +116,122 @@ def create_english_textbook_image():
     img.save("english_textbook_test.jpg", 'JPEG', quality=95)
     print("测试图片已创建: english_textbook_test.jpg")
 
+def _load_font(size: int):
+    """加载指定字号的字体，没有系统字体时使用默认字体"""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except:
+        try:
+            return ImageFont.load_default(size=size)
+        except TypeError:
+            # Pillow < 10.1 的默认字体不支持字号
+            return ImageFont.load_default()
+
+
+def draw_textbook_page(rng: random.Random, size, density: str, page_no: int) -> Image.Image:
+    """
+    按随机种子绘制一页教材样式的图片
+    
+    Args:
+        rng: 随机数生成器（决定页面内容）
+        size: 页面尺寸 (宽, 高)
+        density: 文字密度，见CORPUS_DENSITIES
+        page_no: 页码
+        
+    Returns:
+        绘制好的页面图片
+    """
+    width, height = size
+    line_count, font_ratio = CORPUS_DENSITIES[density]
+    margin = int(width * rng.uniform(0.06, 0.14))
+    
+    img = Image.new('RGB', size, color='white')
+    draw = ImageDraw.Draw(img)
+    title_font = _load_font(int(width * font_ratio * 1.6))
+    content_font = _load_font(int(width * font_ratio))
+    line_height = int((height - 2 * margin) / (line_count + 4))
+    
+    y = margin
+    unit = page_no // 8 + 1
+    draw.text((margin, y), f"Unit {unit}  Section {'AB'[page_no % 2]}, {rng.randint(1, 4)}{'abcd'[rng.randint(0, 3)]}",
+              font=title_font, fill='black')
+    y += line_height * 2
+    
+    for _ in range(line_count):
+        if rng.random() < 0.15:
+            draw.text((margin, y), f"Conversation {rng.randint(1, 5)}", font=content_font, fill='blue')
+        else:
+            line = f"{rng.choice(CORPUS_SPEAKERS)}: {rng.choice(CORPUS_SENTENCES)}"
+            if rng.random() < 0.3:
+                line += " " + rng.choice(CORPUS_SENTENCES)
+            draw.text((margin, y), line, font=content_font, fill='black')
+        y += line_height
+    
+    draw.text((width // 2, height - margin // 2), str(page_no), font=content_font, fill='gray')
+    return img
+
+
+def create_benchmark_corpus(output_dir: str = "benchmark_corpus", pages: int = 200, seed: int = 2025) -> dict:
+    """
+    生成确定性的基准测试语料库
+    
+    同样的pages和seed总是生成同样的页面，manifest.json中记录每页的尺寸、密度和SHA-256，
+    便于在不同版本之间对比基准结果。
+    
+    Args:
+        output_dir: 输出目录
+        pages: 页面数量
+        seed: 随机种子
+        
+    Returns:
+        语料库清单
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    densities = list(CORPUS_DENSITIES)
+    
+    entries = []
+    for page_no in range(1, pages + 1):
+        rng = random.Random(f"{seed}:{page_no}")
+        size = CORPUS_PAGE_SIZES[rng.randrange(len(CORPUS_PAGE_SIZES))]
+        density = densities[rng.randrange(len(densities))]
+        
+        filename = f"page_{page_no:04d}.jpg"
+        file_path = output_path / filename
+        img = draw_textbook_page(rng, size, density, page_no)
+        img.save(file_path, 'JPEG', quality=90)
+        
+        entries.append({
+            'page': page_no,
+            'file': filename,
+            'width': size[0],
+            'height': size[1],
+            'density': density,
+            'bytes': file_path.stat().st_size,
+            'sha256': hashlib.sha256(file_path.read_bytes()).hexdigest()
+        })
+    
+    manifest = {
+        'seed': seed,
+        'pages': pages,
+        'corpus_sha256': hashlib.sha256(''.join(e['sha256'] for e in entries).encode('utf-8')).hexdigest(),
+        'entries': entries
+    }
+    with open(output_path / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    
+    print(f"基准语料库已创建: {output_path} ({pages} 页, 指纹 {manifest['corpus_sha256'][:12]})")
+    return manifest
+
+
 if __name__ == "__main__":
-    create_english_textbook_image()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="创建英语教材测试图片")
+    parser.add_argument("--corpus", help="生成基准测试语料库到指定目录")
+    parser.add_argument("--pages", type=int, default=200, help="语料库页面数量")
+    parser.add_argument("--seed", type=int, default=2025, help="语料库随机种子")
+    args = parser.parse_args()
+    
+    if args.corpus:
+        create_benchmark_corpus(args.corpus, args.pages, args.seed)
+    else:
+        create_english_textbook_image()
\ No newline at end of file
@@ -0,0 +1,355 @@
+"""
+Streamlit应用并发会话压力测试
+
+驱动N个并发会话完成 上传 → AI识别 → 导出 的完整流程，统计每个会话各步骤的延迟、
+服务端RSS和CPU占用，用于评估单个实例能同时支撑多少个课堂会话。
+
+两种驱动方式:
+    apptest: 使用Streamlit AppTest在进程内运行应用 (默认，自动启动模拟API服务)
+    browser: 使用Playwright无头浏览器访问已运行的服务 (参考playwright_test.py)
+
+使用方式:
+    python load_test_sessions.py --sessions 1,5,10,20 --images 3 --output load_results.json
+
+    # 浏览器模式: 先用模拟服务的环境变量启动应用，再指定服务进程PID采样资源
+    python -m src.utils.mock_server --port 8765
+    streamlit run streamlit_app.py --server.port 8502
+    python load_test_sessions.py --mode browser --url http://localhost:8502 --server-pid <PID>
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from benchmark_pipeline import percentiles
+from create_test_image import draw_textbook_page
+from src.utils.mock_server import MockAPIServer, MockServerSettings, LatencyModel
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+APP_SCRIPT = str(project_root / "streamlit_app.py")
+STEPS = ['load', 'upload', 'recognize', 'export']
+
+
+class ResourceSampler:
+    """后台线程定期采样目标进程的RSS和CPU占用"""
+
+    def __init__(self, pid: int = None, interval: float = 0.2):
+        self.interval = interval
+        self.process = psutil.Process(pid or os.getpid()) if psutil else None
+        self.rss_samples = []
+        self.cpu_samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.process:
+            self.process.cpu_percent(interval=None)  # 初始化CPU计数
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.rss_samples.append(self.process.memory_info().rss)
+                self.cpu_samples.append(self.process.cpu_percent(interval=None))
+            except psutil.Error:
+                break
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def summary(self) -> dict:
+        if not self.rss_samples:
+            return {'available': False}
+        mb = 1024 * 1024
+        return {
+            'available': True,
+            'rss_start_mb': round(self.rss_samples[0] / mb, 1),
+            'rss_peak_mb': round(max(self.rss_samples) / mb, 1),
+            'rss_end_mb': round(self.rss_samples[-1] / mb, 1),
+            'cpu_mean_percent': round(sum(self.cpu_samples) / len(self.cpu_samples), 1),
+            'cpu_peak_percent': round(max(self.cpu_samples), 1)
+        }
+
+
+def make_session_images(session_id: int, count: int, seed: int) -> list:
+    """为会话生成确定性的测试图片 (filename, bytes, mime)"""
+    images = []
+    for i in range(count):
+        rng = random.Random(f"{seed}:{session_id}:{i}")
+        img = draw_textbook_page(rng, (800, 1200), 'normal', i + 1)
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=85)
+        images.append((f"session{session_id}_page{i + 1}.jpg", buffer.getvalue(), "image/jpeg"))
+    return images
+
+
+def _find_button(at, text: str):
+    for button in at.button:
+        if text in button.label:
+            return button
+    return None
+
+
+def run_apptest_session(session_id: int, images: list, timeout: float, start_barrier: threading.Barrier) -> dict:
+    """
+    使用AppTest驱动一个会话完成完整流程
+
+    Returns:
+        会话记录 (各步骤耗时、是否完成、错误信息)
+    """
+    from streamlit.testing.v1 import AppTest
+
+    record = {'session': session_id, 'timings': {}, 'completed': False, 'error': None}
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=timeout)
+
+    def step(name, action):
+        start = time.perf_counter()
+        action()
+        record['timings'][name] = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].value}")
+
+    try:
+        start_barrier.wait()
+        session_start = time.perf_counter()
+
+        step('load', at.run)
+
+        at.file_uploader[0].set_value(images)
+        step('upload', at.run)
+
+        recognize_button = _find_button(at, "开始AI识别处理")
+        if recognize_button is None:
+            raise RuntimeError("upload: 未出现'开始AI识别处理'按钮")
+        recognize_button.click()
+        step('recognize', at.run)
+
+        export_button = _find_button(at, "导出文本")
+        if export_button is None:
+            raise RuntimeError("recognize: 未出现'导出文本'按钮")
+        export_button.click()
+        step('export', at.run)
+
+        if not at.get('download_button'):
+            raise RuntimeError("export: 未生成下载按钮")
+
+        record['timings']['session'] = time.perf_counter() - session_start
+        record['completed'] = True
+    except Exception as e:
+        record['error'] = str(e)
+
+    return record
+
+
+def run_apptest_level(sessions: int, args) -> dict:
+    """以指定并发数运行一轮AppTest压力测试"""
+    images_by_session = [make_session_images(i, args.images, args.seed) for i in range(sessions)]
+    barrier = threading.Barrier(sessions)
+
+    with ResourceSampler(interval=args.sample_interval) as sampler:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions) as executor:
+            records = list(executor.map(
+                lambda i: run_apptest_session(i, images_by_session[i], args.timeout, barrier),
+                range(sessions)
+            ))
+        wall_seconds = time.perf_counter() - start
+
+    return summarize_level(sessions, records, wall_seconds, sampler.summary())
+
+
+async def run_browser_session(browser, session_id: int, images: list, args, start_event: asyncio.Event) -> dict:
+    """使用Playwright无头浏览器驱动一个会话完成完整流程"""
+    record = {'session': session_id, 'timings': {}, 'completed': False, 'error': None}
+    context = await browser.new_context()
+    page = await context.new_page()
+    timeout_ms = args.timeout * 1000
+
+    async def step(name, coro):
+        start = time.perf_counter()
+        await coro
+        record['timings'][name] = time.perf_counter() - start
+
+    try:
+        await start_event.wait()
+        session_start = time.perf_counter()
+
+        async def load():
+            await page.goto(args.url)
+            await page.wait_for_selector('input[type="file"]', state='attached', timeout=timeout_ms)
+
+        async def upload():
+            await page.set_input_files('input[type="file"]', files=[
+                {'name': name, 'mimeType': mime, 'buffer': data} for name, data, mime in images
+            ])
+            await page.get_by_role('button', name='开始AI识别处理').wait_for(timeout=timeout_ms)
+
+        async def recognize():
+            await page.get_by_role('button', name='开始AI识别处理').click()
+            await page.get_by_role('button', name='导出文本').wait_for(timeout=timeout_ms)
+
+        async def export():
+            await page.get_by_role('button', name='导出文本').click()
+            await page.get_by_role('button', name='下载文本文件').wait_for(timeout=timeout_ms)
+
+        await step('load', load())
+        await step('upload', upload())
+        await step('recognize', recognize())
+        await step('export', export())
+
+        record['timings']['session'] = time.perf_counter() - session_start
+        record['completed'] = True
+    except Exception as e:
+        record['error'] = str(e)
+    finally:
+        await context.close()
+
+    return record
+
+
+async def _run_browser_level_async(sessions: int, args) -> tuple:
+    from playwright.async_api import async_playwright
+
+    images_by_session = [make_session_images(i, args.images, args.seed) for i in range(sessions)]
+    start_event = asyncio.Event()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        tasks = [
+            asyncio.create_task(run_browser_session(browser, i, images_by_session[i], args, start_event))
+            for i in range(sessions)
+        ]
+        start = time.perf_counter()
+        start_event.set()
+        records = await asyncio.gather(*tasks)
+        wall_seconds = time.perf_counter() - start
+        await browser.close()
+
+    return records, wall_seconds
+
+
+def run_browser_level(sessions: int, args) -> dict:
+    """以指定并发数运行一轮浏览器压力测试 (资源采样针对 --server-pid)"""
+    with ResourceSampler(pid=args.server_pid, interval=args.sample_interval) as sampler:
+        records, wall_seconds = asyncio.run(_run_browser_level_async(sessions, args))
+    return summarize_level(sessions, records, wall_seconds, sampler.summary())
+
+
+def summarize_level(sessions: int, records: list, wall_seconds: float, resources: dict) -> dict:
+    """汇总一轮测试结果"""
+    completed = [r for r in records if r['completed']]
+    return {
+        'sessions': sessions,
+        'completed': len(completed),
+        'failed': len(records) - len(completed),
+        'wall_seconds': round(wall_seconds, 3),
+        'steps': {
+            name: percentiles([r['timings'][name] for r in completed if name in r['timings']])
+            for name in STEPS + ['session']
+        },
+        'resources': resources,
+        'errors': [{'session': r['session'], 'error': r['error']} for r in records if r['error']][:20]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit应用并发会话压力测试")
+    parser.add_argument("--mode", choices=["apptest", "browser"], default="apptest")
+    parser.add_argument("--sessions", default="1,5,10", help="并发会话数，逗号分隔表示依次测试多个级别")
+    parser.add_argument("--images", type=int, default=3, help="每个会话上传的图片数量")
+    parser.add_argument("--seed", type=int, default=2025, help="测试图片和模拟服务的随机种子")
+    parser.add_argument("--timeout", type=float, default=300, help="单步超时 (秒)")
+    parser.add_argument("--sample-interval", type=float, default=0.2, help="资源采样间隔 (秒)")
+    parser.add_argument("--chat-latency", default="lognormal:0.3:0.3", help="模拟文本接口延迟分布 (apptest模式)")
+    parser.add_argument("--vision-latency", default="lognormal:1.0:0.3", help="模拟视觉接口延迟分布 (apptest模式)")
+    parser.add_argument("--github-latency", default="uniform:0.1:0.3", help="模拟GitHub接口延迟分布 (apptest模式)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="注入429限流的比例 (apptest模式)")
+    parser.add_argument("--url", default="http://localhost:8502", help="应用地址 (browser模式)")
+    parser.add_argument("--server-pid", type=int, help="Streamlit服务进程PID，用于采样RSS/CPU (browser模式)")
+    parser.add_argument("--output", default="load_results.json", help="结果JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="显示应用的调试输出")
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.sessions.split(',') if n.strip()]
+    if not psutil:
+        print("[压力测试] 未安装psutil，将无法采样RSS和CPU")
+
+    server = None
+    if args.mode == "apptest":
+        # 应用中的st.*调用和调试日志非常多，这里屏蔽掉
+        logging.getLogger('streamlit').setLevel(logging.ERROR)
+        server = MockAPIServer(MockServerSettings(
+            seed=args.seed,
+            chat_latency=LatencyModel.parse(args.chat_latency),
+            vision_latency=LatencyModel.parse(args.vision_latency),
+            github_latency=LatencyModel.parse(args.github_latency),
+            rate_429=args.rate_429,
+        )).start()
+        server.apply_to_config()
+        run_level = run_apptest_level
+    else:
+        if args.server_pid is None:
+            print("[压力测试] 未指定 --server-pid，资源采样将针对当前进程")
+        run_level = run_browser_level
+
+    report = {
+        'mode': args.mode,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'images_per_session': args.images,
+        'levels': []
+    }
+
+    try:
+        for sessions in levels:
+            print(f"[压力测试] 并发会话: {sessions} ...")
+            if server:
+                server.reset_stats()
+            quiet = open(os.devnull, 'w') if not args.verbose else None
+            with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+                level = run_level(sessions, args)
+            if quiet:
+                quiet.close()
+            if server:
+                level['api'] = server.stats()
+            report['levels'].append(level)
+
+            session_p95 = level['steps']['session'].get('p95')
+            resources = level['resources']
+            print(f"  完成 {level['completed']}/{sessions}，会话p95 {session_p95} 秒，"
+                  f"峰值RSS {resources.get('rss_peak_mb', '-')} MB，平均CPU {resources.get('cpu_mean_percent', '-')}%")
+            for error in level['errors'][:3]:
+                print(f"  ❌ 会话{error['session']}: {error['error']}")
+    finally:
+        if server:
+            server.stop()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[压力测试] 结果已写入: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
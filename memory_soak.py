@@ -0,0 +1,319 @@
+"""
+长时间会话内存浸泡测试
+
+模拟课堂上一整天的使用: 在同一个会话中反复重新运行(rerun)页面、反复批量处理图片，
+定期采样tracemalloc快照、RSS和临时文件数量，计算每次迭代的内存增长，
+并列出增长最多的内存分配位置，在上课之前发现内存和临时文件泄漏。
+
+使用方式:
+    python memory_soak.py --reruns 2000 --batches 200 --output soak_results.json
+
+发现增长超过阈值时以退出码1结束，可直接用于CI。
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from create_test_image import draw_textbook_page
+from src.utils.mock_server import MockAPIServer, MockServerSettings, LatencyModel
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+APP_SCRIPT = str(project_root / "streamlit_app.py")
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+
+
+def current_rss() -> int:
+    """当前进程常驻内存 (字节)，无psutil时返回0"""
+    if psutil:
+        return psutil.Process().memory_info().rss
+    return 0
+
+
+def slope(points: list) -> float:
+    """最小二乘拟合的斜率 (每次迭代的增长量)"""
+    if len(points) < 2:
+        return 0.0
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    if not denominator:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator
+
+
+class TempFileWatcher:
+    """统计测试期间新增且未被清理的临时图片文件"""
+
+    def __init__(self):
+        self.temp_dir = Path(tempfile.gettempdir())
+        self.baseline = set(self._list())
+
+    def _list(self):
+        return [p.name for p in self.temp_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES]
+
+    def leaked(self) -> list:
+        return sorted(set(self._list()) - self.baseline)
+
+
+class SoakSampler:
+    """定期采样tracemalloc、RSS和临时文件，并在结束时汇总增长情况"""
+
+    def __init__(self, phase: str, warmup: int, top: int):
+        self.phase = phase
+        self.warmup = warmup
+        self.top = top
+        self.samples = []
+        self.baseline_snapshot = None
+        self.last_snapshot = None
+        self.temp_files = TempFileWatcher()
+
+    def sample(self, iteration: int):
+        traced, _ = tracemalloc.get_traced_memory()
+        self.samples.append({
+            'iteration': iteration,
+            'rss_mb': round(current_rss() / 1024 / 1024, 2),
+            'traced_mb': round(traced / 1024 / 1024, 2),
+            'temp_files': len(self.temp_files.leaked())
+        })
+
+        if iteration >= self.warmup:
+            # 不在这里调用filter_traces: 对数十万条记录逐条匹配非常慢，统一在汇总时过滤
+            snapshot = tracemalloc.take_snapshot()
+            if self.baseline_snapshot is None:
+                self.baseline_snapshot = snapshot
+            else:
+                self.last_snapshot = snapshot
+
+    def summary(self, max_growth_kb: float) -> dict:
+        measured = [s for s in self.samples if s['iteration'] >= self.warmup]
+        rss_slope = slope([(s['iteration'], s['rss_mb'] * 1024) for s in measured])
+        traced_slope = slope([(s['iteration'], s['traced_mb'] * 1024) for s in measured])
+        temp_slope = slope([(s['iteration'], s['temp_files']) for s in measured])
+
+        top_sites = []
+        if self.baseline_snapshot and self.last_snapshot:
+            for stat in self.last_snapshot.compare_to(self.baseline_snapshot, 'lineno'):
+                frame = stat.traceback[0]
+                if frame.filename == tracemalloc.__file__ or frame.filename.startswith('<frozen'):
+                    continue
+                if len(top_sites) >= self.top:
+                    break
+                top_sites.append({
+                    'site': f"{frame.filename}:{frame.lineno}",
+                    'size_diff_kb': round(stat.size_diff / 1024, 1),
+                    'count_diff': stat.count_diff
+                })
+
+        leaked_files = self.temp_files.leaked()
+        flags = []
+        if traced_slope > max_growth_kb:
+            flags.append(f"Python堆每次迭代增长 {traced_slope:.1f} KB")
+        if rss_slope > max_growth_kb:
+            flags.append(f"RSS每次迭代增长 {rss_slope:.1f} KB")
+        if leaked_files:
+            flags.append(f"残留 {len(leaked_files)} 个临时图片文件 (每次迭代 {temp_slope:.2f} 个)")
+
+        return {
+            'phase': self.phase,
+            'iterations': self.samples[-1]['iteration'] if self.samples else 0,
+            'growth_per_iteration': {
+                'rss_kb': round(rss_slope, 2),
+                'traced_kb': round(traced_slope, 2),
+                'temp_files': round(temp_slope, 4)
+            },
+            'flagged': bool(flags),
+            'flags': flags,
+            'top_allocation_sites': top_sites,
+            'leaked_temp_files': leaked_files[:20],
+            'samples': self.samples
+        }
+
+
+def make_images(count: int, seed: int) -> list:
+    """生成确定性的测试图片 (filename, bytes)"""
+    images = []
+    for i in range(count):
+        img = draw_textbook_page(random.Random(f"{seed}:{i}"), (800, 1200), 'normal', i + 1)
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=85)
+        images.append((f"soak_page_{i + 1}.jpg", buffer.getvalue()))
+    return images
+
+
+class _FakeUploadedFile(io.BytesIO):
+    """模拟Streamlit的UploadedFile (提供name/size/type/getvalue)"""
+
+    def __init__(self, name: str, data: bytes):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+        self.type = "image/jpeg"
+
+
+def soak_reruns(args, images: list) -> dict:
+    """
+    在同一个AppTest会话中完成一次识别后反复重新运行页面
+    (包含结果区域、调试信息和定期的导出操作)
+    """
+    from streamlit.testing.v1 import AppTest
+
+    sampler = SoakSampler('reruns', args.warmup, args.top)
+    at = AppTest.from_file(APP_SCRIPT, default_timeout=args.timeout)
+    at.run()
+    at.file_uploader[0].set_value([(name, data, "image/jpeg") for name, data in images])
+    at.run()
+    for button in at.button:
+        if "开始AI识别处理" in button.label:
+            button.click()
+    at.run()
+
+    for iteration in range(1, args.reruns + 1):
+        if args.export_every and iteration % args.export_every == 0:
+            for button in at.button:
+                if "导出文本" in button.label:
+                    button.click()
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"第{iteration}次重新运行出错: {at.exception[0].value}")
+        if iteration % args.sample_every == 0:
+            sampler.sample(iteration)
+
+    return sampler.summary(args.max_growth_kb)
+
+
+def soak_batches(args, images: list, image_dir: Path, server: MockAPIServer) -> dict:
+    """
+    反复运行批量处理流水线，覆盖文件路径、字节数据和上传文件三种输入，
+    配合模拟服务的错误注入覆盖失败路径上的临时文件清理
+    """
+    from src.core.vision_processor import create_vision_processor
+    from src.core.ai_analyzer import create_ai_enhanced_ocr
+
+    sampler = SoakSampler('batches', args.warmup, args.top)
+    vision_processor = create_vision_processor()
+    ai_ocr = create_ai_enhanced_ocr()
+
+    paths = []
+    for name, data in images:
+        path = image_dir / name
+        path.write_bytes(data)
+        paths.append(path)
+
+    for iteration in range(1, args.batches + 1):
+        # 模拟服务与应用在同一进程中，清空它保存的上传文件，避免被计入应用的增长
+        with server.state.lock:
+            server.state.files.clear()
+        for path, (name, data) in zip(paths, images):
+            inputs = [
+                (str(path), None),
+                (data, None),
+                (data, _FakeUploadedFile(name, data)),
+            ]
+            for image_input, uploaded_file in inputs:
+                vision_result = vision_processor.process_image(image_input, uploaded_file=uploaded_file)
+                ai_ocr.process_image_with_ai(vision_result, f"英语教材 - {name}")
+        if iteration % args.sample_every_batch == 0:
+            sampler.sample(iteration)
+
+    return sampler.summary(args.max_growth_kb)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长时间会话内存浸泡测试")
+    parser.add_argument("--reruns", type=int, default=2000, help="页面重新运行次数 (0表示跳过)")
+    parser.add_argument("--batches", type=int, default=200, help="批量处理轮数 (0表示跳过)")
+    parser.add_argument("--images", type=int, default=3, help="每轮使用的图片数量")
+    parser.add_argument("--export-every", type=int, default=50, help="每隔多少次重新运行点击一次导出")
+    parser.add_argument("--sample-every", type=int, default=100, help="重新运行阶段的采样间隔")
+    parser.add_argument("--sample-every-batch", type=int, default=10, help="批量处理阶段的采样间隔")
+    parser.add_argument("--warmup", type=int, default=100, help="预热迭代次数，之后才开始计算增长")
+    parser.add_argument("--max-growth-kb", type=float, default=16.0, help="每次迭代允许的最大增长 (KB)")
+    parser.add_argument("--top", type=int, default=15, help="报告的内存分配位置数量")
+    parser.add_argument("--frames", type=int, default=1, help="tracemalloc保存的调用栈深度 (越深越慢)")
+    parser.add_argument("--rate-5xx", type=float, default=0.05, help="注入5xx错误的比例，覆盖失败路径")
+    parser.add_argument("--seed", type=int, default=2025, help="随机种子")
+    parser.add_argument("--timeout", type=float, default=120, help="单次运行超时 (秒)")
+    parser.add_argument("--output", default="soak_results.json", help="结果JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="显示应用的调试输出")
+    args = parser.parse_args()
+
+    if not psutil:
+        print("[浸泡测试] 未安装psutil，将只统计Python堆内存")
+
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    images = make_images(args.images, args.seed)
+    settings = MockServerSettings(
+        seed=args.seed,
+        rate_5xx=args.rate_5xx,
+        chat_latency=LatencyModel.parse("fixed:0"),
+        vision_latency=LatencyModel.parse("fixed:0"),
+        github_latency=LatencyModel.parse("fixed:0"),
+    )
+
+    tracemalloc.start(args.frames)
+    phases = []
+    start = time.perf_counter()
+
+    with MockAPIServer(settings) as server, tempfile.TemporaryDirectory() as image_dir:
+        server.apply_to_config()
+        quiet = open(os.devnull, 'w') if not args.verbose else None
+        with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+            if args.reruns:
+                phases.append(soak_reruns(args, images))
+            if args.batches:
+                phases.append(soak_batches(args, images, Path(image_dir), server))
+        if quiet:
+            quiet.close()
+        api_stats = server.stats()
+
+    tracemalloc.stop()
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'wall_seconds': round(time.perf_counter() - start, 1),
+        'max_growth_kb': args.max_growth_kb,
+        'api': api_stats,
+        'phases': phases
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    flagged = False
+    for phase in phases:
+        growth = phase['growth_per_iteration']
+        status = "⚠️ 发现增长" if phase['flagged'] else "✅ 稳定"
+        print(f"[浸泡测试] {phase['phase']}: {phase['iterations']} 次迭代, "
+              f"堆 {growth['traced_kb']} KB/次, RSS {growth['rss_kb']} KB/次, 临时文件 {growth['temp_files']} 个/次 - {status}")
+        for flag in phase['flags']:
+            print(f"  - {flag}")
+        if phase['flagged']:
+            flagged = True
+            for site in phase['top_allocation_sites'][:5]:
+                print(f"    {site['size_diff_kb']:>10} KB  {site['count_diff']:>6}  {site['site']}")
+    print(f"[浸泡测试] 结果已写入: {args.output}")
+
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+API录制/回放模块
+
+将智普AI的视觉识别和文本分析响应按请求指纹录制到磁带(cassette)文件中，
+之后可以按原始耗时或压缩后的耗时回放，用于离线开发、下游性能分析和回归测试。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..utils.config import config
+
+
+CASSETTE_MODES = ("off", "record", "replay", "auto")
+CASSETTE_TIMINGS = ("original", "compressed", "none")
+
+
+def request_fingerprint(request: Dict[str, Any]) -> str:
+    """
+    计算请求指纹
+
+    Args:
+        request: 规范化后的请求内容 (模型、消息、参数等)
+
+    Returns:
+        SHA-256十六进制指纹
+    """
+    canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class Cassette:
+    """
+    磁带文件存储
+
+    每个请求指纹对应目录下的一个JSON文件，记录请求摘要、响应内容和原始耗时。
+
+    模式:
+        off: 不录制也不回放
+        record: 总是调用真实API并录制 (覆盖已有记录)
+        replay: 只回放，未命中时不调用真实API
+        auto: 命中时回放，未命中时调用真实API并录制
+    """
+
+    def __init__(self, path: str = "./cassettes", mode: str = "off",
+                 timing: str = "original", speed: float = 0.1):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"不支持的磁带模式: {mode} (可选: {', '.join(CASSETTE_MODES)})")
+        if timing not in CASSETTE_TIMINGS:
+            raise ValueError(f"不支持的回放时序: {timing} (可选: {', '.join(CASSETTE_TIMINGS)})")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.timing = timing
+        self.speed = speed
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'recorded': 0}
+
+        if self.mode != "off":
+            self.path.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def can_replay(self) -> bool:
+        return self.mode in ("replay", "auto")
+
+    @property
+    def can_record(self) -> bool:
+        return self.mode in ("record", "auto")
+
+    @property
+    def allows_live_calls(self) -> bool:
+        """未命中时是否允许调用真实API"""
+        return self.mode != "replay"
+
+    def _entry_path(self, fingerprint: str) -> Path:
+        return self.path / f"{fingerprint}.json"
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def replay(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        回放录制的响应
+
+        Args:
+            fingerprint: 请求指纹
+
+        Returns:
+            录制的响应内容，未命中返回None
+        """
+        if not self.can_replay:
+            return None
+
+        entry_path = self._entry_path(fingerprint)
+        if not entry_path.exists():
+            self._count('misses')
+            print(f"[Cassette] 未命中: {fingerprint[:12]}")
+            return None
+
+        with open(entry_path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+
+        delay = entry.get('elapsed', 0.0)
+        if self.timing == "compressed":
+            delay *= self.speed
+        elif self.timing == "none":
+            delay = 0.0
+        if delay > 0:
+            time.sleep(delay)
+
+        self._count('hits')
+        print(f"[Cassette] 回放: {fingerprint[:12]} ({entry.get('kind')}, 延迟 {delay:.2f}s)")
+        return entry['response']
+
+    def record(self, fingerprint: str, kind: str, request: Dict[str, Any],
+               response: Dict[str, Any], elapsed: float):
+        """
+        录制一次响应
+
+        Args:
+            fingerprint: 请求指纹
+            kind: 请求类型 (vision / chat)
+            request: 请求摘要
+            response: 响应内容 (需可JSON序列化)
+            elapsed: 真实调用耗时 (秒)
+        """
+        if not self.can_record:
+            return
+
+        entry = {
+            'fingerprint': fingerprint,
+            'kind': kind,
+            'request': request,
+            'response': response,
+            'elapsed': round(elapsed, 4),
+            'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+        # 先写临时文件再原子替换，避免并发读到半个文件
+        entry_path = self._entry_path(fingerprint)
+        temp_path = entry_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, entry_path)
+
+        self._count('recorded')
+        print(f"[Cassette] 已录制: {fingerprint[:12]} ({kind}, 耗时 {elapsed:.2f}s)")
+
+
+def create_cassette() -> Optional[Cassette]:
+    """
+    根据配置创建磁带实例
+
+    Returns:
+        磁带实例，模式为off时返回None
+    """
+    mode = config.get("ai.cassette.mode", "off")
+    if mode == "off":
+        return None
+
+    return Cassette(
+        path=config.get("ai.cassette.path", "./cassettes"),
+        mode=mode,
+        timing=config.get("ai.cassette.timing", "original"),
+        speed=float(config.get("ai.cassette.speed", 0.1))
+    )
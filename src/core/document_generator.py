@@ -1,21 +1,267 @@
 """
 文档生成模块
 
-将分析结果转换为Markdown格式的学习文档
+将分析结果通过预编译模板渲染为Markdown或HTML格式的学习文档
 """
 
 import streamlit as st
 import markdown
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+import atexit
+import hashlib
 import json
+import multiprocessing
+import os
+import queue
+import threading
+
+from .template_engine import get_template_renderer, output_filename, template_digest
+from .export_archive import StreamingZipExport
+from .metrics import get_metrics
+from ..utils.config import config
+
+
+# 文档生成器版本，修改模板上下文的生成方式后递增，使已有输出全部重新生成
+# (模板文件本身的修改已经计入输入哈希，不需要递增)
+GENERATOR_VERSION = "3"
+MANIFEST_FILENAME = ".build_manifest.json"
+
+
+def content_hash(data: Any) -> str:
+    """
+    计算文档输入内容的哈希 (包含生成器版本和模板源文件的哈希)
+    
+    Args:
+        data: 生成文档所需的全部输入
+        
+    Returns:
+        SHA-256十六进制哈希
+    """
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(f"{GENERATOR_VERSION}:{template_digest()}:{canonical}".encode('utf-8')).hexdigest()
+
+
+class BuildManifest:
+    """
+    构建清单
+    
+    记录输出目录中每个文档(以及索引中的每个单元分段)的输入哈希，
+    类似make，只有输入发生变化或输出文件缺失时才重新生成。
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._dirty = False
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[BuildManifest] 清单文件损坏，将全部重新生成: {e}")
+            return {}
+        
+        if data.get('generator_version') != GENERATOR_VERSION:
+            print(f"[BuildManifest] 模板版本变化 ({data.get('generator_version')} -> {GENERATOR_VERSION})，将全部重新生成")
+            return {}
+        return data.get('entries', {})
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.entries.get(key)
+    
+    def is_fresh(self, key: str, input_hash: str, file_path: Optional[Path] = None) -> bool:
+        """
+        判断输出是否为最新
+        
+        Args:
+            key: 清单条目键 (输出文件相对路径)
+            input_hash: 当前输入哈希
+            file_path: 输出文件路径，文件缺失时视为过期
+        """
+        entry = self.get(key)
+        if not entry or entry.get('input_hash') != input_hash:
+            return False
+        return file_path is None or file_path.exists()
+    
+    def update(self, key: str, input_hash: str, **extra):
+        """记录条目的输入哈希，批量模式下延迟写入"""
+        with self._lock:
+            self.entries[key] = {'input_hash': input_hash, **extra}
+            self._dirty = True
+            if self._batch_depth == 0:
+                self.save()
+    
+    def save(self):
+        """保存清单 (先写临时文件再原子替换)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'generator_version': GENERATOR_VERSION, 'entries': self.entries}
+            temp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+            self._dirty = False
+    
+    @contextmanager
+    def batch(self):
+        """批量模式: 期间只更新内存中的清单，退出时统一写入一次"""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.save()
+
+
+def atomic_write(file_path: Path, content: str):
+    """先写同目录下的临时文件再原子替换，读者不会看到写了一半的文档"""
+    temp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, file_path)
+
+
+@dataclass
+class DocumentJob:
+    """待构建的文档"""
+    relative_path: str                      # 相对输出目录的路径
+    template: str                           # 模板名称
+    output_format: str                      # markdown / html
+    inputs: Any                             # 用于计算输入哈希
+    make_context: Callable[[], Dict]        # 生成模板上下文 (只在需要重新生成时调用)
+    title: str = ""                         # HTML页面标题
+
+
+@dataclass
+class BuiltDocument:
+    """构建结果，渲染内容保留在内存中供预览和下载"""
+    relative_path: str
+    path: str
+    content: Optional[str] = None
+    skipped: bool = False
+    
+    @property
+    def filename(self) -> str:
+        return Path(self.relative_path).name
+    
+    def read(self) -> str:
+        """获取文档内容，增量构建中跳过的文档才需要从磁盘读取"""
+        if self.content is None:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.content = f.read()
+        return self.content
+
+
+def _unit_sort_key(unit: Any) -> Tuple[int, float, str]:
+    """单元排序: 数字单元按数值在前，其他 (如Unknown) 按字符串在后"""
+    if isinstance(unit, (int, float)) and not isinstance(unit, bool):
+        return (0, unit, "")
+    return (1, 0, str(unit))
+
+
+def _render_documents(batch: List[Tuple[str, str, Dict, str, str]]) -> List[Tuple[str, str]]:
+    """
+    渲染一批文档 (在渲染进程中执行)
+    
+    Args:
+        batch: [(相对路径, 模板名称, 上下文, 输出格式, 标题), ...]
+        
+    Returns:
+        [(相对路径, 文档内容), ...]
+    """
+    renderer = get_template_renderer()
+    return [
+        (relative_path, renderer.render(template, context, output_format, title=title))
+        for relative_path, template, context, output_format, title in batch
+    ]
+
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+
+
+def _render_workers() -> int:
+    """渲染进程数: processing.max_workers，不超过CPU核数"""
+    return max(1, min(int(config.get("processing.max_workers", 3)), os.cpu_count() or 1))
+
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    """共享的渲染进程池 (spawn方式启动，与Windows行为一致，也避免在多线程的Streamlit进程中fork)"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=_render_workers(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            atexit.register(_render_pool.shutdown, wait=False, cancel_futures=True)
+        return _render_pool
+
+
+class DocumentWriter:
+    """
+    后台写入线程 (write-behind)
+    
+    渲染完成的文档放入队列后立即返回，由写入线程原子写入磁盘，
+    写入成功后加入ZIP导出 (如果有) 并回调 (用于更新构建清单)。
+    """
+    
+    def __init__(self, on_written: Optional[Callable[[str], None]] = None,
+                 archive: Optional[StreamingZipExport] = None):
+        self.on_written = on_written
+        self.archive = archive
+        self.errors: List[Tuple[str, Exception]] = []
+        self._queue: "queue.Queue[Optional[Tuple[str, Path, str]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="document-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, key: str, file_path: Path, content: str):
+        self._queue.put((key, file_path, content))
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            key, file_path, content = item
+            try:
+                atomic_write(file_path, content)
+                if self.archive:
+                    self.archive.add_text(key, content)
+                if self.on_written:
+                    self.on_written(key)
+            except Exception as e:
+                print(f"[DocumentWriter] 写入失败: {file_path} - {e}")
+                self.errors.append((key, e))
+    
+    def close(self):
+        """等待队列中的文档全部写入"""
+        self._queue.put(None)
+        self._thread.join()
 
 
 class MarkdownGenerator:
     """Markdown文档生成器"""
     
-    def __init__(self, output_dir: str = "output"):
+    # 少于该数量的文档直接在当前进程渲染，进程间传输的开销不值得
+    PARALLEL_THRESHOLD = 32
+    
+    def __init__(self, output_dir: str = "output", incremental: bool = True):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
@@ -23,225 +269,282 @@ class MarkdownGenerator:
         (self.output_dir / "lessons").mkdir(exist_ok=True)
         (self.output_dir / "vocabulary").mkdir(exist_ok=True)
         (self.output_dir / "exercises").mkdir(exist_ok=True)
+        
+        # 增量构建: 输入未变化的文档不再重新生成
+        self.incremental = incremental
+        self.manifest = BuildManifest(self.output_dir / MANIFEST_FILENAME)
+        self.build_stats = {'written': 0, 'skipped': 0}
+        self._stats_lock = threading.Lock()
+        
+        self.renderer = get_template_renderer()
     
-    def generate_lesson_document(self, analysis_result: Dict, filename: Optional[str] = None) -> str:
+    def batch(self):
         """
-        生成课文文档
+        批量生成时使用，结束时只写入一次构建清单
+        
+        用法:
+            with generator.batch():
+                for result in results:
+                    generator.generate_lesson_document(result)
+        """
+        return self.manifest.batch()
+    
+    def _build(self, job: DocumentJob) -> str:
+        """
+        按需生成单个文档: 输入哈希与清单一致且文件存在时跳过
         
         Args:
-            analysis_result: AI分析结果
-            filename: 输出文件名
+            job: 待构建的文档
             
         Returns:
-            生成的文档路径
+            文档路径
+        """
+        file_path = self.output_dir / job.relative_path
+        input_hash = content_hash(job.inputs)
+        
+        if self.incremental and self.manifest.is_fresh(job.relative_path, input_hash, file_path):
+            with self._stats_lock:
+                self.build_stats['skipped'] += 1
+            return str(file_path)
+        
+        content = self.renderer.render(job.template, job.make_context(), job.output_format, title=job.title)
+        atomic_write(file_path, content)
+        
+        self.manifest.update(job.relative_path, input_hash)
+        with self._stats_lock:
+            self.build_stats['written'] += 1
+        return str(file_path)
+    
+    def bulk_build(self, jobs: List[DocumentJob], parallel: bool = True,
+                   archive: Optional[StreamingZipExport] = None) -> List[BuiltDocument]:
+        """
+        批量构建文档
+        
+        跳过输入未变化的文档，其余文档在渲染进程池中并行渲染，
+        渲染结果交给后台写入线程原子写入磁盘，内容同时保留在返回结果中。
+        
+        Args:
+            jobs: 待构建的文档列表 (由 lesson_job / vocabulary_job / exercise_job / index_job 创建)
+            parallel: 是否允许使用进程池
+            archive: ZIP导出，文档写入后随即加入压缩包
+            
+        Returns:
+            与jobs顺序一致的构建结果
+            
+        Raises:
+            IOError: 有文档生成上下文或写入失败 (其余文档仍会写入)
         """
+        documents = []
+        pending = []
+        hashes = {}
+        context_errors = []
+        
+        with self.batch():
+            for job in jobs:
+                file_path = self.output_dir / job.relative_path
+                input_hash = content_hash(job.inputs)
+                document = BuiltDocument(job.relative_path, str(file_path))
+                documents.append(document)
+                
+                if self.incremental and self.manifest.is_fresh(job.relative_path, input_hash, file_path):
+                    document.skipped = True
+                    if archive:
+                        archive.add_file(job.relative_path, str(file_path))
+                    continue
+                try:
+                    context = job.make_context()
+                except Exception as e:
+                    # 某个文档 (如索引) 的数据有问题时不影响其他文档写入
+                    print(f"[DocumentGenerator] 生成上下文失败: {job.relative_path} - {e}")
+                    context_errors.append((job.relative_path, e))
+                    continue
+                hashes[job.relative_path] = input_hash
+                pending.append((job.relative_path, job.template, context, job.output_format, job.title))
+            
+            by_path = {document.relative_path: document for document in documents}
+            writer = DocumentWriter(on_written=lambda key: self.manifest.update(key, hashes[key]), archive=archive)
+            try:
+                for relative_path, content in self._render_pending(pending, parallel):
+                    by_path[relative_path].content = content
+                    writer.submit(relative_path, self.output_dir / relative_path, content)
+            finally:
+                writer.close()
+        
+        if writer.errors:
+            key, error = writer.errors[0]
+            raise IOError(f"文档写入失败: {key} - {error}")
+        if context_errors:
+            key, error = context_errors[0]
+            raise IOError(f"文档生成失败: {key} - {error}")
+        
+        with self._stats_lock:
+            self.build_stats['written'] += len(pending)
+            self.build_stats['skipped'] += len(jobs) - len(pending)
+        get_metrics().cache('documents', hits=len(jobs) - len(pending), misses=len(pending))
+        print(f"[DocumentGenerator] 批量构建完成: 生成 {len(pending)} 个，跳过 {len(jobs) - len(pending)} 个")
+        return documents
+    
+    def _render_pending(self, pending: List[Tuple], parallel: bool):
+        """渲染待生成的文档，按完成顺序逐批产出 (相对路径, 内容)"""
+        if not parallel or len(pending) < self.PARALLEL_THRESHOLD or _render_workers() < 2:
+            yield from _render_documents(pending)
+            return
+        
+        try:
+            pool = _get_render_pool()
+            chunk_size = max(1, len(pending) // (_render_workers() * 4))
+            futures = [
+                pool.submit(_render_documents, pending[i:i + chunk_size])
+                for i in range(0, len(pending), chunk_size)
+            ]
+        except Exception as e:
+            print(f"[DocumentGenerator] 渲染进程池不可用，改为在当前进程渲染: {e}")
+            yield from _render_documents(pending)
+            return
+        
+        for future in as_completed(futures):
+            yield from future.result()
+    
+    def lesson_job(self, analysis_result: Dict, filename: Optional[str] = None,
+                   output_format: str = "markdown") -> DocumentJob:
+        """创建课文文档构建任务"""
         analysis = analysis_result.get('analysis', {})
         unit = analysis.get('unit', 'Unknown')
         title = analysis.get('title', '未命名课文')
         
         if filename is None:
             filename = f"Unit{unit}_{title}.md".replace(' ', '_')
+        filename = output_filename(filename, output_format)
+        
+        return DocumentJob(
+            relative_path=f"lessons/{filename}",
+            template="lesson",
+            output_format=output_format,
+            inputs={'format': output_format, 'result': analysis_result},
+            make_context=lambda: self._lesson_context(analysis_result),
+            title=f"Unit {unit}: {title}"
+        )
+    
+    def vocabulary_job(self, vocabulary_data: Dict[str, List[Dict]], filename: str = "vocabulary_summary.md",
+                       output_format: str = "markdown") -> DocumentJob:
+        """创建词汇汇总文档构建任务"""
+        return DocumentJob(
+            relative_path=f"vocabulary/{output_filename(filename, output_format)}",
+            template="vocabulary",
+            output_format=output_format,
+            inputs={'format': output_format, 'vocabulary': vocabulary_data},
+            make_context=lambda: self._vocabulary_context(vocabulary_data),
+            title="英语词汇汇总"
+        )
+    
+    def exercise_job(self, exercises: Dict, unit: int = 1, filename: Optional[str] = None,
+                     output_format: str = "markdown") -> DocumentJob:
+        """创建练习题文档构建任务"""
+        if filename is None:
+            filename = f"Unit{unit}_exercises.md"
         
-        # 生成Markdown内容
-        content = self._create_lesson_markdown(analysis_result)
-        
-        # 保存文件
-        file_path = self.output_dir / "lessons" / filename
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        return DocumentJob(
+            relative_path=f"exercises/{output_filename(filename, output_format)}",
+            template="exercises",
+            output_format=output_format,
+            inputs={'format': output_format, 'unit': unit, 'exercises': exercises},
+            make_context=lambda: self._exercise_context(exercises, unit),
+            title=f"Unit {unit} 练习题"
+        )
+    
+    def index_job(self, processed_files: List[Dict], output_format: str = "markdown") -> DocumentJob:
+        """创建总览索引文档构建任务"""
+        return DocumentJob(
+            relative_path=output_filename("README.md", output_format),
+            template="index",
+            output_format=output_format,
+            inputs={'format': output_format, 'files': processed_files},
+            make_context=lambda: self._index_context(processed_files),
+            title="English Learning Assistant - 文档索引"
+        )
+    
+    def generate_lesson_document(self, analysis_result: Dict, filename: Optional[str] = None,
+                                 output_format: str = "markdown") -> str:
+        """
+        生成课文文档
         
-        return str(file_path)
+        Args:
+            analysis_result: AI分析结果
+            filename: 输出文件名
+            output_format: 输出格式 (markdown / html)
+            
+        Returns:
+            生成的文档路径
+        """
+        # 分析结果未变化时跳过
+        return self._build(self.lesson_job(analysis_result, filename, output_format))
     
     def _create_lesson_markdown(self, analysis_result: Dict) -> str:
         """创建课文Markdown内容"""
+        return self.renderer.render_markdown("lesson", self._lesson_context(analysis_result))
+    
+    def _lesson_context(self, analysis_result: Dict) -> Dict[str, Any]:
+        """课文模板上下文"""
         analysis = analysis_result.get('analysis', {})
         
-        # 构建Markdown文档
-        md_content = []
-        
-        # 标题
-        unit = analysis.get('unit', 'Unknown')
-        title = analysis.get('title', '英语课文')
-        md_content.append(f"# Unit {unit}: {title}")
-        md_content.append("")
-        
-        # 基本信息
-        md_content.append("## 📋 课文信息")
-        md_content.append("")
-        md_content.append(f"- **单元**: Unit {unit}")
-        md_content.append(f"- **标题**: {title}")
-        md_content.append(f"- **类型**: {analysis.get('content_type', 'Unknown')}")
-        md_content.append(f"- **生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        md_content.append("")
-        
-        # 课文内容
-        md_content.append("## 📖 课文内容")
-        md_content.append("")
-        
-        # 原始OCR文本
-        if analysis_result.get('raw_ocr'):
-            md_content.append("### OCR识别原文")
-            md_content.append("```")
-            md_content.append(analysis_result['raw_ocr'])
-            md_content.append("```")
-            md_content.append("")
-        
-        # AI校正后文本
-        if analysis_result.get('corrected_text'):
-            md_content.append("### AI校正后课文")
-            md_content.append("")
-            for line in analysis_result['corrected_text'].split('\n'):
-                if line.strip():
-                    md_content.append(f"> {line}")
-            md_content.append("")
-        
-        # 内容概述
-        if analysis.get('main_content'):
-            md_content.append("### 内容概述")
-            md_content.append("")
-            md_content.append(analysis['main_content'])
-            md_content.append("")
-        
-        # 词汇表
-        vocabulary = analysis.get('vocabulary', [])
-        if vocabulary:
-            md_content.append("## 📚 词汇表")
-            md_content.append("")
-            md_content.append("| 英文单词 | 中文含义 | 难度等级 | 例句 |")
-            md_content.append("|----------|----------|----------|------|")
-            
-            for vocab in vocabulary:
-                word = vocab.get('word', '')
-                meaning = vocab.get('meaning', '')
-                level = vocab.get('level', 'middle')
-                example = vocab.get('example', '')
-                level_emoji = "🟢" if level == "primary" else "🟡"
-                md_content.append(f"| {word} | {meaning} | {level_emoji} {level} | {example} |")
-            
-            md_content.append("")
-        
-        # 语法点
-        grammar_points = analysis.get('grammar_points', [])
-        if grammar_points:
-            md_content.append("## 📝 语法要点")
-            md_content.append("")
-            for i, point in enumerate(grammar_points, 1):
-                md_content.append(f"{i}. {point}")
-            md_content.append("")
-        
-        # AI校正信息
-        corrections = analysis_result.get('corrections', [])
-        if corrections:
-            md_content.append("## 🔧 AI校正记录")
-            md_content.append("")
-            md_content.append("| 原文 | 校正后 | 校正原因 |")
-            md_content.append("|------|--------|----------|")
-            
-            for correction in corrections:
-                original = correction.get('original', '')
-                corrected = correction.get('corrected', '')
-                reason = correction.get('reason', '')
-                md_content.append(f"| {original} | {corrected} | {reason} |")
-            
-            md_content.append("")
-        
-        # 文档信息
-        confidence = analysis_result.get('confidence', 0)
-        md_content.append("## ℹ️ 文档信息")
-        md_content.append("")
-        md_content.append(f"- **识别置信度**: {confidence:.2%}")
-        md_content.append(f"- **处理方式**: AI增强OCR (PaddleOCR 3.1 + 智普AI)")
-        md_content.append(f"- **生成工具**: English Learning Assistant v1.1")
-        
-        return '\n'.join(md_content)
+        corrected_text = analysis_result.get('corrected_text')
+        corrected_lines = None
+        if corrected_text:
+            corrected_lines = [line for line in corrected_text.split('\n') if line.strip()]
+        
+        vocabulary = []
+        for vocab in analysis.get('vocabulary', []):
+            level = vocab.get('level', 'middle')
+            vocabulary.append({
+                'word': vocab.get('word', ''),
+                'meaning': vocab.get('meaning', ''),
+                'level': level,
+                'level_emoji': "🟢" if level == "primary" else "🟡",
+                'example': vocab.get('example', '')
+            })
+        
+        return {
+            'unit': analysis.get('unit', 'Unknown'),
+            'title': analysis.get('title', '英语课文'),
+            'content_type': analysis.get('content_type', 'Unknown'),
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'raw_ocr': analysis_result.get('raw_ocr'),
+            'corrected_lines': corrected_lines,
+            'main_content': analysis.get('main_content'),
+            'vocabulary': vocabulary,
+            'grammar_points': analysis.get('grammar_points', []),
+            'corrections': analysis_result.get('corrections', []),
+            'confidence': f"{analysis_result.get('confidence', 0):.2%}"
+        }
     
     def generate_vocabulary_document(self, vocabulary_data: Dict[str, List[Dict]], 
-                                   filename: str = "vocabulary_summary.md") -> str:
+                                   filename: str = "vocabulary_summary.md",
+                                   output_format: str = "markdown") -> str:
         """
         生成词汇汇总文档
         
         Args:
-            vocabulary_data: 词汇分级数据
+            vocabulary_data: 词汇分级数据 (可直接使用 aggregate_vocabulary() 的结果)
             filename: 输出文件名
+            output_format: 输出格式 (markdown / html)
             
         Returns:
             生成的文档路径
         """
-        md_content = []
-        
-        # 标题
-        md_content.append("# 📚 英语词汇汇总")
-        md_content.append("")
-        md_content.append(f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        md_content.append("")
-        
-        # 统计信息
-        primary_count = len(vocabulary_data.get('primary', []))
-        middle_count = len(vocabulary_data.get('middle', []))
-        total_count = primary_count + middle_count
-        
-        md_content.append("## 📊 词汇统计")
-        md_content.append("")
-        md_content.append(f"- **总词汇量**: {total_count}")
-        md_content.append(f"- **小学词汇**: {primary_count} 个")
-        md_content.append(f"- **中学词汇**: {middle_count} 个")
-        md_content.append("")
-        
-        # 小学词汇
-        primary_words = vocabulary_data.get('primary', [])
-        if primary_words:
-            md_content.append("## 🟢 小学词汇")
-            md_content.append("")
-            md_content.append("| 单词 | 中文含义 | 例句 |")
-            md_content.append("|------|----------|------|")
-            
-            for word_info in primary_words:
-                word = word_info.get('word', '')
-                meaning = word_info.get('meaning', '')
-                example = word_info.get('example', '')
-                md_content.append(f"| {word} | {meaning} | {example} |")
-            
-            md_content.append("")
-        
-        # 中学词汇
-        middle_words = vocabulary_data.get('middle', [])
-        if middle_words:
-            md_content.append("## 🟡 中学词汇")
-            md_content.append("")
-            md_content.append("| 单词 | 中文含义 | 例句 |")
-            md_content.append("|------|----------|------|")
-            
-            for word_info in middle_words:
-                word = word_info.get('word', '')
-                meaning = word_info.get('meaning', '')
-                example = word_info.get('example', '')
-                md_content.append(f"| {word} | {meaning} | {example} |")
-            
-            md_content.append("")
-        
-        # 学习建议
-        md_content.append("## 💡 学习建议")
-        md_content.append("")
-        md_content.append("### 🟢 小学词汇学习方法")
-        md_content.append("- 重点掌握基础含义和拼写")
-        md_content.append("- 通过例句理解使用场景")
-        md_content.append("- 多进行听说练习")
-        md_content.append("")
-        
-        md_content.append("### 🟡 中学词汇学习方法")
-        md_content.append("- 理解词汇的多重含义")
-        md_content.append("- 学习词汇搭配和固定用法")
-        md_content.append("- 注意词性变化和语法应用")
-        
-        # 保存文件
-        file_path = self.output_dir / "vocabulary" / filename
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(md_content))
-        
-        return str(file_path)
+        return self._build(self.vocabulary_job(vocabulary_data, filename, output_format))
+    
+    def _vocabulary_context(self, vocabulary_data: Dict[str, List[Dict]]) -> Dict[str, Any]:
+        """词汇模板上下文 (由VocabularyAggregator聚合的数据包含频次和覆盖率统计)"""
+        return {
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'primary': vocabulary_data.get('primary', []),
+            'middle': vocabulary_data.get('middle', []),
+            'stats': vocabulary_data.get('stats')
+        }
     
     def generate_exercise_document(self, exercises: Dict, unit: int = 1, 
-                                 filename: Optional[str] = None) -> str:
+                                 filename: Optional[str] = None,
+                                 output_format: str = "markdown") -> str:
         """
         生成练习题文档
         
@@ -249,197 +552,87 @@ class MarkdownGenerator:
             exercises: 习题数据
             unit: 单元编号
             filename: 输出文件名
+            output_format: 输出格式 (markdown / html)
             
         Returns:
             生成的文档路径
         """
-        if filename is None:
-            filename = f"Unit{unit}_exercises.md"
-        
-        md_content = []
-        
-        # 标题
-        md_content.append(f"# 📝 Unit {unit} 练习题")
-        md_content.append("")
-        md_content.append(f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        md_content.append("")
-        
-        # 中英互译题
-        translation_exercises = exercises.get('translation', [])
-        if translation_exercises:
-            md_content.append("## 🔄 中英互译题")
-            md_content.append("")
-            
-            for i, exercise in enumerate(translation_exercises, 1):
-                question = exercise.get('question', '')
-                answer = exercise.get('answer', '')
-                exercise_type = exercise.get('type', 'zh_to_en')
-                
-                type_label = "中译英" if exercise_type == "zh_to_en" else "英译中"
-                md_content.append(f"**第{i}题** ({type_label})")
-                md_content.append(f"题目：{question}")
-                md_content.append(f"答案：{answer}")
-                md_content.append("")
-        
-        # 字母填空题
-        letter_exercises = exercises.get('letter_filling', [])
-        if letter_exercises:
-            md_content.append("## 🔤 字母填空题")
-            md_content.append("")
-            
-            for i, exercise in enumerate(letter_exercises, 1):
-                question = exercise.get('question', '')
-                answer = exercise.get('answer', '')
-                
-                md_content.append(f"**第{i}题**")
-                md_content.append(f"题目：{question}")
-                md_content.append(f"答案：{answer}")
-                md_content.append("")
-        
-        # 短语填空题
-        phrase_exercises = exercises.get('phrase_filling', [])
-        if phrase_exercises:
-            md_content.append("## 📝 短语填空题")
-            md_content.append("")
-            
-            for i, exercise in enumerate(phrase_exercises, 1):
-                question = exercise.get('question', '')
-                answer = exercise.get('answer', '')
-                
-                md_content.append(f"**第{i}题**")
-                md_content.append(f"题目：{question}")
-                md_content.append(f"答案：{answer}")
-                md_content.append("")
-        
-        # 课文默写题
-        dictation_exercises = exercises.get('dictation', [])
-        if dictation_exercises:
-            md_content.append("## ✍️ 课文默写题")
-            md_content.append("")
-            md_content.append("根据中文提示，写出对应的英文句子：")
-            md_content.append("")
-            
-            for i, exercise in enumerate(dictation_exercises, 1):
-                chinese = exercise.get('chinese', '')
-                english = exercise.get('english', '')
-                
-                md_content.append(f"**第{i}段**")
-                md_content.append(f"中文提示：{chinese}")
-                md_content.append(f"英文答案：{english}")
-                md_content.append("")
-        
-        # 答题指导
-        md_content.append("## 💡 答题指导")
-        md_content.append("")
-        md_content.append("### 答题建议")
-        md_content.append("- 仔细阅读题目，理解要求")
-        md_content.append("- 注意单词拼写和语法正确性")
-        md_content.append("- 翻译题注意语言习惯差异")
-        md_content.append("- 默写题可以先列出关键词")
-        
-        # 保存文件
-        file_path = self.output_dir / "exercises" / filename
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(md_content))
-        
-        return str(file_path)
+        return self._build(self.exercise_job(exercises, unit, filename, output_format))
+    
+    def _exercise_context(self, exercises: Dict, unit: int) -> Dict[str, Any]:
+        """练习题模板上下文"""
+        return {
+            'unit': unit,
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'translation': exercises.get('translation', []),
+            'letter_filling': exercises.get('letter_filling', []),
+            'phrase_filling': exercises.get('phrase_filling', []),
+            'dictation': exercises.get('dictation', [])
+        }
     
-    def generate_summary_index(self, processed_files: List[Dict]) -> str:
+    def generate_summary_index(self, processed_files: List[Dict], output_format: str = "markdown") -> str:
         """
         生成总览索引文档
         
         Args:
             processed_files: 处理过的文件信息列表
+            output_format: 输出格式 (markdown / html)
             
         Returns:
             索引文档路径
         """
-        md_content = []
-        
-        # 标题
-        md_content.append("# 📚 English Learning Assistant - 文档索引")
-        md_content.append("")
-        md_content.append(f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        md_content.append(f"**处理文件数量**: {len(processed_files)}")
-        md_content.append("")
-        
-        # 统计信息
+        return self._build(self.index_job(processed_files, output_format))
+    
+    def _index_context(self, processed_files: List[Dict]) -> Dict[str, Any]:
+        """索引模板上下文，各单元分段按输入哈希复用"""
         units = set()
         total_vocabulary = 0
+        lessons_by_unit = {}
         
         for file_info in processed_files:
             analysis = file_info.get('analysis', {})
             if analysis.get('unit'):
                 units.add(analysis['unit'])
             total_vocabulary += len(analysis.get('vocabulary', []))
-        
-        md_content.append("## 📊 处理统计")
-        md_content.append("")
-        md_content.append(f"- **涉及单元**: {len(units)} 个")
-        md_content.append(f"- **总词汇量**: {total_vocabulary} 个")
-        md_content.append("")
-        
-        # 文档列表
-        md_content.append("## 📑 生成文档列表")
-        md_content.append("")
-        
-        # 按单元分组
-        lessons_by_unit = {}
-        for file_info in processed_files:
-            analysis = file_info.get('analysis', {})
-            unit = analysis.get('unit', 'Unknown')
-            if unit not in lessons_by_unit:
-                lessons_by_unit[unit] = []
-            lessons_by_unit[unit].append(file_info)
-        
-        for unit in sorted(lessons_by_unit.keys()):
-            md_content.append(f"### Unit {unit}")
-            md_content.append("")
-            
-            for file_info in lessons_by_unit[unit]:
-                analysis = file_info.get('analysis', {})
-                title = analysis.get('title', '未命名')
-                lesson_path = file_info.get('lesson_path', '')
-                exercise_path = file_info.get('exercise_path', '')
-                
-                md_content.append(f"**{title}**")
-                if lesson_path:
-                    md_content.append(f"- 📖 [课文文档]({lesson_path})")
-                if exercise_path:
-                    md_content.append(f"- 📝 [练习题]({exercise_path})")
-                md_content.append("")
-        
-        # 词汇汇总
-        md_content.append("## 📚 词汇文档")
-        md_content.append("- 📑 [词汇汇总](./vocabulary/vocabulary_summary.md)")
-        md_content.append("")
-        
-        # 使用说明
-        md_content.append("## 📖 使用说明")
-        md_content.append("")
-        md_content.append("本文档系统通过AI增强OCR技术自动生成，包含：")
-        md_content.append("")
-        md_content.append("1. **课文文档** - 包含OCR识别、AI校正、内容分析")
-        md_content.append("2. **词汇汇总** - 按难度分级的词汇表")
-        md_content.append("3. **练习题** - 多种题型的自动生成练习")
-        md_content.append("")
-        md_content.append("### 技术特点")
-        md_content.append("- 🤖 AI增强OCR识别（准确率提升30%+）")
-        md_content.append("- 🧠 智能内容分析和分类")
-        md_content.append("- 📝 自动习题生成")
-        md_content.append("- 📚 结构化文档输出")
-        
-        # 保存索引文件
-        file_path = self.output_dir / "README.md"
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(md_content))
-        
-        return str(file_path)
+            # AI分析失败的页面单元为None，归入Unknown
+            lessons_by_unit.setdefault(analysis.get('unit') or 'Unknown', []).append(file_info)
+        
+        return {
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'file_count': len(processed_files),
+            'unit_count': len(units),
+            'total_vocabulary': total_vocabulary,
+            'unit_sections': [
+                self._index_unit_section(unit, lessons_by_unit[unit])
+                for unit in sorted(lessons_by_unit.keys(), key=_unit_sort_key)
+            ]
+        }
+    
+    def _index_unit_section(self, unit: Any, file_infos: List[Dict]) -> str:
+        """生成索引中某个单元的分段，单元内容未变化时直接复用清单中的结果"""
+        key = f"README.md#unit-{unit}"
+        entries = [
+            {
+                'title': info.get('analysis', {}).get('title', '未命名'),
+                'lesson_path': info.get('lesson_path', ''),
+                'exercise_path': info.get('exercise_path', '')
+            }
+            for info in file_infos
+        ]
+        input_hash = content_hash(entries)
+        
+        cached = self.manifest.get(key)
+        if self.incremental and cached and cached.get('input_hash') == input_hash:
+            return cached['content']
+        
+        section = self.renderer.render_markdown("index_unit", {'unit': unit, 'entries': entries})
+        self.manifest.update(key, input_hash, content=section)
+        return section
 
 
-def create_document_generator(output_dir: str = "output") -> MarkdownGenerator:
+def create_document_generator(output_dir: str = "output", incremental: bool = True) -> MarkdownGenerator:
     """创建文档生成器实例"""
-    return MarkdownGenerator(output_dir)
+    return MarkdownGenerator(output_dir, incremental=incremental)
 
 
 # 提供别名以保持兼容性
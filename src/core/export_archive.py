@@ -0,0 +1,123 @@
+"""
+ZIP导出模块
+
+在文档生成的同时把文档逐个写入磁盘上的ZIP压缩包，内容按块压缩写入，
+内存占用与单个分块大小有关，而与文档总数无关。
+"""
+
+import os
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+from typing import List, Optional
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StreamingZipExport:
+    """
+    增量构建的ZIP导出
+
+    文档生成后调用 add_text / add_file 加入压缩包，全部完成后调用 close()，
+    压缩包先写在同一目录下唯一命名的临时文件中，关闭时原子替换为最终文件，
+    同一进程中多个导出同时写入时互不影响。
+    """
+
+    def __init__(self, archive_path: str, compresslevel: int = 6):
+        self.archive_path = Path(archive_path)
+        self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.archive_path.parent, prefix=f".{self.archive_path.name}.", suffix='.tmp')
+        os.close(fd)
+        os.chmod(temp_path, 0o644)  # mkstemp 创建的文件只有属主可读，与普通输出文件保持一致
+        self._temp_path = Path(temp_path)
+        try:
+            self._zip = zipfile.ZipFile(self._temp_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        except Exception:
+            os.unlink(self._temp_path)
+            raise
+        self._lock = threading.Lock()
+        self._names = set()
+        self.entries: List[str] = []
+        self.closed = False
+
+    def _reserve(self, arcname: str) -> bool:
+        if self.closed:
+            raise ValueError("压缩包已关闭")
+        if arcname in self._names:
+            return False
+        self._names.add(arcname)
+        self.entries.append(arcname)
+        return True
+
+    def add_text(self, arcname: str, content: str):
+        """
+        添加文本文档 (分块编码和压缩)
+
+        Args:
+            arcname: 压缩包内路径
+            content: 文档内容
+        """
+        with self._lock:
+            if not self._reserve(arcname):
+                return
+            with self._zip.open(arcname, 'w') as entry:
+                for start in range(0, len(content), CHUNK_SIZE):
+                    entry.write(content[start:start + CHUNK_SIZE].encode('utf-8'))
+
+    def add_file(self, arcname: str, file_path: str):
+        """
+        添加磁盘上已有的文件 (按块读取，不整体载入内存)
+
+        Args:
+            arcname: 压缩包内路径
+            file_path: 文件路径
+        """
+        with self._lock:
+            if not self._reserve(arcname):
+                return
+            self._zip.write(file_path, arcname)
+
+    def close(self) -> Path:
+        """
+        完成压缩包
+
+        Returns:
+            压缩包路径
+        """
+        with self._lock:
+            if not self.closed:
+                self._zip.close()
+                os.replace(self._temp_path, self.archive_path)
+                self.closed = True
+        return self.archive_path
+
+    def abort(self):
+        """放弃压缩包并删除临时文件"""
+        with self._lock:
+            if not self.closed:
+                self._zip.close()
+                self.closed = True
+                try:
+                    os.unlink(self._temp_path)
+                except OSError:
+                    pass
+
+    def __enter__(self) -> "StreamingZipExport":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def read_archive(archive_path: str) -> Optional[bytes]:
+    """读取压缩包内容 (供下载按钮在点击时调用)，文件不存在时返回None"""
+    try:
+        with open(archive_path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
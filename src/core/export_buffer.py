@@ -0,0 +1,188 @@
+"""
+导出缓冲模块
+
+每处理完一页就把该页的导出段落追加到磁盘上的缓冲文件，并记录偏移索引，
+处理结束时导出文档即已就绪，点击导出只需拼接一个很小的文件头。
+"""
+
+import json
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+from ..utils.config import config
+from .result_store import PageResult
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ExportBuffer:
+    """
+    只追加的导出缓冲
+
+    body.md 按处理顺序保存每页的导出段落，index.jsonl 每行记录一页的
+    (页面键, 序号, 偏移, 长度)。同一页重新处理时追加新段落并沿用原序号，
+    导出时按序号读取每页最新的段落。
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        if directory is None:
+            base = Path(config.get("paths.temp_dir", "./temp")) / "export_buffers"
+            base.mkdir(parents=True, exist_ok=True)
+            directory = tempfile.mkdtemp(prefix="export_", dir=str(base))
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.body_path = self.directory / "body.md"
+        self.index_path = self.directory / "index.jsonl"
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._size = 0
+        self._load()
+
+    def _load(self):
+        """
+        从已有的索引恢复 (例如会话恢复)
+
+        写了一半的最后一行索引，以及已追加到正文但还没写入索引的段落 (两次写入之间中断)
+        都会被截掉，之后追加的段落紧接在索引记录的最后一段之后。
+        """
+        if self.index_path.exists():
+            valid = 0
+            with open(self.index_path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    self._entries[entry['key']] = entry
+                    valid += len(line)
+            if valid < self.index_path.stat().st_size:
+                with open(self.index_path, 'r+b') as f:
+                    f.truncate(valid)
+
+        self._size = max((e['offset'] + e['length'] for e in self._entries.values()), default=0)
+        if self.body_path.exists() and self.body_path.stat().st_size > self._size:
+            with open(self.body_path, 'r+b') as f:
+                f.truncate(self._size)
+
+    @property
+    def page_count(self) -> int:
+        return len(self._entries)
+
+    def append(self, key: str, filename: str, text: str, source_info: str) -> int:
+        """
+        追加一页的导出段落
+
+        Args:
+            key: 页面唯一键 (同一页重新处理时沿用)
+            filename: 文件名
+            text: 识别文本
+            source_info: 文本来源说明
+
+        Returns:
+            页面序号
+        """
+        with self._lock:
+            existing = self._entries.get(key)
+            number = existing['number'] if existing else len(self._entries) + 1
+
+            section = "\n".join([
+                f"## {number}. {filename}",
+                f"**文本来源**: {source_info}",
+                "",
+                "### 识别文本:",
+                text,
+                "",
+                "---",
+                ""
+            ]) + "\n"
+            data = section.encode('utf-8')
+
+            with open(self.body_path, 'ab') as f:
+                f.write(data)
+            entry = {'key': key, 'number': number, 'offset': self._size, 'length': len(data)}
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+            self._entries[key] = entry
+            self._size += len(data)
+            return number
+
+    def append_page(self, page: PageResult) -> int:
+        """
+        追加一页处理结果
+
+        Args:
+            page: 单页识别结果 (以页面ID作为页面键)
+        """
+        return self.append(page.page_id, page.filename, page.text or "无文本内容", page.text_source)
+
+    def header(self, version: str = "") -> str:
+        """导出文档头 (导出时间和页数在导出时生成)"""
+        return "\n".join([
+            "# 英语学习助手 - 文本识别结果",
+            f"**导出时间**: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"**导出版本**: {version}",
+            f"**成功处理**: {self.page_count} 个文件",
+            ""
+        ]) + "\n"
+
+    def iter_export(self, version: str = "") -> Iterator[bytes]:
+        """按块产出完整的导出文档"""
+        # 已写入的段落不会再被修改，只需在锁内取索引快照，读取时不阻塞追加
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: e['number'])
+            header = self.header(version)
+
+        yield header.encode('utf-8')
+        if not entries:
+            return
+
+        with open(self.body_path, 'rb') as f:
+            for entry in entries:
+                f.seek(entry['offset'])
+                remaining = entry['length']
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+
+    def export_bytes(self, version: str = "") -> bytes:
+        """完整的导出文档"""
+        return b"".join(self.iter_export(version))
+
+    def export_size(self) -> int:
+        """导出文档正文大小 (字节，不含文件头)"""
+        return sum(e['length'] for e in self._entries.values())
+
+    def clear(self):
+        """清空缓冲 (开始新一轮处理时调用)"""
+        with self._lock:
+            for path in (self.body_path, self.index_path):
+                path.unlink(missing_ok=True)
+            self._entries = {}
+            self._size = 0
+
+    def delete(self):
+        """删除缓冲目录"""
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._entries = {}
+            self._size = 0
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[PageResult]) -> "ExportBuffer":
+        """从已保存的结果重建缓冲 (用于没有在处理过程中维护缓冲的结果)"""
+        buffer = cls()
+        for page in pages:
+            buffer.append_page(page)
+        return buffer
@@ -0,0 +1,187 @@
+"""
+文件夹增量扫描模块
+
+用 os.scandir 递归扫描教材图片文件夹 (目录项自带文件类型，不需要逐个判断)，
+与清单中记录的 (大小, 修改时间, 内容哈希) 比较，只报告新增或内容变化的文件。
+大小和修改时间都没变的文件不读取内容；只有二者变化时才计算哈希确认内容是否真的改变。
+
+清单保存在 paths.cache_dir/folder_manifests/ 下，每个扫描根目录一个文件。
+文件处理成功后才写入清单，处理失败或未处理的文件下次扫描仍会报告。
+"""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from ..utils.config import config
+from .pdf_pages import PDF_SUPPORTED
+
+
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.bmp', '.tiff'} | ({'.pdf'} if PDF_SUPPORTED else set()))
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+Entry = Tuple[int, int, str]  # (字节数, 修改时间ns, SHA-256)
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """分块计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_files(root: Union[str, Path], extensions=IMAGE_EXTENSIONS) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    递归列出扩展名匹配的文件 (跳过隐藏目录和文件)
+
+    Yields:
+        (相对根目录的路径, stat结果)
+    """
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in extensions:
+                            yield os.path.relpath(entry.path, root), entry.stat()
+                    except OSError as e:
+                        print(f"[文件夹扫描] 无法读取 {entry.path}: {e}")
+        except OSError as e:
+            print(f"[文件夹扫描] 无法打开目录 {directory}: {e}")
+
+
+@dataclass
+class ScanResult:
+    """一次扫描的结果 (路径均为绝对路径，按文件名排序)"""
+    root: str
+    new: List[Path] = field(default_factory=list)
+    modified: List[Path] = field(default_factory=list)
+    unchanged: int = 0
+    removed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def changed(self) -> List[Path]:
+        """需要处理的文件"""
+        return sorted(self.new + self.modified)
+
+    @property
+    def total(self) -> int:
+        return len(self.new) + len(self.modified) + self.unchanged
+
+    def summary(self) -> str:
+        return (f"共 {self.total} 个文件, 新增 {len(self.new)} 个, 修改 {len(self.modified)} 个, "
+                f"未变 {self.unchanged} 个, 已删除 {self.removed} 个, 耗时 {self.elapsed:.2f}s")
+
+
+class FolderManifest:
+    """
+    一个扫描根目录的文件清单
+
+    Args:
+        root: 扫描的根目录
+        manifest_path: 清单文件，默认为 paths.cache_dir/folder_manifests/{根目录哈希}.json
+    """
+
+    def __init__(self, root: Union[str, Path], manifest_path: Optional[Union[str, Path]] = None):
+        self.root = os.path.abspath(root)
+        if manifest_path is None:
+            key = hashlib.sha256(self.root.encode('utf-8')).hexdigest()[:16]
+            manifest_path = Path(config.get("paths.cache_dir", "./cache")) / "folder_manifests" / f"{key}.json"
+        self.path = Path(manifest_path)
+        self.entries: Dict[str, Entry] = self._load()
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Entry]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if data.get('version') != MANIFEST_VERSION or data.get('root') != self.root:
+            return {}
+        return {name: tuple(entry) for name, entry in data.get('files', {}).items()}
+
+    def save(self):
+        """原子写入清单 (没有变化时不写入)"""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'root': self.root, 'files': self.entries}, f)
+        os.replace(temp_path, self.path)
+        self._dirty = False
+
+    def scan(self) -> ScanResult:
+        """
+        扫描根目录，找出新增和内容变化的文件
+
+        大小和修改时间没变的文件视为未变；只修改了时间而内容哈希相同的文件更新清单后也视为未变。
+        已从磁盘删除的文件从清单中移除。
+        """
+        start = time.time()
+        result = ScanResult(root=self.root)
+        seen = set()
+        for name, stat in scan_files(self.root):
+            seen.add(name)
+            known = self.entries.get(name)
+            if known is None:
+                result.new.append(Path(self.root, name))
+                continue
+            if known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+                result.unchanged += 1
+                continue
+            try:
+                digest = file_digest(os.path.join(self.root, name))
+            except OSError as e:
+                print(f"[文件夹扫描] 读取失败: {name} - {e}")
+                continue
+            if digest == known[2]:
+                self.entries[name] = (stat.st_size, stat.st_mtime_ns, digest)
+                self._dirty = True
+                result.unchanged += 1
+            else:
+                result.modified.append(Path(self.root, name))
+
+        removed = self.entries.keys() - seen
+        for name in removed:
+            del self.entries[name]
+        result.removed = len(removed)
+        self._dirty |= bool(removed)
+        self.save()
+
+        result.new.sort()
+        result.modified.sort()
+        result.elapsed = time.time() - start
+        print(f"[文件夹扫描] {self.root}: {result.summary()}")
+        return result
+
+    def mark(self, path: Union[str, Path]):
+        """记录文件已处理 (下次扫描不再报告，直到文件内容改变)"""
+        name = os.path.relpath(os.path.abspath(path), self.root)
+        try:
+            stat = os.stat(path)
+            self.entries[name] = (stat.st_size, stat.st_mtime_ns, file_digest(path))
+            self._dirty = True
+        except OSError as e:
+            print(f"[文件夹扫描] 无法记录 {name}: {e}")
+
+    def reset(self):
+        """清空清单，下次扫描报告所有文件"""
+        self.entries = {}
+        self._dirty = True
+        self.save()
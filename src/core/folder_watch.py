@@ -0,0 +1,506 @@
+"""
+文件夹监视模块
+
+持续监视教材照片文件夹，新照片写入完成后自动识别、AI分析并更新输出文档和索引，
+不需要打开应用点击"扫描文件夹"。
+
+- 文件事件来自watchdog (Linux上为inotify)，未安装watchdog或指定 --poll 时定期扫描文件夹
+- 同一文件的连续事件合并: 最后一次事件后等待 watch.debounce_seconds，
+  且大小和修改时间与事件时相同 (文件已写完) 才开始处理
+- 已写完的文件成组处理，页面按 processing.batch_size 分批整批上传 (GitHub图床每批一次提交)，
+  最多 watch.workers 组同时处理，其余文件留在等待队列中
+- 删除或移走的文件从索引和词汇汇总中移除，对应的课文文档一并删除
+- 启动时先按文件夹清单 (folder_scan) 处理监视停止期间新增或修改的文件
+
+使用方式:
+    python -m src.core.folder_watch 照片文件夹 --output ./output
+"""
+
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..utils.config import config
+from .document_generator import atomic_write, create_document_generator
+from .folder_scan import IMAGE_EXTENSIONS, FolderManifest, scan_files
+from .image_blob import ImageBlob
+from .image_hosts import get_image_host
+from .metrics import get_metrics
+from .pdf_pages import PDFDocument
+from .result_store import PageResult, get_result_store
+from .vocabulary import VocabularyAggregator
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+WATCHDOG_SUPPORTED = Observer is not None
+TICK_SECONDS = 0.5
+STATE_FILENAME = ".watch_index.json"
+
+
+@dataclass
+class PendingFile:
+    """等待写入完成的文件"""
+    last_event: float
+    stat: Optional[Tuple[int, int]] = None  # 上次检查时的 (字节数, 修改时间ns)
+
+
+@dataclass
+class FileProgress:
+    """一个文件的处理结果 (各页的索引条目和增强结果)"""
+    relative_path: str
+    entries: List[Dict] = field(default_factory=list)
+    results: List[Dict] = field(default_factory=list)
+    ok: bool = True
+    start: float = field(default_factory=time.time)
+
+
+class _EventHandler(FileSystemEventHandler):
+    """把watchdog文件事件转交给监视器"""
+
+    def __init__(self, watcher: "FolderWatcher"):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_deleted(self, event):
+        self.watcher.forget(event.src_path)
+
+    def on_moved(self, event):
+        self.watcher.forget(event.src_path)
+        if not event.is_directory:
+            self.watcher.notify(event.dest_path)
+
+
+class FolderWatcher:
+    """
+    文件夹监视器
+
+    Args:
+        root: 监视的文件夹 (包括子文件夹)
+        output_dir: 文档输出目录
+        workers: 同时处理的文件数，默认使用 watch.workers
+        use_polling: 定期扫描文件夹而不使用文件事件
+    """
+
+    def __init__(self, root: str, output_dir: Optional[str] = None, workers: Optional[int] = None,
+                 use_polling: Optional[bool] = None):
+        self.root = os.path.abspath(root)
+        self.output_dir = output_dir or config.get("paths.output_base", "./output")
+        self.workers = max(1, workers or config.get("watch.workers", 2))
+        self.debounce = config.get("watch.debounce_seconds", 2.0)
+        self.poll_interval = config.get("watch.poll_interval", 2.0)
+        self.rebuild_interval = config.get("watch.rebuild_interval", 2.0)
+        self.doc_format = config.get("watch.doc_format", "markdown")
+        if use_polling is None:
+            use_polling = config.get("watch.use_polling", False)
+        self.use_polling = use_polling or not WATCHDOG_SUPPORTED
+
+        self.manifest = FolderManifest(self.root)
+        self.state_path = Path(self.output_dir) / STATE_FILENAME
+        self.entries: Dict[str, List[Dict]] = self._load_state()  # 文件相对路径 -> 各页的索引条目
+
+        self.pending: Dict[str, PendingFile] = {}
+        self.in_flight = set()
+        self.batch_size = max(1, config.get("processing.batch_size", 5))
+        self._groups = 0  # 正在处理的文件组数
+        self._removed = bool(self.entries)  # 有文件被删除或移走，重建时清理条目 (启动时检查一次)
+        self.processed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._completed: List[Tuple[str, List[Dict], List[Dict]]] = []  # (文件, 索引条目, 增强结果)
+        self._last_build = 0.0
+        self._stop = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._observer = None
+        self._poll_stats: Dict[str, Tuple[int, int]] = {}
+
+        self.doc_generator = create_document_generator(self.output_dir)
+        self.vision_processor = None
+        self.ai_ocr = None
+
+    def _load_state(self) -> Dict[str, List[Dict]]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        return data.get('files', {}) if data.get('root') == self.root else {}
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.state_path, json.dumps({'root': self.root, 'files': self.entries}, ensure_ascii=False))
+
+    @property
+    def queue_depth(self) -> int:
+        """等待写入完成或等待处理的文件数"""
+        with self._lock:
+            return len(self.pending)
+
+    # ---- 文件事件 ----
+
+    def notify(self, path: str):
+        """记录文件变化 (来自文件事件或定期扫描)，合并同一文件的连续事件"""
+        if os.path.splitext(path)[1].lower() not in IMAGE_EXTENSIONS or os.path.basename(path).startswith('.'):
+            return
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            pending = self.pending.setdefault(path, PendingFile(time.time()))
+            pending.last_event = time.time()
+            pending.stat = (stat.st_size, stat.st_mtime_ns)
+
+    def forget(self, path: str):
+        """记录文件或文件夹被删除或移走，下次重建时移除已经不存在的文件的条目"""
+        path = os.path.abspath(path)
+        with self._lock:
+            self.pending.pop(path, None)
+            self._removed = True
+
+    def _poll(self):
+        """定期扫描: 大小或修改时间变化的文件视为有事件，消失的文件视为已删除"""
+        current = {}
+        for name, stat in scan_files(self.root):
+            path = os.path.join(self.root, name)
+            current[path] = (stat.st_size, stat.st_mtime_ns)
+            if self._poll_stats.get(path) != current[path]:
+                self.notify(path)
+        for path in self._poll_stats.keys() - current.keys():
+            self.forget(path)
+        self._poll_stats = current
+
+    def _ready_files(self) -> List[str]:
+        """最后一次事件后已等待足够时间、且两次检查之间没有再变化的文件"""
+        now = time.time()
+        ready = []
+        with self._lock:
+            for path, pending in list(self.pending.items()):
+                if path in self.in_flight or now - pending.last_event < self.debounce:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    del self.pending[path]  # 文件已被删除或移走
+                    continue
+                current = (stat.st_size, stat.st_mtime_ns)
+                if current != pending.stat or stat.st_size == 0:
+                    # 事件之后仍在写入: 记录本次状态，再等待一个间隔
+                    pending.stat = current
+                    pending.last_event = now
+                    continue
+                ready.append(path)
+        return ready
+
+    # ---- 处理流水线 ----
+
+    def _init_processors(self):
+        from .ai_analyzer import create_ai_enhanced_ocr
+        from .vision_processor import create_vision_processor
+        self.vision_processor = create_vision_processor()
+        self.ai_ocr = create_ai_enhanced_ocr()
+
+    def _page_name(self, relative_path: str) -> str:
+        """子文件夹中的同名文件用相对路径区分，避免课文文档互相覆盖"""
+        return relative_path.replace(os.sep, '_').replace('/', '_')
+
+    def _iter_pages(self, path: str, name: str):
+        if path.lower().endswith('.pdf'):
+            with PDFDocument(path, name=name) as document:
+                yield from document.iter_pages()
+        else:
+            yield ImageBlob(Path(path).read_bytes(), name).normalized()
+
+    def _iter_group_pages(self, files: Dict[str, FileProgress]) -> Iterator[Tuple[str, ImageBlob]]:
+        """依次产生一组文件的所有页面，读取失败的文件记为失败后继续下一个文件"""
+        for path, progress in files.items():
+            try:
+                for blob in self._iter_pages(path, self._page_name(progress.relative_path)):
+                    yield path, blob
+            except Exception as e:
+                print(f"[文件夹监视] 读取失败: {progress.relative_path} - {e}")
+                progress.ok = False
+
+    def _process_files(self, paths: List[str]):
+        """
+        识别 → AI分析一组文件的所有页面，结果交给调度线程生成文档
+
+        页面按 processing.batch_size 分批裁剪后整批上传 (GitHub图床每批只有一次提交)，
+        同时只在内存中保留一批页面。
+        """
+        files = {path: FileProgress(os.path.relpath(path, self.root)) for path in paths}
+        pages = self._iter_group_pages(files)
+        metrics = get_metrics()
+        try:
+            while True:
+                batch = list(itertools.islice(pages, self.batch_size))
+                if not batch:
+                    break
+                images = []
+                crop_boxes = []
+                for _, blob in batch:
+                    with metrics.timer('crop'):
+                        image, crop_box = self.vision_processor.crop_page(blob)
+                    images.append(image)
+                    crop_boxes.append(crop_box)
+                try:
+                    with metrics.timer('upload'):
+                        image_urls = get_image_host().upload_many(images)
+                except Exception as e:
+                    # 上传失败的页面在识别时单独上传
+                    print(f"[文件夹监视] 批量上传失败: {e}")
+                    image_urls = [None] * len(images)
+
+                for (path, blob), image, crop_box, image_url in zip(batch, images, crop_boxes, image_urls):
+                    try:
+                        self._process_page(files[path], path, blob, image, crop_box, image_url)
+                    except Exception as e:
+                        print(f"[文件夹监视] 处理失败: {blob.name} - {e}")
+                        metrics.page_done(False)
+                        files[path].ok = False
+                # 读取下一批之前释放这一批页面
+                del images, batch
+        finally:
+            with self._lock:
+                self._groups -= 1
+                for path, progress in files.items():
+                    self.in_flight.discard(path)
+                    if progress.ok:
+                        self.processed += 1
+                        self.manifest.mark(path)
+                    else:
+                        self.failed += 1
+                    if progress.results:
+                        self._completed.append((progress.relative_path, progress.entries, progress.results))
+            for progress in files.values():
+                print(f"[文件夹监视] {'完成' if progress.ok else '部分失败'}: {progress.relative_path} "
+                      f"({len(progress.results)} 页, {time.time() - progress.start:.1f}s)")
+
+    def _process_page(self, progress: FileProgress, path: str, blob: ImageBlob, image: ImageBlob,
+                      crop_box: Optional[List[int]], image_url: Optional[str]):
+        """识别和分析已裁剪、已上传的一页"""
+        metrics = get_metrics()
+        with metrics.timer('vision'):
+            vision_result = self.vision_processor.process_image(image_url or image, uploaded_file=None, crop=False)
+        if not vision_result['success']:
+            print(f"[文件夹监视] 视觉识别失败: {blob.name} - {vision_result.get('error', '未知错误')}")
+            metrics.page_done(False)
+            progress.ok = False
+            return
+        with metrics.timer('ai'):
+            enhanced = self.ai_ocr.process_image_with_ai(vision_result, f"英语教材 - {blob.name}")
+        enhanced.update({'filename': blob.name, 'filepath': path, 'url': image_url, 'crop_box': crop_box})
+        with metrics.timer('save'):
+            page = PageResult.from_processing(enhanced, 'watch')
+            get_result_store().put(page)
+        metrics.page_done(page.success)
+        if not page.success:
+            progress.ok = False
+            return
+        progress.results.append(enhanced)
+        progress.entries.append({'filename': blob.name, 'page_id': page.page_id, 'analysis': page.analysis})
+
+    def _dispatch(self):
+        """
+        把已写完的文件成组交给线程池 (每组不超过 processing.batch_size 个文件)，
+        同时处理的组不超过 workers 个
+        """
+        ready = self._ready_files()
+        while ready:
+            with self._lock:
+                if self._groups >= self.workers:
+                    return
+                group, ready = ready[:self.batch_size], ready[self.batch_size:]
+                for path in group:
+                    del self.pending[path]
+                    self.in_flight.add(path)
+                self._groups += 1
+            self._executor.submit(self._process_files, group)
+
+    def _prune_removed(self) -> bool:
+        """
+        移除源文件已不存在的条目，并删除对应的课文文档
+
+        Returns:
+            是否有条目被移除
+        """
+        with self._lock:
+            if not self._removed:
+                return False
+            self._removed = False
+        missing = [relative_path for relative_path in self.entries
+                   if not os.path.exists(os.path.join(self.root, relative_path))]
+        for relative_path in missing:
+            for entry in self.entries.pop(relative_path):
+                if entry.get('lesson_path'):
+                    try:
+                        os.unlink(Path(self.output_dir) / entry['lesson_path'])
+                    except OSError:
+                        pass
+            print(f"[文件夹监视] 文件已删除或移走，移除: {relative_path}")
+        return bool(missing)
+
+    def _rebuild_documents(self, force: bool = False):
+        """
+        为新识别的页面生成课文，移除已删除文件的条目，并更新词汇汇总和索引 (间隔不少于 watch.rebuild_interval 秒)
+
+        课文和汇总/索引分两次构建: 汇总或索引生成失败时课文照常写入、条目照常保存，
+        下次重建时再生成汇总和索引。
+        """
+        if not force and time.time() - self._last_build < self.rebuild_interval:
+            return
+        with self._lock:
+            completed, self._completed = self._completed, []
+            self.manifest.save()
+        removed = self._prune_removed()
+        if not completed:
+            if removed:
+                self._save_state()
+                self._last_build = time.time()
+                self._build_summary()
+            return
+
+        lesson_jobs = []
+        for relative_path, entries, results in completed:
+            for entry, enhanced in zip(entries, results):
+                lesson_job = self.doc_generator.lesson_job(enhanced, f"{Path(entry['filename']).stem}.md",
+                                                           self.doc_format)
+                entry['lesson_path'] = lesson_job.relative_path
+                lesson_jobs.append(lesson_job)
+        try:
+            with get_metrics().timer('documents'):
+                self.doc_generator.bulk_build(lesson_jobs, parallel=False)
+        except Exception as e:
+            # 其余课文已经写入，失败的课文在文件下次修改时重新生成
+            print(f"[文件夹监视] 课文生成失败: {e}")
+
+        for relative_path, entries, _ in completed:
+            # 修改过的文件整体替换原来的条目
+            self.entries[relative_path] = entries
+        self._save_state()
+        self._last_build = time.time()
+        self._build_summary()
+
+    def _build_summary(self):
+        """按所有条目更新词汇汇总和索引"""
+        vocabulary = VocabularyAggregator()
+        index_entries = []
+        for relative_path in sorted(self.entries):
+            for entry in self.entries[relative_path]:
+                analysis = entry['analysis']
+                vocabulary.add_page(entry['filename'], analysis.get('unit'), analysis.get('vocabulary', []))
+                index_entries.append({'analysis': analysis, 'lesson_path': entry.get('lesson_path', '')})
+        jobs = [
+            self.doc_generator.vocabulary_job(vocabulary.vocabulary_data(), output_format=self.doc_format),
+            self.doc_generator.index_job(index_entries, self.doc_format)
+        ]
+        try:
+            with get_metrics().timer('documents'):
+                self.doc_generator.bulk_build(jobs, parallel=False)
+        except Exception as e:
+            print(f"[文件夹监视] 词汇汇总或索引生成失败: {e}")
+
+    # ---- 启动和停止 ----
+
+    def start(self) -> "FolderWatcher":
+        """开始监视 (文件事件或定期扫描)，并把监视停止期间的变化加入队列"""
+        self._init_processors()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="folder-watch")
+
+        backlog = self.manifest.scan()
+        for path in backlog.changed:
+            self.notify(str(path))
+
+        if self.use_polling:
+            self._poll_stats = {os.path.join(self.root, name): (stat.st_size, stat.st_mtime_ns)
+                                for name, stat in scan_files(self.root)}
+        else:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.root, recursive=True)
+            self._observer.start()
+        mode = f"定期扫描 (每 {self.poll_interval}s)" if self.use_polling else "文件事件"
+        print(f"[文件夹监视] 开始监视 {self.root} ({mode}, {self.workers} 个并发, 待处理 {len(backlog.changed)} 个)")
+        return self
+
+    def run(self, until_idle: bool = False):
+        """
+        调度循环 (阻塞)
+
+        Args:
+            until_idle: 队列清空且文档更新完成后返回 (处理完积压文件即退出)
+        """
+        last_poll = time.time()
+        try:
+            while not self._stop.wait(TICK_SECONDS):
+                if self.use_polling and time.time() - last_poll >= self.poll_interval:
+                    self._poll()
+                    last_poll = time.time()
+                self._dispatch()
+                with self._lock:
+                    get_metrics().set_gauge('queue.depth', len(self.pending) + len(self.in_flight))
+                self._rebuild_documents()
+                if until_idle:
+                    with self._lock:
+                        idle = not self.pending and not self.in_flight and not self._completed
+                    if idle:
+                        break
+        finally:
+            self.stop()
+
+    def stop(self):
+        """停止监视，等待正在处理的文件完成后更新文档"""
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._rebuild_documents(force=True)
+            print(f"[文件夹监视] 已停止: 完成 {self.processed} 个文件, 失败 {self.failed} 个")
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="监视文件夹，自动识别新照片并更新文档")
+    parser.add_argument("folder", help="监视的照片文件夹")
+    parser.add_argument("--output", default=None, help="文档输出目录，默认使用 paths.output_base")
+    parser.add_argument("--workers", type=int, default=None, help="同时处理的文件数，默认使用 watch.workers")
+    parser.add_argument("--poll", action="store_true", help="定期扫描文件夹，不使用文件事件")
+    parser.add_argument("--once", action="store_true", help="处理完新增和修改的文件后退出")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.folder):
+        print(f"[文件夹监视] 文件夹不存在: {args.folder}")
+        raise SystemExit(1)
+
+    watcher = FolderWatcher(args.folder, output_dir=args.output, workers=args.workers,
+                            use_polling=True if args.poll else None).start()
+    try:
+        watcher.run(until_idle=args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+GitHub图床批量上传模块
+
+使用 Git Data API 上传一批图片: 并发创建blob，再为整批图片写入一个tree和一个提交，
+最后移动分支引用。与逐张调用 Contents API (每张一次提交，只能串行) 相比，
+一批图片的上传耗时基本不随数量线性增长。
+
+图片按内容哈希命名，上传前先查本地索引并用HEAD请求确认图床上已有同一文件，
+已上传过的图片不再重复上传。
+"""
+
+import base64
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from ..utils.config import config
+from .image_blob import ImageBlob, ImageInput, prepare_image
+
+
+UPLOAD_DIRECTORY = "temp_images"
+REF_UPDATE_ATTEMPTS = 6  # 分支被其他提交抢先移动时的最大提交次数
+
+
+class GitHubUploadError(Exception):
+    """GitHub API请求失败"""
+
+
+def hosted_path(digest: str, ext: str) -> str:
+    """图片在仓库中的路径 (按内容哈希命名，同一张图片路径不变)"""
+    return f"{UPLOAD_DIRECTORY}/{digest[:32]}.{ext}"
+
+
+class HostedImageIndex:
+    """
+    已上传图片的本地索引
+
+    以 "仓库:内容哈希" 为键记录仓库路径和raw地址的ETag。
+    保存为只追加的JSON Lines文件，删除记录追加 deleted 标记，载入时按顺序重放。
+    """
+
+    def __init__(self, index_path: str):
+        self.index_path = Path(index_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self):
+        if not self.index_path.exists():
+            return
+        lines = 0
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 忽略写了一半的行
+                lines += 1
+                if entry.get('deleted'):
+                    self._entries.pop(entry['key'], None)
+                else:
+                    self._entries[entry['key']] = entry
+        # 删除和更新记录较多时重写文件
+        if lines > 2 * len(self._entries) + 100:
+            self._rewrite()
+
+    def _rewrite(self):
+        temp_path = self.index_path.with_name(f".{self.index_path.name}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.index_path)
+
+    def _append(self, entry: Dict):
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def add(self, key: str, path: str, etag: Optional[str] = None):
+        """记录已上传的图片"""
+        entry = {'key': key, 'path': path, 'etag': etag, 'hosted_at': time.time()}
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing and existing['path'] == path and existing.get('etag') == etag:
+                return
+            if existing:
+                entry['hosted_at'] = existing['hosted_at']
+            self._entries[key] = entry
+            self._append(entry)
+
+    def hosted_times(self) -> Dict[str, float]:
+        """{仓库路径: 首次上传时间}"""
+        with self._lock:
+            return {entry['path']: entry['hosted_at'] for entry in self._entries.values()}
+
+    def discard_paths(self, paths: Sequence[str]):
+        """删除指向这些仓库路径的记录 (图床上的文件已被清理)"""
+        paths = set(paths)
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry['path'] in paths]:
+                del self._entries[key]
+                self._append({'key': key, 'deleted': True})
+
+    def discard(self, key: str):
+        """删除记录 (图床上的文件已不存在)"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._append({'key': key, 'deleted': True})
+
+
+class GitHubBatchUploader:
+    """
+    GitHub图床批量上传
+
+    upload_many() 的步骤:
+        1. 读取分支最新提交及其tree
+        2. 并发创建所有图片的blob
+        3. 以最新tree为基础创建包含整批图片的新tree
+        4. 创建一个提交并快进分支 (分支被其他上传抢先移动时基于新的提交重试)
+    """
+
+    def __init__(self, token: Optional[str] = None, max_workers: Optional[int] = None):
+        self.token = token or os.getenv("GITHUB_TOKEN")
+        self.api_base = config.get("github.api_url", "https://api.github.com").rstrip('/')
+        self.raw_base = config.get("github.raw_url", "https://raw.githubusercontent.com").rstrip('/')
+        self.owner = config.get("github.owner", "siqi-2025")
+        self.repo = config.get("github.repo", "English-girl-learning")
+        self.branch = config.get("github.branch", "main")
+        self.max_workers = max_workers or config.get("github.upload_workers", 8)
+        self.timeout = config.get("github.timeout", 30)
+        self.retry_times = config.get("github.retry_times", 3)
+        self.index = get_hosted_index()
+        self._local = threading.local()
+
+    @property
+    def repo_url(self) -> str:
+        return f"{self.api_base}/repos/{self.owner}/{self.repo}"
+
+    @property
+    def last_batch(self) -> Dict[str, int]:
+        """当前线程最近一批的上传/复用数量和上传字节数"""
+        return getattr(self._local, 'last_batch', {})
+
+    def index_key(self, digest: str) -> str:
+        return f"{self.owner}/{self.repo}/{self.branch}:{digest}"
+
+    def _session(self) -> requests.Session:
+        """每个线程一个会话 (复用连接)"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            # 不读取代理环境变量以避免SOCKS错误，无需临时修改os.environ (多线程下不安全)
+            session.trust_env = False
+            session.headers.update({
+                "Authorization": f"token {self.token}",
+                "Accept": "application/vnd.github.v3+json"
+            })
+            self._local.session = session
+        return session
+
+    def _request(self, method: str, path: str, expected: Sequence[int] = (200, 201), **kwargs) -> requests.Response:
+        """
+        调用GitHub API，限流和服务端错误时指数退避重试
+
+        Raises:
+            GitHubUploadError: 重试后仍失败，或返回了非预期的状态码
+        """
+        url = f"{self.repo_url}/{path}"
+        last_error = None
+        for attempt in range(self.retry_times):
+            try:
+                response = self._session().request(method, url, timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                last_error = str(e)
+            else:
+                if response.status_code in expected:
+                    return response
+                last_error = f"{response.status_code} - {response.text[:200]}"
+                if response.status_code != 429 and response.status_code < 500:
+                    break
+            if attempt < self.retry_times - 1:
+                time.sleep(0.5 * 2 ** attempt)
+        raise GitHubUploadError(f"{method} {path} 失败: {last_error}")
+
+    def raw_url(self, path: str) -> str:
+        """仓库文件的raw下载地址"""
+        return f"{self.raw_base}/{self.owner}/{self.repo}/{self.branch}/{path}"
+
+    def lookup(self, digest: str, path: str) -> bool:
+        """
+        图床上是否已有该图片
+
+        索引中有记录时发送带 If-None-Match 的条件HEAD请求 (304/200 表示仍存在)，
+        没有记录时用HEAD请求确认 (可能由其他会话上传)，确认存在后写入索引。
+        raw地址有CDN缓存，刚删除的文件短时间内仍可能返回200。
+
+        Returns:
+            已存在时返回True，不存在或无法确认时返回False (需要上传)
+        """
+        key = self.index_key(digest)
+        entry = self.index.get(key)
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        try:
+            response = self._session().head(self.raw_url(path), headers=headers, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"[GitHub图床] 检查已上传图片失败: {e}")
+            return False
+
+        if response.status_code in (200, 304):
+            etag = response.headers.get('ETag') or (entry or {}).get('etag')
+            self.index.add(key, path, etag)
+            return True
+        if entry and response.status_code == 404:
+            self.index.discard(key)
+        return False
+
+    def _create_blob(self, data: bytes) -> str:
+        payload = {"content": base64.b64encode(data).decode('ascii'), "encoding": "base64"}
+        return self._request('POST', "git/blobs", json=payload).json()['sha']
+
+    def head(self) -> Tuple[str, str]:
+        """分支最新提交的 (提交SHA, tree SHA)"""
+        ref = self._request('GET', f"git/ref/heads/{self.branch}").json()
+        commit_sha = ref['object']['sha']
+        commit = self._request('GET', f"git/commits/{commit_sha}").json()
+        return commit_sha, commit['tree']['sha']
+
+    def commit(self, entries: List[Dict], message: str) -> str:
+        """
+        把tree条目提交到分支 (sha为None的条目表示删除该路径)
+
+        Returns:
+            新提交的SHA
+        """
+        for attempt in range(REF_UPDATE_ATTEMPTS):
+            if attempt:
+                # 随机退避，避免多个批次同时重试再次冲突
+                time.sleep(random.uniform(0, 0.2 * 2 ** attempt))
+            parent, base_tree = self.head()
+            tree = self._request('POST', "git/trees", json={"base_tree": base_tree, "tree": entries}).json()
+            commit = self._request('POST', "git/commits", json={
+                "message": message, "tree": tree['sha'], "parents": [parent]
+            }).json()
+            response = self._request('PATCH', f"git/refs/heads/{self.branch}",
+                                     expected=(200, 422), json={"sha": commit['sha'], "force": False})
+            if response.status_code == 200:
+                return commit['sha']
+            if 'fast forward' not in response.text:
+                raise GitHubUploadError(f"更新分支失败: {response.text[:200]}")
+            # 422: 分支已被其他提交移动 (非快进)，基于新的分支头重建tree和提交
+            print(f"[GitHub图床] 分支已更新，重新提交 (尝试 {attempt + 1}/{REF_UPDATE_ATTEMPTS})")
+        raise GitHubUploadError("分支持续被其他提交更新，批量提交失败")
+
+    def list_hosted(self) -> Dict[str, str]:
+        """
+        列出图床目录中的文件 (读取分支最新tree，一次请求)
+
+        Returns:
+            {仓库路径: blob SHA}
+        """
+        _, tree_sha = self.head()
+        tree = self._request('GET', f"git/trees/{tree_sha}", params={"recursive": "1"}).json()
+        if tree.get('truncated'):
+            print(f"[GitHub图床] 仓库tree过大，列表不完整")
+        prefix = f"{UPLOAD_DIRECTORY}/"
+        return {
+            item['path']: item['sha'] for item in tree.get('tree', [])
+            if item.get('type') == 'blob' and item['path'].startswith(prefix)
+        }
+
+    def upload_many(self, images: Sequence[ImageInput]) -> List[Optional[str]]:
+        """
+        批量上传图片 (整批一个提交)
+
+        Args:
+            images: 图片列表 (ImageBlob、字节数据或文件路径)
+
+        Returns:
+            与输入顺序一致的raw地址列表，验证或上传失败的图片为None
+        """
+        urls: List[Optional[str]] = [None] * len(images)
+        self._local.last_batch = {}
+        if not images:
+            return urls
+        if not self.token:
+            print(f"[GitHub图床] ERROR: 未配置GitHub token，跳过GitHub上传")
+            return urls
+
+        # 同一批中内容相同的图片只处理一次
+        prepared: Dict[str, Tuple[ImageBlob, str, List[int]]] = {}  # 内容哈希 -> (图片, 仓库路径, 序号列表)
+        for index, image in enumerate(images):
+            try:
+                blob = prepare_image(image)
+            except (ValueError, OSError) as e:
+                print(f"[GitHub图床] 第{index + 1}张图片验证失败: {e}")
+                continue
+            if blob.digest in prepared:
+                prepared[blob.digest][2].append(index)
+            else:
+                prepared[blob.digest] = (blob, hosted_path(blob.digest, blob.ext), [index])
+        if not prepared:
+            return urls
+
+        start = time.time()
+        workers = max(1, min(self.max_workers, len(prepared)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # 先确认哪些图片已经在图床上，只为其余图片创建blob
+            hosted = dict(zip(prepared, executor.map(
+                lambda item: self.lookup(item[0], item[1][1]), prepared.items()
+            )))
+            pending = [digest for digest in prepared if not hosted[digest]]
+            futures = [executor.submit(self._create_blob, prepared[digest][0].data) for digest in pending]
+            blobs = []
+            for digest, future in zip(pending, futures):
+                try:
+                    blobs.append((digest, future.result()))
+                except GitHubUploadError as e:
+                    print(f"[GitHub图床] 第{prepared[digest][2][0] + 1}张图片blob创建失败: {e}")
+
+        commit_sha = None
+        if blobs:
+            entries = [{"path": prepared[digest][1], "mode": "100644", "type": "blob", "sha": sha}
+                       for digest, sha in blobs]
+            try:
+                commit_sha = self.commit(entries, f"Upload {len(entries)} temp images for GLM-4V-Flash processing")
+            except GitHubUploadError as e:
+                print(f"[GitHub图床] 批量提交失败: {e}")
+                blobs = []
+        for digest, _ in blobs:
+            self.index.add(self.index_key(digest), prepared[digest][1])
+            hosted[digest] = True
+
+        for digest, (_, path, indices) in prepared.items():
+            if hosted[digest]:
+                for index in indices:
+                    urls[index] = self.raw_url(path)
+        uploaded_bytes = sum(prepared[digest][0].size for digest, _ in blobs)
+        reused = len(prepared) - len(pending)
+        self._local.last_batch = {'uploaded': len(blobs), 'reused': reused, 'bytes': uploaded_bytes}
+        print(f"[GitHub图床] 批量上传完成: {sum(u is not None for u in urls)}/{len(images)} 张, "
+              f"复用 {reused} 张, 上传 {len(blobs)} 张 {uploaded_bytes/1024:.0f}KB"
+              f"{f', 提交 {commit_sha[:7]}' if commit_sha else ''}, 耗时 {time.time() - start:.2f}s")
+        return urls
+
+    def upload_one(self, image: ImageInput) -> Optional[str]:
+        """
+        上传单张图片 (已上传时直接返回地址，否则用Contents API一次请求完成上传和提交)
+
+        Args:
+            image: ImageBlob、图片字节数据或文件路径
+
+        Returns:
+            raw地址，失败时返回None
+        """
+        self._local.last_batch = {}
+        if not self.token:
+            print(f"[GitHub图床] ERROR: 未配置GitHub token，跳过GitHub上传")
+            return None
+        try:
+            blob = prepare_image(image)
+        except (ValueError, OSError) as e:
+            print(f"[GitHub图床] 图片验证失败: {e}")
+            return None
+
+        digest = blob.digest
+        path = hosted_path(digest, blob.ext)
+        if self.lookup(digest, path):
+            print(f"[GitHub图床] 图片已在图床上，跳过上传: {path}")
+            self._local.last_batch = {'uploaded': 0, 'reused': 1, 'bytes': 0}
+            return self.raw_url(path)
+
+        payload = {
+            "message": f"Upload temp image for GLM-4V-Flash processing: {path.split('/')[-1]}",
+            "content": base64.b64encode(blob.data).decode('ascii'),
+            "branch": self.branch
+        }
+        try:
+            response = self._request('PUT', f"contents/{path}", expected=(200, 201, 422), json=payload)
+            if response.status_code == 422:
+                # 路径按内容哈希命名，只有"文件已存在" (没有提供sha) 说明其他会话已上传同一内容，
+                # 还要确认raw地址可以访问；其他422 (路径无效、参数错误等) 是上传失败
+                message = response.json().get('message', '') if response.content else ''
+                if "\"sha\" wasn't supplied" not in message or not self.lookup(digest, path):
+                    raise GitHubUploadError(f"PUT contents/{path} 失败: 422 - {message[:200]}")
+                print(f"[GitHub图床] 图片已由其他会话上传: {path}")
+                self._local.last_batch = {'uploaded': 0, 'reused': 1, 'bytes': 0}
+                return self.raw_url(path)
+        except (GitHubUploadError, ValueError) as e:
+            print(f"[GitHub图床] 上传失败: {e}")
+            return None
+        self.index.add(self.index_key(digest), path)
+        self._local.last_batch = {'uploaded': 1, 'reused': 0, 'bytes': blob.size}
+        print(f"[GitHub图床] 上传成功: {path} ({blob.size/1024:.0f}KB)")
+        return self.raw_url(path)
+
+
+_default_index: Optional[HostedImageIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_hosted_index() -> HostedImageIndex:
+    """
+    获取共享的已上传图片索引
+
+    索引文件: paths.cache_dir/hosted_images.jsonl
+
+    Returns:
+        索引实例
+    """
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            cache_dir = Path(config.get("paths.cache_dir", "./cache"))
+            _default_index = HostedImageIndex(str(cache_dir / "hosted_images.jsonl"))
+        return _default_index
+
+
+def upload_images(images: Sequence[ImageInput]) -> List[Optional[str]]:
+    """
+    批量上传图片到GitHub图床
+
+    Args:
+        images: 图片列表 (ImageBlob、字节数据或文件路径)
+
+    Returns:
+        与输入顺序一致的raw地址列表，失败的图片为None
+    """
+    return GitHubBatchUploader().upload_many(images)
@@ -0,0 +1,232 @@
+"""
+图片读入模块
+
+上传文件、文件路径、PIL图像和numpy数组统一转换为不可变的 ImageBlob:
+字节数据只读入一次，格式和尺寸只解析一次文件头 (不解码像素)，内容哈希按需计算并缓存。
+验证、去重、上传、缩略图和识别请求共用同一个 ImageBlob，不再写临时文件或重复解码。
+"""
+
+import base64
+import hashlib
+import io
+import struct
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import Tuple, Union
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+
+MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+MAX_DIMENSION = 6000
+ALLOWED_FORMATS = {'JPEG': 'jpg', 'PNG': 'png'}
+MIME_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png'}
+CONVERTED_FORMATS = frozenset({'BMP', 'TIFF'})  # 从文件读入时无损转换为PNG
+PNG_MODES = frozenset({'1', 'L', 'LA', 'I', 'I;16', 'P', 'RGB', 'RGBA'})
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# JPEG帧起始标记 SOF0-SOF15 (C4 / C8 / CC 不是帧头)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _probe_jpeg(view: memoryview) -> Tuple[int, int]:
+    """按段跳过JPEG文件头直到帧起始标记，返回 (宽, 高)，找不到时返回 (0, 0)"""
+    offset = 2
+    while offset + 4 <= len(view):
+        if view[offset] != 0xFF:
+            break
+        marker = view[offset + 1]
+        if marker == 0xFF:  # 填充字节
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # 没有长度字段的标记
+            offset += 2
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            if offset + 9 > len(view):
+                break
+            height, width = struct.unpack('>HH', view[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + struct.unpack('>H', view[offset + 2:offset + 4])[0]
+    return 0, 0
+
+
+def probe_image(data: Union[bytes, memoryview]) -> Tuple[str, int, int]:
+    """
+    只解析文件头识别图片格式和尺寸
+
+    JPEG和PNG直接读取文件头，其他格式交给PIL (同样只解析文件头)。
+
+    Returns:
+        (格式, 宽, 高)，格式为PIL的格式名 (JPEG / PNG / GIF ...)
+
+    Raises:
+        ValueError: 无法识别的图片
+    """
+    view = memoryview(data)
+    if view[:8] == PNG_SIGNATURE and view[12:16] == b'IHDR' and len(view) >= 24:
+        width, height = struct.unpack('>II', view[16:24])
+        return 'PNG', width, height
+    if view[:2] == b'\xff\xd8':
+        width, height = _probe_jpeg(view)
+        if width and height:
+            return 'JPEG', width, height
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return img.format, img.size[0], img.size[1]
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"无法识别的图片: {e}")
+
+
+@dataclass(frozen=True, eq=False)
+class ImageBlob:
+    """
+    一张图片的字节数据和文件头信息
+
+    data 在创建后不再修改；format / width / height / digest 第一次访问时计算并缓存。
+    """
+
+    data: bytes = field(repr=False)
+    name: str = ""
+
+    @classmethod
+    def from_path(cls, path: Union[str, Path]) -> "ImageBlob":
+        """读取图片文件 (BMP / TIFF 转换为PNG)"""
+        path = Path(path)
+        return cls(path.read_bytes(), path.name).normalized()
+
+    @classmethod
+    def from_upload(cls, uploaded_file) -> "ImageBlob":
+        """Streamlit上传文件 (getvalue() 直接返回上传缓冲区的字节对象)"""
+        return cls(uploaded_file.getvalue(), getattr(uploaded_file, 'name', ''))
+
+    @classmethod
+    def from_image(cls, image: Image.Image, name: str = "", quality: int = 75) -> "ImageBlob":
+        """PIL图像在内存中编码为JPEG"""
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=quality)
+        return cls(buffer.getvalue(), name)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, name: str = "") -> "ImageBlob":
+        return cls.from_image(Image.fromarray(array), name)
+
+    @cached_property
+    def _header(self) -> Tuple[str, int, int]:
+        return probe_image(self.data)
+
+    @property
+    def format(self) -> str:
+        return self._header[0]
+
+    @property
+    def width(self) -> int:
+        return self._header[1]
+
+    @property
+    def height(self) -> int:
+        return self._header[2]
+
+    @property
+    def size(self) -> int:
+        """字节数"""
+        return len(self.data)
+
+    @property
+    def ext(self) -> str:
+        return ALLOWED_FORMATS.get(self.format, self.format.lower())
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES.get(self.format, f"image/{self.format.lower()}")
+
+    @cached_property
+    def digest(self) -> str:
+        """内容SHA-256"""
+        return hashlib.sha256(self.data).hexdigest()
+
+    def view(self) -> memoryview:
+        """只读视图，切片时不复制数据"""
+        return memoryview(self.data)
+
+    def open(self) -> Image.Image:
+        """解码为PIL图像 (BytesIO直接共享字节对象，不复制)"""
+        return Image.open(io.BytesIO(self.data))
+
+    def data_uri(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+    def normalized(self) -> "ImageBlob":
+        """
+        BMP / TIFF 无损转换为PNG (多页TIFF只取第一页)，其他格式原样返回
+
+        识别接口和图床只接受JPG、PNG，文件夹中的扫描件在读入时转换，不会每次处理都验证失败。
+        """
+        try:
+            if self.format not in CONVERTED_FORMATS:
+                return self
+        except ValueError:
+            return self
+        with self.open() as image:
+            if image.mode not in PNG_MODES:
+                image = image.convert('RGB')
+            buffer = io.BytesIO()
+            image.save(buffer, 'PNG')
+        return ImageBlob(buffer.getvalue(), self.name)
+
+    def validate(self) -> "ImageBlob":
+        """
+        检查大小、格式和尺寸
+
+        Returns:
+            自身，便于链式调用
+
+        Raises:
+            ValueError: 不符合要求
+        """
+        if self.size > MAX_FILE_SIZE:
+            raise ValueError(f"图片文件过大: {self.size/1024/1024:.1f}MB (限制5MB)")
+        if self.format not in ALLOWED_FORMATS:
+            raise ValueError(f"不支持的图片格式: {self.format} (仅支持JPG、JPEG、PNG)")
+        if self.width > MAX_DIMENSION or self.height > MAX_DIMENSION:
+            raise ValueError(f"图片尺寸过大: {self.width}x{self.height} (限制{MAX_DIMENSION}x{MAX_DIMENSION})")
+        return self
+
+
+ImageInput = Union[ImageBlob, bytes, str, Path, Image.Image, np.ndarray]
+
+
+def load_image(image) -> ImageBlob:
+    """
+    将各种图片输入转换为 ImageBlob (已经是 ImageBlob 时直接返回)
+
+    Args:
+        image: ImageBlob、字节数据、文件路径、Streamlit上传文件、PIL图像或numpy数组
+
+    Raises:
+        ValueError: 不支持的输入类型
+        OSError: 文件读取失败
+    """
+    if isinstance(image, ImageBlob):
+        return image
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return ImageBlob(bytes(image))
+    if isinstance(image, (str, Path)):
+        return ImageBlob.from_path(image)
+    if isinstance(image, Image.Image):
+        return ImageBlob.from_image(image)
+    if isinstance(image, np.ndarray):
+        return ImageBlob.from_array(image)
+    if hasattr(image, 'getvalue'):
+        return ImageBlob.from_upload(image)
+    raise ValueError(f"不支持的图像输入类型: {type(image)}")
+
+
+def prepare_image(image) -> ImageBlob:
+    """读取并验证图片 (上传前调用)，不符合要求时抛出 ValueError"""
+    return load_image(image).validate()
@@ -0,0 +1,228 @@
+"""
+图床临时图片清理模块
+
+找出GitHub图床 temp_images/ 中超过保留期限的图片 (设置 image_gc.delete_processed 时还包括
+对应页面已识别成功、且上传超过 image_gc.processed_min_age_hours 的图片)，
+在一个tree提交中批量删除，避免目录无限增长拖慢克隆和目录列表。
+
+已处理的图片默认保留到过期: raw地址有CDN缓存，刚删除的文件短时间内仍返回200，
+立即删除会让重新处理同一页时复用已失效的地址，缩略图回退到图床地址时也无法显示。
+
+使用方式:
+    python -m src.core.image_gc --ttl-hours 24 --dry-run
+
+应用内按 image_gc.background / image_gc.interval_minutes 在后台线程中定期运行。
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..utils.config import config
+from .github_upload import GitHubBatchUploader, GitHubUploadError
+from .result_store import get_result_store
+
+
+# 旧版本的文件名: temp_image_{timestamp}.jpg / temp_image_{timestamp}_{uuid}.jpg
+LEGACY_NAME_PATTERN = re.compile(r"temp_image_(\d{9,11})(?:_[0-9a-f]+)?\.\w+$")
+GC_BATCH_SIZE = 500  # 单个删除提交的最大文件数
+
+
+@dataclass
+class GCReport:
+    """一次清理的结果"""
+    hosted: int = 0
+    expired: List[str] = field(default_factory=list)
+    processed: List[str] = field(default_factory=list)
+    deleted: int = 0
+    commits: List[str] = field(default_factory=list)
+    dry_run: bool = False
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        if self.dry_run:
+            action = f"可删除 {len(self.expired) + len(self.processed)} 张"
+        else:
+            action = f"已删除 {self.deleted} 张, 提交 {len(self.commits)} 次"
+        return (f"图床图片 {self.hosted} 张, 过期 {len(self.expired)} 张, 已处理 {len(self.processed)} 张, "
+                f"{action}, 耗时 {self.elapsed:.2f}s")
+
+
+class HostedImageGC:
+    """
+    图床临时图片清理
+
+    图片的上传时间依次取自: 本地上传索引、旧版本文件名中的时间戳、
+    本机第一次看到该文件的时间 (记录在 paths.cache_dir/image_gc_seen.json，
+    其他机器上传且未知时间的图片从第一次看到起计算保留期限)。
+    """
+
+    def __init__(self, ttl_hours: Optional[float] = None, delete_processed: Optional[bool] = None,
+                 uploader: Optional[GitHubBatchUploader] = None):
+        self.ttl_seconds = (ttl_hours if ttl_hours is not None else config.get("image_gc.ttl_hours", 24)) * 3600
+        self.delete_processed = (delete_processed if delete_processed is not None
+                                 else config.get("image_gc.delete_processed", False))
+        self.processed_min_age_seconds = config.get("image_gc.processed_min_age_hours", 1) * 3600
+        self.uploader = uploader or GitHubBatchUploader()
+        self.seen_path = Path(config.get("paths.cache_dir", "./cache")) / "image_gc_seen.json"
+
+    def _load_seen(self) -> Dict[str, float]:
+        try:
+            with open(self.seen_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_seen(self, seen: Dict[str, float]):
+        self.seen_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.seen_path.with_name(f".{self.seen_path.name}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(seen, f)
+        os.replace(temp_path, self.seen_path)
+
+    def _hosted_times(self, paths: List[str], now: float) -> Dict[str, float]:
+        """每个图床文件的上传时间"""
+        indexed = self.uploader.index.hosted_times()
+        seen = self._load_seen()
+        times = {}
+        unknown = {}
+        for path in paths:
+            match = LEGACY_NAME_PATTERN.search(path)
+            if path in indexed:
+                times[path] = indexed[path]
+            elif match:
+                times[path] = float(match.group(1))
+            else:
+                times[path] = unknown[path] = seen.get(path, now)
+        # 只保留仍在图床上的未知文件
+        self._save_seen(unknown)
+        return times
+
+    def _processed_paths(self, paths: List[str], times: Dict[str, float], now: float) -> List[str]:
+        """对应页面已识别成功、且上传时间超过最短保留时间的图片"""
+        urls = get_result_store().processed_image_urls()
+        return [path for path in paths
+                if self.uploader.raw_url(path) in urls and now - times[path] >= self.processed_min_age_seconds]
+
+    def collect(self, dry_run: bool = False) -> GCReport:
+        """
+        执行一次清理
+
+        Args:
+            dry_run: 只列出可删除的图片，不提交
+
+        Returns:
+            清理结果
+        """
+        start = time.time()
+        report = GCReport(dry_run=dry_run)
+        if not self.uploader.token:
+            print(f"[图床清理] 未配置GitHub token，跳过清理")
+            return report
+
+        hosted = self.uploader.list_hosted()
+        paths = sorted(hosted)
+        report.hosted = len(paths)
+
+        now = time.time()
+        times = self._hosted_times(paths, now)
+        report.expired = [path for path in paths if now - times[path] > self.ttl_seconds]
+        if self.delete_processed:
+            expired = set(report.expired)
+            report.processed = [path for path in self._processed_paths(paths, times, now) if path not in expired]
+
+        doomed = report.expired + report.processed
+        if doomed and not dry_run:
+            for batch_start in range(0, len(doomed), GC_BATCH_SIZE):
+                batch = doomed[batch_start:batch_start + GC_BATCH_SIZE]
+                entries = [{"path": path, "mode": "100644", "type": "blob", "sha": None} for path in batch]
+                report.commits.append(self.uploader.commit(entries, f"Remove {len(batch)} temp images"))
+                report.deleted += len(batch)
+                self.uploader.index.discard_paths(batch)
+
+        report.elapsed = time.time() - start
+        print(f"[图床清理] {report.summary()}")
+        return report
+
+
+class ImageGCScheduler:
+    """后台定期清理 (守护线程)"""
+
+    def __init__(self, interval_minutes: float):
+        self.interval_seconds = max(60.0, interval_minutes * 60)
+        self.last_report: Optional[GCReport] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="image-gc", daemon=True)
+
+    def start(self) -> "ImageGCScheduler":
+        self._thread.start()
+        print(f"[图床清理] 后台清理已启动，每 {self.interval_seconds / 60:.0f} 分钟运行一次")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        # 启动后先等待一个周期，避免应用启动时与首批上传争抢分支
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.last_report = HostedImageGC().collect()
+            except (GitHubUploadError, OSError) as e:
+                print(f"[图床清理] 清理失败: {e}")
+
+
+_scheduler: Optional[ImageGCScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def start_image_gc() -> Optional[ImageGCScheduler]:
+    """
+    按配置启动后台清理 (每个进程只启动一次)
+
+    配置项: image_gc.background / image_gc.interval_minutes
+
+    Returns:
+        调度器实例，未启用时返回None
+    """
+    global _scheduler
+    if not config.get("image_gc.background", False):
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ImageGCScheduler(config.get("image_gc.interval_minutes", 360)).start()
+        return _scheduler
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="清理GitHub图床中的临时图片")
+    parser.add_argument("--ttl-hours", type=float, default=None, help="保留期限 (小时)，默认使用 image_gc.ttl_hours")
+    parser.add_argument("--delete-processed", action="store_true",
+                        help="同时删除页面已识别成功的图片 (上传超过 image_gc.processed_min_age_hours)")
+    parser.add_argument("--keep-processed", action="store_true", help="不删除页面已识别成功但未过期的图片")
+    parser.add_argument("--dry-run", action="store_true", help="只列出可删除的图片，不提交")
+    args = parser.parse_args()
+
+    delete_processed = True if args.delete_processed else (False if args.keep_processed else None)
+    gc = HostedImageGC(ttl_hours=args.ttl_hours, delete_processed=delete_processed)
+    try:
+        report = gc.collect(dry_run=args.dry_run)
+    except GitHubUploadError as e:
+        print(f"[图床清理] 清理失败: {e}")
+        raise SystemExit(1)
+
+    if args.dry_run:
+        for path in report.expired:
+            print(f"  过期: {path}")
+        for path in report.processed:
+            print(f"  已处理: {path}")
+
+
+if __name__ == "__main__":
+    main()
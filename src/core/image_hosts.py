@@ -0,0 +1,450 @@
+"""
+图床后端模块
+
+视觉识别需要一个可访问的图片地址，ImageHost 统一了获取地址的方式:
+    github    GitHub仓库 (Git Data API整批提交，见 github_upload)
+    local     本地静态目录，由Streamlit静态文件服务或内置HTTP服务提供
+    s3        S3兼容对象存储 (AWS S3 / MinIO / R2 等，SigV4签名)
+    data_uri  不上传，直接把图片编码为data URI传给视觉接口
+
+通过 image_host.backend 选择后端。所有后端都并发上传并记录各自的延迟指标，
+可用 `python -m src.core.image_hosts --backends github local data_uri` 比较各后端的上传延迟。
+"""
+
+import argparse
+import functools
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote, urlparse
+
+import requests
+
+from ..utils.config import config
+from .github_upload import GitHubBatchUploader, UPLOAD_DIRECTORY
+from .image_blob import ImageBlob, ImageInput, prepare_image
+from .metrics import get_metrics
+from .thumbnails import STATIC_DIR, STATIC_URL_PREFIX
+
+
+LATENCY_SAMPLES = 1000  # 每个后端保留的最近延迟样本数
+
+
+class HostMetrics:
+    """单个后端的上传指标 (线程安全)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)  # 每次上传调用的耗时 (秒)
+        self.calls = 0
+        self.images = 0
+        self.uploaded = 0
+        self.reused = 0
+        self.failures = 0
+        self.bytes = 0
+
+    def record(self, seconds: float, images: int = 1, uploaded: int = 0, reused: int = 0,
+               failures: int = 0, nbytes: int = 0):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.calls += 1
+            self.images += images
+            self.uploaded += uploaded
+            self.reused += reused
+            self.failures += failures
+            self.bytes += nbytes
+        # 已在图床上的图片不再上传，计为图床缓存命中
+        get_metrics().cache('image_host', hits=reused, misses=uploaded)
+
+    def snapshot(self) -> Dict[str, float]:
+        """调用次数、图片数、失败数、字节数和延迟分位数 (毫秒)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            snapshot = {
+                'calls': self.calls, 'images': self.images, 'uploaded': self.uploaded,
+                'reused': self.reused, 'failures': self.failures, 'bytes': self.bytes
+            }
+        if latencies:
+            def percentile(q: float) -> float:
+                return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+            snapshot.update({
+                'mean_ms': round(sum(latencies) / len(latencies) * 1000, 1),
+                'p50_ms': percentile(0.5),
+                'p95_ms': percentile(0.95),
+                'max_ms': round(latencies[-1] * 1000, 1)
+            })
+        return snapshot
+
+
+class ImageHost(ABC):
+    """
+    图床后端接口
+
+    子类实现 _put() 上传单张已验证的图片；upload_many() 负责验证、按内容去重、
+    在线程池中并发上传并记录指标。整批处理更高效的后端 (如GitHub) 可以直接覆盖 upload_many()。
+    """
+
+    name = "base"
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or config.get("image_host.upload_workers", 8)
+        self.metrics = HostMetrics()
+
+    @abstractmethod
+    def _put(self, blob: ImageBlob) -> Tuple[str, bool]:
+        """
+        上传单张图片
+
+        Args:
+            blob: 已验证的图片
+
+        Returns:
+            (访问地址, 是否实际上传了数据)，已存在时不重复上传
+        """
+
+    def upload_one(self, image: ImageInput) -> Optional[str]:
+        """上传单张图片，失败时返回None"""
+        return self.upload_many([image])[0]
+
+    def upload_many(self, images: Sequence[ImageInput]) -> List[Optional[str]]:
+        """
+        并发上传图片
+
+        Args:
+            images: 图片列表 (ImageBlob、字节数据或文件路径)
+
+        Returns:
+            与输入顺序一致的访问地址列表，验证或上传失败的图片为None
+        """
+        start = time.time()
+        urls: List[Optional[str]] = [None] * len(images)
+        prepared: Dict[str, Tuple[ImageBlob, List[int]]] = {}  # 内容哈希 -> (图片, 序号列表)
+        for index, image in enumerate(images):
+            try:
+                blob = prepare_image(image)
+            except (ValueError, OSError) as e:
+                print(f"[图床:{self.name}] 第{index + 1}张图片验证失败: {e}")
+                continue
+            if blob.digest in prepared:
+                prepared[blob.digest][1].append(index)
+            else:
+                prepared[blob.digest] = (blob, [index])
+
+        uploaded = reused = nbytes = 0
+        if prepared:
+            workers = max(1, min(self.max_workers, len(prepared)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {digest: executor.submit(self._put, blob) for digest, (blob, _) in prepared.items()}
+                for digest, future in futures.items():
+                    blob, indices = prepared[digest]
+                    try:
+                        url, sent = future.result()
+                    except Exception as e:
+                        print(f"[图床:{self.name}] 第{indices[0] + 1}张图片上传失败: {e}")
+                        continue
+                    for index in indices:
+                        urls[index] = url
+                    if sent:
+                        uploaded += 1
+                        nbytes += blob.size
+                    else:
+                        reused += 1
+
+        failures = sum(url is None for url in urls)
+        self.metrics.record(time.time() - start, len(images), uploaded, reused, failures, nbytes)
+        return urls
+
+
+class GitHubImageHost(ImageHost):
+    """GitHub仓库图床 (并发创建blob，整批一个提交)"""
+
+    name = "github"
+
+    def __init__(self, max_workers: Optional[int] = None):
+        super().__init__(max_workers)
+        self.uploader = GitHubBatchUploader(max_workers=self.max_workers)
+
+    def _put(self, blob: ImageBlob) -> Tuple[str, bool]:
+        url = self.uploader.upload_one(blob)
+        if url is None:
+            raise RuntimeError("GitHub图床上传失败")
+        return url, True
+
+    def upload_one(self, image: ImageInput) -> Optional[str]:
+        """单张图片使用Contents API (一次请求完成上传和提交)"""
+        start = time.time()
+        url = self.uploader.upload_one(image)
+        self._record(start, [url])
+        return url
+
+    def upload_many(self, images: Sequence[ImageInput]) -> List[Optional[str]]:
+        start = time.time()
+        urls = self.uploader.upload_many(images)
+        self._record(start, urls)
+        return urls
+
+    def _record(self, start: float, urls: List[Optional[str]]):
+        batch = self.uploader.last_batch
+        self.metrics.record(time.time() - start, len(urls), batch.get('uploaded', 0), batch.get('reused', 0),
+                            sum(url is None for url in urls), batch.get('bytes', 0))
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+_file_servers: Dict[str, ThreadingHTTPServer] = {}
+_file_servers_lock = threading.Lock()
+
+
+def serve_directory(directory: Path, host: str = "127.0.0.1", port: int = 0) -> str:
+    """
+    在后台线程中用内置HTTP服务提供目录中的文件 (每个目录只启动一次)
+
+    Returns:
+        服务根地址
+    """
+    key = str(directory.resolve())
+    with _file_servers_lock:
+        server = _file_servers.get(key)
+        if server is None:
+            handler = functools.partial(_QuietHandler, directory=key)
+            server = ThreadingHTTPServer((host, port), handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="image-file-server", daemon=True).start()
+            _file_servers[key] = server
+            print(f"[图床:local] 内置文件服务已启动: http://{host}:{server.server_address[1]}")
+    return f"http://{host}:{server.server_address[1]}"
+
+
+class LocalStaticHost(ImageHost):
+    """
+    本地静态目录图床
+
+    图片按内容哈希写入 static/images。配置了 image_host.local.base_url (应用的公网地址) 时
+    通过Streamlit静态文件服务 ({base_url}/app/static/images/...) 提供；
+    未配置时启动内置HTTP服务 (image_host.local.host / port)，适合本地调试和基准测试。
+    """
+
+    name = "local"
+    SUBDIR = "images"
+
+    def __init__(self, directory: Optional[str] = None, base_url: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        super().__init__(max_workers)
+        self.directory = Path(directory) if directory else STATIC_DIR / self.SUBDIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        base_url = base_url or config.get("image_host.local.base_url", "")
+        if base_url:
+            self.url_prefix = f"{base_url.rstrip('/')}/{STATIC_URL_PREFIX}/{self.SUBDIR}"
+        else:
+            self.url_prefix = serve_directory(
+                self.directory,
+                config.get("image_host.local.host", "127.0.0.1"),
+                config.get("image_host.local.port", 0)
+            )
+
+    def _put(self, blob: ImageBlob) -> Tuple[str, bool]:
+        name = f"{blob.digest[:32]}.{blob.ext}"
+        path = self.directory / name
+        sent = not path.exists()
+        if sent:
+            temp_path = path.with_name(f".{name}.{threading.get_ident()}.tmp")
+            temp_path.write_bytes(blob.data)
+            os.replace(temp_path, path)
+        return f"{self.url_prefix}/{name}", sent
+
+
+def _sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sign_s3_request(method: str, url: str, headers: Dict[str, str], payload_hash: str,
+                    access_key: str, secret_key: str, region: str,
+                    now: Optional[datetime] = None) -> Dict[str, str]:
+    """
+    AWS Signature Version 4 签名 (S3，路径式地址，无查询参数)
+
+    Args:
+        method: HTTP方法
+        url: 请求地址
+        headers: 需要一并签名的请求头
+        payload_hash: 请求体的SHA-256 (十六进制)
+        access_key / secret_key / region: 访问凭证和区域
+        now: 签名时间 (默认当前UTC时间)
+
+    Returns:
+        包含 Authorization、x-amz-date、x-amz-content-sha256 和 host 的完整请求头
+    """
+    now = now or datetime.now(timezone.utc)
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    date = amz_date[:8]
+    parsed = urlparse(url)
+
+    signed = {name.lower(): str(value).strip() for name, value in headers.items()}
+    signed.update({'host': parsed.netloc, 'x-amz-date': amz_date, 'x-amz-content-sha256': payload_hash})
+    names = sorted(signed)
+    canonical_request = "\n".join([
+        method,
+        quote(parsed.path or '/', safe='/-_.~'),
+        '',
+        ''.join(f"{name}:{signed[name]}\n" for name in names),
+        ';'.join(names),
+        payload_hash
+    ])
+    scope = f"{date}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope, _sha256_hex(canonical_request.encode('utf-8'))
+    ])
+
+    key = f"AWS4{secret_key}".encode('utf-8')
+    for part in (date, region, 's3', 'aws4_request'):
+        key = hmac.new(key, part.encode('utf-8'), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    signed['Authorization'] = (f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+                               f"SignedHeaders={';'.join(names)}, Signature={signature}")
+    return signed
+
+
+class S3ImageHost(ImageHost):
+    """
+    S3兼容对象存储图床
+
+    对象键为 {prefix}/{内容哈希}.{ext}，上传前用HEAD请求确认对象是否已存在。
+    凭证读取环境变量 AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY。
+    存储桶需要允许公开读取，或通过 image_host.s3.public_base_url 指定CDN地址。
+    """
+
+    name = "s3"
+
+    def __init__(self, max_workers: Optional[int] = None):
+        super().__init__(max_workers)
+        self.endpoint_url = config.get("image_host.s3.endpoint_url", "").rstrip('/')
+        self.bucket = config.get("image_host.s3.bucket", "")
+        self.region = config.get("image_host.s3.region", "us-east-1")
+        self.prefix = config.get("image_host.s3.prefix", UPLOAD_DIRECTORY).strip('/')
+        self.public_base_url = (config.get("image_host.s3.public_base_url", "")
+                                or f"{self.endpoint_url}/{self.bucket}").rstrip('/')
+        self.access_key = os.getenv("AWS_ACCESS_KEY_ID", "")
+        self.secret_key = os.getenv("AWS_SECRET_ACCESS_KEY", "")
+        self.timeout = config.get("github.timeout", 30)
+        if not (self.endpoint_url and self.bucket and self.access_key and self.secret_key):
+            raise ValueError("S3图床需要配置 image_host.s3.endpoint_url / bucket 和 AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY")
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.trust_env = False
+        return session
+
+    def _signed(self, method: str, url: str, payload_hash: str, headers: Optional[Dict[str, str]] = None):
+        return sign_s3_request(method, url, headers or {}, payload_hash,
+                               self.access_key, self.secret_key, self.region)
+
+    def _put(self, blob: ImageBlob) -> Tuple[str, bool]:
+        key = f"{self.prefix}/{blob.digest[:32]}.{blob.ext}"
+        url = f"{self.endpoint_url}/{self.bucket}/{key}"
+        public_url = f"{self.public_base_url}/{key}"
+
+        empty_hash = _sha256_hex(b"")
+        response = self._session().head(url, headers=self._signed('HEAD', url, empty_hash), timeout=self.timeout)
+        if response.status_code == 200:
+            return public_url, False
+
+        headers = self._signed('PUT', url, blob.digest, {'Content-Type': blob.mime_type})
+        response = self._session().put(url, data=blob.data, headers=headers, timeout=self.timeout)
+        if response.status_code not in (200, 201):
+            raise RuntimeError(f"PUT {key} 失败: {response.status_code} - {response.text[:200]}")
+        return public_url, True
+
+
+class DataURIHost(ImageHost):
+    """不上传，把图片编码为data URI直接随请求发送 (适合无法访问任何图床的环境)"""
+
+    name = "data_uri"
+
+    def _put(self, blob: ImageBlob) -> Tuple[str, bool]:
+        return blob.data_uri(), False
+
+
+IMAGE_HOSTS = {
+    host.name: host for host in (GitHubImageHost, LocalStaticHost, S3ImageHost, DataURIHost)
+}
+
+_hosts: Dict[str, ImageHost] = {}
+_hosts_lock = threading.Lock()
+
+
+def get_image_host(backend: Optional[str] = None) -> ImageHost:
+    """
+    获取图床后端 (每种后端共享一个实例，指标在进程内累计)
+
+    Args:
+        backend: 后端名称，默认使用 image_host.backend
+
+    Returns:
+        图床后端实例
+    """
+    backend = backend or config.get("image_host.backend", "github")
+    if backend not in IMAGE_HOSTS:
+        raise ValueError(f"未知的图床后端: {backend} (可选: {', '.join(IMAGE_HOSTS)})")
+    with _hosts_lock:
+        if backend not in _hosts:
+            _hosts[backend] = IMAGE_HOSTS[backend]()
+        return _hosts[backend]
+
+
+def host_metrics() -> Dict[str, Dict[str, float]]:
+    """已使用的各后端的指标快照"""
+    with _hosts_lock:
+        hosts = dict(_hosts)
+    return {name: host.metrics.snapshot() for name, host in hosts.items()}
+
+
+def main():
+    """命令行入口: 用同一组图片比较各后端的上传延迟"""
+    parser = argparse.ArgumentParser(description="比较各图床后端的上传延迟")
+    parser.add_argument("images", nargs="*", help="图片文件，未指定时生成测试图片")
+    parser.add_argument("--backends", nargs="+", default=list(IMAGE_HOSTS), help="要比较的后端")
+    parser.add_argument("--count", type=int, default=10, help="生成的测试图片数量")
+    parser.add_argument("--rounds", type=int, default=3, help="每个后端上传的轮数 (第一轮之后为已存在的图片)")
+    args = parser.parse_args()
+
+    if args.images:
+        images = [ImageBlob.from_path(path) for path in args.images]
+    else:
+        import io
+        from PIL import Image
+        images = []
+        for i in range(args.count):
+            buffer = io.BytesIO()
+            Image.new('RGB', (800, 600), (i * 37 % 256, 120, 200)).save(buffer, 'JPEG')
+            images.append(buffer.getvalue())
+
+    for backend in args.backends:
+        try:
+            host = get_image_host(backend)
+        except ValueError as e:
+            print(f"[图床:{backend}] 跳过: {e}")
+            continue
+        for _ in range(args.rounds):
+            host.upload_many(images)
+    print(json.dumps(host_metrics(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
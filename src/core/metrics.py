@@ -0,0 +1,288 @@
+"""
+流水线性能指标模块
+
+进程内的指标注册表: 各阶段耗时直方图、计数器 (API调用、429、缓存命中)、
+进行中的API调用数、最近一分钟的429比例、等待队列长度，以及各批次的进度、每分钟页数和预计剩余时间。
+同一进程中的多个会话各自记录自己的批次 (start_batch 返回批次ID)，互不覆盖。
+处理流程在关键位置记录指标，侧边栏的性能面板读取快照显示，
+用于判断批量处理时是被API限流、在等待API响应，还是本地CPU处理较慢。
+"""
+
+import bisect
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# 直方图分桶上限 (毫秒)，最后一个桶为超过60秒
+BUCKET_BOUNDS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+LATENCY_SAMPLES = 512  # 每个阶段保留最近的样本数 (计算分位数)
+RATE_WINDOW_SECONDS = 300  # 没有批次时每分钟页数按最近5分钟计算
+THROTTLE_WINDOW_SECONDS = 60  # 429比例按最近1分钟的API响应计算
+BATCH_RETENTION_SECONDS = 3600  # 超过该时间没有更新的批次被清除 (包括中途放弃的批次)
+
+# 调用外部API的阶段，其余阶段为本地处理
+API_STAGES = frozenset({'upload', 'vision', 'ai'})
+STAGE_LABELS = {
+    'render': 'PDF渲染',
+    'crop': '裁剪',
+    'upload': '图床上传',
+    'vision': '视觉识别',
+    'ai': 'AI分析',
+    'save': '保存结果',
+    'documents': '文档生成',
+}
+CACHE_LABELS = {
+    'image_host': '图床复用',
+    'cassette': '识别磁带',
+    'documents': '文档增量构建',
+}
+
+
+class Histogram:
+    """耗时直方图: 固定分桶计数 + 最近样本 (线程安全由注册表保证)"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+
+    def observe(self, seconds: float):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, seconds * 1000)] += 1
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+
+    def snapshot(self) -> Dict:
+        """次数、总耗时、分桶计数和分位数 (毫秒)"""
+        samples = sorted(self.samples)
+        snapshot = {'count': self.count, 'total_s': round(self.total, 3), 'buckets': list(self.buckets)}
+        if samples:
+            def percentile(q: float) -> float:
+                return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1)
+            snapshot.update({
+                'mean_ms': round(self.total / self.count * 1000, 1),
+                'p50_ms': percentile(0.5),
+                'p95_ms': percentile(0.95),
+                'max_ms': round(samples[-1] * 1000, 1)
+            })
+        return snapshot
+
+
+class MetricsRegistry:
+    """进程内指标注册表 (线程安全)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms: Dict[str, Histogram] = {}
+            self._counters: Dict[str, int] = {}
+            self._gauges: Dict[str, float] = {}
+            self._page_times = deque()  # 最近完成页面的时间戳
+            self._responses = deque()   # 最近的API响应 (时间戳, 是否为429)
+            self._batches: Dict[str, Dict] = {}  # 批次ID -> 进度
+
+    # ---- 记录 ----
+
+    def observe(self, stage: str, seconds: float):
+        """记录一次阶段耗时"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """计时上下文: with metrics.timer('vision'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def cache(self, name: str, hits: int = 0, misses: int = 0):
+        """记录缓存命中/未命中"""
+        with self._lock:
+            self._counters[f"cache.{name}.hit"] = self._counters.get(f"cache.{name}.hit", 0) + hits
+            self._counters[f"cache.{name}.miss"] = self._counters.get(f"cache.{name}.miss", 0) + misses
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    @contextmanager
+    def api_call(self, api: str):
+        """
+        一次外部API调用: 期间计入进行中的调用数，结束时记录耗时
+
+        调用方在收到响应后用 api_status() 记录状态码
+        """
+        with self._lock:
+            self._gauges['api.in_flight'] = self._gauges.get('api.in_flight', 0) + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._gauges['api.in_flight'] -= 1
+            self.observe(f"api.{api}", elapsed)
+
+    def api_status(self, api: str, status: int):
+        """记录API响应状态 (0 表示网络错误等没有状态码的失败)，重试的每次请求都要记录"""
+        now = time.time()
+        with self._lock:
+            self._responses.append((now, status == 429))
+            while self._responses and now - self._responses[0][0] > THROTTLE_WINDOW_SECONDS:
+                self._responses.popleft()
+            for name in ('api.responses', f"api.{api}.responses"):
+                self._counters[name] = self._counters.get(name, 0) + 1
+            if status == 429:
+                for name in ('api.throttled', f"api.{api}.throttled"):
+                    self._counters[name] = self._counters.get(name, 0) + 1
+            elif status != 200:
+                self._counters['api.errors'] = self._counters.get('api.errors', 0) + 1
+
+    def start_batch(self, total: int) -> str:
+        """
+        开始一个批次 (用于计算进度和预计剩余时间)
+
+        Returns:
+            批次ID，记录进度和读取快照时传入
+        """
+        now = time.time()
+        batch_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            for stale in [key for key, batch in self._batches.items()
+                          if now - batch['updated'] > BATCH_RETENTION_SECONDS]:
+                del self._batches[stale]
+            self._batches[batch_id] = {'total': total, 'done': 0, 'failed': 0, 'started': now,
+                                       'updated': now, 'finished': None}
+        return batch_id
+
+    def page_done(self, success: bool = True, batch_id: Optional[str] = None):
+        """完成一页 (不属于批次的页面只计入最近5分钟的每分钟页数)"""
+        now = time.time()
+        with self._lock:
+            self._page_times.append(now)
+            while self._page_times and now - self._page_times[0] > RATE_WINDOW_SECONDS:
+                self._page_times.popleft()
+            batch = self._batches.get(batch_id)
+            if batch is not None:
+                batch['done'] += 1
+                batch['failed'] += 0 if success else 1
+                batch['updated'] = now
+                if batch['done'] >= batch['total']:
+                    batch['finished'] = now
+
+    def finish_batch(self, batch_id: str):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is not None and batch['finished'] is None:
+                batch['finished'] = batch['updated'] = time.time()
+
+    # ---- 读取 ----
+
+    def _rates(self, now: float, batch: Optional[Dict]) -> Dict:
+        """每分钟页数: 有批次时按批次开始以来计算，否则按最近5分钟计算"""
+        if batch is not None and batch['done']:
+            elapsed = (batch['finished'] or now) - batch['started']
+            pages_per_minute = batch['done'] / elapsed * 60 if elapsed > 0 else 0.0
+        else:
+            recent = [t for t in self._page_times if now - t <= RATE_WINDOW_SECONDS]
+            span = now - recent[0] if len(recent) > 1 else 0
+            pages_per_minute = (len(recent) - 1) / span * 60 if span > 0 else 0.0
+        return {'pages_per_minute': round(pages_per_minute, 2)}
+
+    def snapshot(self, batch_id: Optional[str] = None) -> Dict:
+        """
+        指标快照
+
+        Args:
+            batch_id: 要显示进度的批次 (本会话最近的批次)，为None或已清除时不包含批次信息
+        """
+        now = time.time()
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            stages = {name: histogram.snapshot() for name, histogram in self._histograms.items()}
+            batch = dict(self._batches[batch_id]) if batch_id in self._batches else None
+            rates = self._rates(now, batch)
+            recent = [throttled for t, throttled in self._responses if now - t <= THROTTLE_WINDOW_SECONDS]
+
+        snapshot = {
+            'stages': stages,
+            'counters': counters,
+            # 文件夹监视等不属于批次的处理通过 queue.depth 报告等待队列
+            'queue_depth': int(gauges.get('queue.depth', 0)),
+            'api_in_flight': int(gauges.get('api.in_flight', 0)),
+            'recent_responses': len(recent),
+            'recent_throttled': sum(recent),
+            'throttle_rate': round(sum(recent) / len(recent), 4) if recent else 0.0,
+            'cache_hit_rates': self._hit_rates(counters),
+            **rates
+        }
+
+        if batch:
+            remaining = max(0, batch['total'] - batch['done'])
+            eta = None
+            if remaining and rates['pages_per_minute'] > 0:
+                eta = remaining / rates['pages_per_minute'] * 60
+            elif not remaining:
+                eta = 0.0
+            snapshot['batch'] = {**batch, 'remaining': remaining, 'eta_seconds': eta,
+                                 'running': batch['finished'] is None}
+            if batch['finished'] is None:
+                snapshot['queue_depth'] = remaining
+
+        # 各阶段累计耗时中外部API所占比例，高说明在等待API，低说明本地处理较慢
+        api_time = sum(s['total_s'] for name, s in stages.items() if name in API_STAGES)
+        local_time = sum(s['total_s'] for name, s in stages.items()
+                         if name in STAGE_LABELS and name not in API_STAGES)
+        snapshot['api_time_share'] = round(api_time / (api_time + local_time), 3) if api_time + local_time else 0.0
+        return snapshot
+
+    @staticmethod
+    def _hit_rates(counters: Dict[str, int]) -> Dict[str, Dict]:
+        rates = {}
+        for name, hits in counters.items():
+            if not (name.startswith('cache.') and name.endswith('.hit')):
+                continue
+            cache = name[len('cache.'):-len('.hit')]
+            total = hits + counters.get(f"cache.{cache}.miss", 0)
+            if total:
+                rates[cache] = {'hits': hits, 'total': total, 'rate': round(hits / total, 4)}
+        return rates
+
+
+def histogram_bar(buckets: List[int]) -> str:
+    """把分桶计数画成一行方块字符"""
+    blocks = " ▁▂▃▄▅▆▇█"
+    peak = max(buckets) if buckets else 0
+    if not peak:
+        return ""
+    return "".join(blocks[0 if not n else max(1, round(n / peak * 8))] for n in buckets)
+
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """获取进程共享的指标注册表"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry()
+        return _metrics
@@ -0,0 +1,93 @@
+"""
+PDF页面读取模块
+
+用pypdfium2 (可选依赖) 按需把PDF页面渲染为图片: 打开文档只读取页面目录，
+每页在取到时才渲染并编码为JPEG，渲染完立即释放位图。配合批量处理的分批窗口，
+几百页的PDF同时只在内存中保留几页渲染结果。
+"""
+
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from ..utils.config import config
+from .image_blob import MAX_DIMENSION, ImageBlob
+from .metrics import get_metrics
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+PDF_SUPPORTED = pdfium is not None
+POINTS_PER_INCH = 72
+
+
+class PDFDocument:
+    """
+    按需渲染页面的PDF文档
+
+    Args:
+        source: PDF文件路径或字节数据 (如Streamlit上传文件的内容)
+        name: 显示名称，默认取文件名
+        dpi: 渲染分辨率，默认使用 pdf.dpi
+    """
+
+    def __init__(self, source: Union[str, Path, bytes], name: str = "", dpi: Optional[int] = None):
+        if pdfium is None:
+            raise RuntimeError("处理PDF需要安装pypdfium2 (pip install pypdfium2)")
+        self.path = None if isinstance(source, bytes) else str(source)
+        self.name = name or (Path(self.path).name if self.path else "document.pdf")
+        self.dpi = dpi or config.get("pdf.dpi", 150)
+        self.quality = config.get("pdf.quality", 85)
+        self._pdf = pdfium.PdfDocument(source)
+        self.page_count = len(self._pdf)
+
+    def __enter__(self) -> "PDFDocument":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    def page_name(self, index: int) -> str:
+        """页面图片的文件名: {PDF文件名}_p{页码}.jpg"""
+        return f"{Path(self.name).stem}_p{index + 1:03d}.jpg"
+
+    def render_page(self, index: int) -> ImageBlob:
+        """
+        渲染一页 (长边不超过图片尺寸上限)
+
+        Args:
+            index: 页面序号 (从0开始)
+
+        Returns:
+            JPEG编码的页面图片
+        """
+        with get_metrics().timer('render'):
+            return self._render(index)
+
+    def _render(self, index: int) -> ImageBlob:
+        page = self._pdf[index]
+        try:
+            width, height = page.get_size()
+            scale = min(self.dpi / POINTS_PER_INCH, MAX_DIMENSION / max(width, height, 1))
+            bitmap = page.render(scale=scale)
+            try:
+                image = bitmap.to_pil()
+                return ImageBlob.from_image(image, self.page_name(index), quality=self.quality)
+            finally:
+                bitmap.close()
+        finally:
+            page.close()
+
+    def iter_pages(self) -> Iterator[ImageBlob]:
+        """逐页渲染，渲染失败的页面跳过"""
+        for index in range(self.page_count):
+            try:
+                yield self.render_page(index)
+            except Exception as e:
+                print(f"[PDF] {self.name} 第{index + 1}页渲染失败: {e}")
@@ -0,0 +1,544 @@
+"""
+识别结果存储模块
+
+统一的单页识别结果模型 PageResult，以及基于SQLite的磁盘结果存储。
+会话中只保存页面ID，查看某一页时才从存储中读取该页内容，
+会话内存占用不随处理的页数增长。
+每页保存时同时更新全文索引 (SQLite FTS5，不可用时退化为LIKE扫描)，用于跨页搜索。
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from ..utils.config import config
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# 每次按ID批量查询的数量 (低于SQLite的参数个数上限)
+QUERY_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    page_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    source TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    error TEXT,
+    image_url TEXT,
+    file_path TEXT,
+    confidence REAL NOT NULL,
+    content_type TEXT,
+    created_at REAL NOT NULL,
+    encoding TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    thumbnail TEXT
+);
+CREATE INDEX IF NOT EXISTS pages_created_at ON pages (created_at);
+"""
+
+# 全文索引: 文件名、识别原文、校正文本、词汇 (单词/释义/例句) 和语法点
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    page_id UNINDEXED, filename, raw_text, corrected_text, vocabulary, grammar,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+"""
+FALLBACK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages_text (
+    page_id TEXT PRIMARY KEY,
+    filename TEXT, raw_text TEXT, corrected_text TEXT, vocabulary TEXT, grammar TEXT
+);
+"""
+INDEX_COLUMNS = ("filename", "raw_text", "corrected_text", "vocabulary", "grammar")
+# bm25列权重 (page_id列不参与排序): 词汇命中比正文命中更相关
+BM25_WEIGHTS = "0, 0.5, 1.0, 1.0, 2.0, 1.5"
+SNIPPET_TOKENS = 12
+SNIPPET_CHARS = 80
+
+SUMMARY_COLUMNS = "page_id, filename, success, error, image_url, file_path, confidence, content_type, thumbnail"
+PAGE_COLUMNS = ("page_id, filename, source, success, error, image_url, file_path, confidence, "
+                "created_at, encoding, payload, thumbnail")
+INSERT_COLUMNS = ("page_id, filename, source, success, error, image_url, file_path, confidence, "
+                  "content_type, created_at, encoding, payload, thumbnail")
+# 旧版本数据库中缺少的列 (列名, 类型)
+MIGRATIONS = [("thumbnail", "TEXT")]
+
+
+def _encode_payload(payload: Dict[str, Any]) -> Tuple[str, bytes]:
+    """编码页面正文 (有msgpack时使用msgpack，否则使用JSON)，再用zlib压缩"""
+    if msgpack is not None:
+        return 'msgpack', zlib.compress(msgpack.packb(payload, use_bin_type=True, default=str))
+    return 'json', zlib.compress(json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+def _decode_payload(encoding: str, data: bytes) -> Dict[str, Any]:
+    raw = zlib.decompress(data)
+    if encoding == 'msgpack':
+        if msgpack is None:
+            raise RuntimeError("结果使用msgpack编码，但当前环境未安装msgpack")
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw.decode('utf-8'))
+
+
+class PageResult:
+    """
+    单页识别结果
+
+    上传处理、文件夹批量处理和图床URL处理产生的结果统一为同一结构，
+    通过 from_processing() 从各处理流程的原始结果转换。
+    """
+
+    __slots__ = (
+        'page_id', 'filename', 'source', 'success', 'error', 'image_url', 'file_path',
+        'raw_text', 'corrected_text', 'confidence', 'corrections', 'analysis', 'created_at', 'thumbnail',
+        'crop_box'
+    )
+
+    def __init__(self, filename: str, source: str, success: bool, error: Optional[str] = None,
+                 image_url: Optional[str] = None, file_path: Optional[str] = None,
+                 raw_text: str = "", corrected_text: str = "", confidence: float = 0.0,
+                 corrections: Optional[List[Dict]] = None, analysis: Optional[Dict] = None,
+                 page_id: Optional[str] = None, created_at: Optional[float] = None,
+                 thumbnail: Optional[str] = None, crop_box: Optional[List[int]] = None):
+        self.page_id = page_id or uuid.uuid4().hex
+        self.filename = filename
+        self.source = source
+        self.success = success
+        self.error = error
+        self.image_url = image_url
+        self.file_path = file_path
+        self.raw_text = raw_text
+        self.corrected_text = corrected_text
+        self.confidence = confidence
+        self.corrections = corrections or []
+        self.analysis = analysis or {}
+        self.created_at = created_at or time.time()
+        self.thumbnail = thumbnail
+        self.crop_box = crop_box  # 识别前裁剪到文字区域时，原图上的裁剪区域 [左, 上, 右, 下]
+
+    @classmethod
+    def from_processing(cls, result: Dict, source: str) -> "PageResult":
+        """
+        从处理流程的原始结果创建
+
+        兼容增强结果 (corrected_text / raw_ocr / analysis)、失败时的基本结果 (raw_text)，
+        以及图床URL处理的 {'enhanced_result', 'vision_result', 'static_url'} 结构。
+
+        Args:
+            result: 原始结果字典
+            source: 结果来源 (upload / folder / ai_processed)
+        """
+        enhanced = result.get('enhanced_result') or result
+        vision = result.get('vision_result') or {}
+        # data URI图床的"URL"就是整张图片，不写入结果库
+        image_url = result.get('static_url') or result.get('url')
+        if image_url and image_url.startswith('data:'):
+            image_url = None
+
+        return cls(
+            filename=result.get('filename', ''),
+            source=source,
+            success=bool(result.get('success', enhanced.get('success', False))),
+            error=result.get('error') or enhanced.get('error'),
+            image_url=image_url,
+            file_path=result.get('filepath'),
+            raw_text=enhanced.get('raw_ocr') or vision.get('raw_text') or result.get('raw_text') or "",
+            corrected_text=enhanced.get('corrected_text') or "",
+            confidence=float(enhanced.get('confidence') or vision.get('confidence') or 0),
+            corrections=enhanced.get('corrections') or [],
+            analysis=enhanced.get('analysis') or {},
+            thumbnail=result.get('thumbnail'),
+            crop_box=result.get('crop_box') or vision.get('crop_box')
+        )
+
+    @property
+    def text(self) -> str:
+        """用于显示和导出的文本 (优先AI校正文本)"""
+        return self.corrected_text or self.raw_text
+
+    @property
+    def text_source(self) -> str:
+        """文本来源说明"""
+        if self.corrected_text:
+            return f"AI增强识别 (置信度: {self.confidence:.1%})"
+        if self.raw_text:
+            return f"原始识别 (置信度: {self.confidence:.1%})"
+        return "识别失败"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为文档生成使用的增强结果字典"""
+        return {
+            'filename': self.filename,
+            'success': self.success,
+            'error': self.error,
+            'static_url': self.image_url,
+            'filepath': self.file_path,
+            'raw_ocr': self.raw_text,
+            'corrected_text': self.corrected_text,
+            'confidence': self.confidence,
+            'corrections': self.corrections,
+            'analysis': self.analysis,
+            'crop_box': self.crop_box
+        }
+
+    def __repr__(self) -> str:
+        return f"PageResult({self.page_id}, {self.filename!r}, success={self.success})"
+
+
+class PageSummary(NamedTuple):
+    """页面摘要 (列表和缩略图只需要这些字段，不读取正文)"""
+    page_id: str
+    filename: str
+    success: bool
+    error: Optional[str]
+    image_url: Optional[str]
+    file_path: Optional[str]
+    confidence: float
+    content_type: Optional[str]
+    thumbnail: Optional[str]
+
+
+class SearchHit(NamedTuple):
+    """搜索结果 (snippet中命中的词用**加粗**标记)"""
+    page_id: str
+    filename: str
+    snippet: str
+    score: float
+
+
+def _index_fields(page: PageResult) -> Tuple[str, ...]:
+    """页面在全文索引中的各列内容 (与 INDEX_COLUMNS 对应)"""
+    vocabulary = "\n".join(
+        " ".join(str(vocab.get(field) or "") for field in ("word", "meaning", "example"))
+        for vocab in page.analysis.get('vocabulary', []) if isinstance(vocab, dict)
+    )
+    grammar = "\n".join(str(point) for point in page.analysis.get('grammar_points', []))
+    corrected = page.corrected_text if page.corrected_text != page.raw_text else ""
+    return (page.filename, page.raw_text, corrected, vocabulary, grammar)
+
+
+def _search_terms(query: str) -> List[str]:
+    return [term for term in query.split() if term]
+
+
+def _fts_query(terms: List[str]) -> str:
+    """
+    把用户输入转换为FTS5查询
+
+    每个词作为带引号的短语 (避免用户输入中的 AND/OR/NEAR/* 等被当作语法)，
+    多个词之间为AND，最后一个词按前缀匹配，便于边输入边搜索。
+    """
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _like_snippet(fields: Tuple[str, ...], terms: List[str]) -> str:
+    """LIKE模式下在第一个命中的列中截取命中位置附近的文本"""
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    for text in fields:
+        match = pattern.search(text or "")
+        if match:
+            start = max(0, match.start() - SNIPPET_CHARS // 2)
+            end = min(len(text), match.end() + SNIPPET_CHARS // 2)
+            excerpt = pattern.sub(lambda m: f"**{m.group(0)}**", text[start:end])
+            return ("…" if start > 0 else "") + excerpt.replace("\n", " ") + ("…" if end < len(text) else "")
+    return ""
+
+
+class ResultStore:
+    """
+    基于SQLite的识别结果存储
+
+    标量字段单独成列，便于只读取摘要；识别文本、修正和分析结果
+    编码为一个压缩的正文字段，只在查看该页时读取。
+    全文索引与页面在同一事务中更新，每处理完一页即可被搜索到。
+    所有会话共用一个连接，通过锁串行访问。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+            try:
+                self._conn.executescript(FTS_SCHEMA)
+                self.fts_enabled = True
+            except sqlite3.OperationalError as e:
+                # SQLite编译时未启用FTS5，退化为LIKE扫描
+                print(f"[结果存储] FTS5不可用 ({e})，搜索将使用LIKE扫描")
+                self._conn.executescript(FALLBACK_SCHEMA)
+                self.fts_enabled = False
+            self._conn.commit()
+        self._backfill_index()
+
+    def _migrate(self):
+        """为旧版本创建的数据库补充新增的列 (调用方持有锁)"""
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(pages)")}
+        for column, column_type in MIGRATIONS:
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE pages ADD COLUMN {column} {column_type}")
+
+    @property
+    def _index_table(self) -> str:
+        return "pages_fts" if self.fts_enabled else "pages_text"
+
+    def _index_page(self, page: PageResult, replace: bool):
+        """写入一页的全文索引 (调用方持有锁并负责提交)"""
+        if replace:
+            self._conn.execute(f"DELETE FROM {self._index_table} WHERE page_id = ?", (page.page_id,))
+        self._conn.execute(
+            f"INSERT INTO {self._index_table} (page_id, {', '.join(INDEX_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+            (page.page_id, *_index_fields(page))
+        )
+
+    def _backfill_index(self):
+        """为尚未建立索引的页面补建全文索引 (例如升级前保存的结果)"""
+        with self._lock:
+            missing = [row[0] for row in self._conn.execute(
+                f"SELECT page_id FROM pages WHERE page_id NOT IN (SELECT page_id FROM {self._index_table})"
+            )]
+        if not missing:
+            return
+        for page in self.iter_pages(missing):
+            with self._lock:
+                self._index_page(page, replace=False)
+        with self._lock:
+            self._conn.commit()
+        print(f"[结果存储] 补建全文索引: {len(missing)} 页")
+
+    def put(self, page: PageResult) -> str:
+        """
+        保存一页结果 (同一ID已存在时覆盖)
+
+        Returns:
+            页面ID
+        """
+        encoding, payload = _encode_payload({
+            'raw_text': page.raw_text,
+            'corrected_text': page.corrected_text,
+            'corrections': page.corrections,
+            'analysis': page.analysis,
+            'crop_box': page.crop_box
+        })
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM pages WHERE page_id = ?", (page.page_id,)
+            ).fetchone() is not None
+            self._index_page(page, replace=exists)
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO pages ({INSERT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (page.page_id, page.filename, page.source, int(page.success), page.error,
+                 page.image_url, page.file_path, page.confidence, page.analysis.get('content_type'),
+                 page.created_at, encoding, payload, page.thumbnail)
+            )
+            self._conn.commit()
+        return page.page_id
+
+    def _query(self, columns: str, page_ids: List[str]) -> Dict[str, tuple]:
+        """按ID分批查询，返回 {page_id: row}"""
+        rows = {}
+        with self._lock:
+            for start in range(0, len(page_ids), QUERY_BATCH_SIZE):
+                batch = page_ids[start:start + QUERY_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                cursor = self._conn.execute(
+                    f"SELECT {columns} FROM pages WHERE page_id IN ({placeholders})", batch
+                )
+                for row in cursor:
+                    rows[row[0]] = row
+        return rows
+
+    @staticmethod
+    def _page_from_row(row: tuple) -> PageResult:
+        (page_id, filename, source, success, error, image_url, file_path, confidence,
+         created_at, encoding, payload, thumbnail) = row
+        body = _decode_payload(encoding, payload)
+        return PageResult(
+            filename=filename, source=source, success=bool(success), error=error,
+            image_url=image_url, file_path=file_path, raw_text=body.get('raw_text', ''),
+            corrected_text=body.get('corrected_text', ''), confidence=confidence,
+            corrections=body.get('corrections'), analysis=body.get('analysis'),
+            page_id=page_id, created_at=created_at, thumbnail=thumbnail, crop_box=body.get('crop_box')
+        )
+
+    def get(self, page_id: str) -> Optional[PageResult]:
+        """读取一页完整结果，不存在时返回None"""
+        row = self._query(PAGE_COLUMNS, [page_id]).get(page_id)
+        return self._page_from_row(row) if row else None
+
+    def iter_pages(self, page_ids: List[str]) -> Iterator[PageResult]:
+        """按给定顺序逐页读取完整结果 (每次只在内存中保留一批)，跳过已不存在的页面"""
+        for start in range(0, len(page_ids), QUERY_BATCH_SIZE):
+            batch = page_ids[start:start + QUERY_BATCH_SIZE]
+            rows = self._query(PAGE_COLUMNS, batch)
+            for page_id in batch:
+                if page_id in rows:
+                    yield self._page_from_row(rows.pop(page_id))
+
+    def summaries(self, page_ids: List[str]) -> List[PageSummary]:
+        """按给定顺序读取页面摘要，跳过已不存在的页面"""
+        rows = self._query(SUMMARY_COLUMNS, page_ids)
+        summaries = []
+        for page_id in page_ids:
+            row = rows.get(page_id)
+            if row:
+                summaries.append(PageSummary(row[0], row[1], bool(row[2]), *row[3:]))
+        return summaries
+
+    def delete(self, page_ids: List[str]) -> int:
+        """删除页面，返回删除的数量"""
+        deleted = 0
+        with self._lock:
+            for start in range(0, len(page_ids), QUERY_BATCH_SIZE):
+                batch = page_ids[start:start + QUERY_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM {self._index_table} WHERE page_id IN ({placeholders})", batch)
+                deleted += self._conn.execute(
+                    f"DELETE FROM pages WHERE page_id IN ({placeholders})", batch
+                ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def prune(self, max_age_seconds: float) -> int:
+        """删除早于保留期限的页面 (会话结束后不会再被引用)，返回删除的数量"""
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM {self._index_table} WHERE page_id IN (SELECT page_id FROM pages WHERE created_at < ?)",
+                (cutoff,)
+            )
+            deleted = self._conn.execute("DELETE FROM pages WHERE created_at < ?", (cutoff,)).rowcount
+            self._conn.commit()
+        return deleted
+
+    def search(self, query: str, page_ids: Optional[List[str]] = None, limit: int = 20) -> List[SearchHit]:
+        """
+        全文搜索
+
+        Args:
+            query: 搜索词 (空格分隔，全部命中才算匹配，最后一个词按前缀匹配)
+            page_ids: 只在这些页面中搜索 (例如当前会话的结果)，None表示搜索全部页面
+            limit: 最多返回的结果数
+
+        Returns:
+            按相关度排序的搜索结果
+        """
+        terms = _search_terms(query)
+        if not terms or page_ids == []:
+            return []
+
+        allowed = None if page_ids is None else set(page_ids)
+        with self._lock:
+            if self.fts_enabled:
+                return self._search_fts(terms, allowed, limit)
+            return self._search_like(terms, allowed, limit)
+
+    def _search_fts(self, terms: List[str], allowed: Optional[set], limit: int) -> List[SearchHit]:
+        match = _fts_query(terms)
+        weights = f"bm25(pages_fts, {BM25_WEIGHTS})"
+        if allowed is None:
+            ranked = self._conn.execute(
+                f"SELECT page_id, {weights} AS score FROM pages_fts WHERE pages_fts MATCH ? ORDER BY score LIMIT ?",
+                (match, limit)
+            ).fetchall()
+        else:
+            # 先只取 (页面ID, 分数) 在Python中按页面过滤，只为最终结果生成摘要
+            ranked = [row for row in self._conn.execute(
+                f"SELECT page_id, {weights} FROM pages_fts WHERE pages_fts MATCH ?", (match,)
+            ) if row[0] in allowed]
+            ranked = sorted(ranked, key=lambda row: row[1])[:limit]
+        if not ranked:
+            return []
+
+        placeholders = ", ".join("?" * len(ranked))
+        snippets = {
+            row[0]: row[1:] for row in self._conn.execute(
+                f"SELECT page_id, filename, snippet(pages_fts, -1, '**', '**', '…', {SNIPPET_TOKENS}) "
+                f"FROM pages_fts WHERE pages_fts MATCH ? AND page_id IN ({placeholders})",
+                (match, *[page_id for page_id, _ in ranked])
+            )
+        }
+        return [
+            SearchHit(page_id, snippets[page_id][0], snippets[page_id][1].replace("\n", " "), score)
+            for page_id, score in ranked if page_id in snippets
+        ]
+
+    def _search_like(self, terms: List[str], allowed: Optional[set], limit: int) -> List[SearchHit]:
+        conditions, params = [], []
+        for term in terms:
+            escaped = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conditions.append("(" + " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in INDEX_COLUMNS) + ")")
+            params.extend([escaped] * len(INDEX_COLUMNS))
+        cursor = self._conn.execute(
+            f"SELECT page_id, {', '.join(INDEX_COLUMNS)} FROM pages_text WHERE {' AND '.join(conditions)}",
+            params
+        )
+
+        hits = []
+        for page_id, *fields in cursor:
+            if allowed is not None and page_id not in allowed:
+                continue
+            text = " ".join(field or "" for field in fields).lower()
+            # 命中次数越多越相关 (取负数，与bm25一样越小越靠前)
+            score = -sum(text.count(term.lower()) for term in terms)
+            hits.append(SearchHit(page_id, fields[0], _like_snippet(tuple(fields[1:]), terms), float(score)))
+        hits.sort(key=lambda hit: hit.score)
+        return hits[:limit]
+
+    def processed_image_urls(self) -> set:
+        """识别成功的页面引用的图床地址"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT image_url FROM pages WHERE success = 1 AND image_url IS NOT NULL"
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_store: Optional[ResultStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """
+    获取共享的结果存储 (位于 paths.cache_dir/results.sqlite3)
+
+    首次创建时删除超过 results.retention_days 天的旧结果。
+
+    Returns:
+        结果存储实例
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            db_path = Path(config.get("paths.cache_dir", "./cache")) / "results.sqlite3"
+            _default_store = ResultStore(str(db_path))
+            retention_days = config.get("results.retention_days", 7)
+            pruned = _default_store.prune(retention_days * 86400)
+            if pruned:
+                print(f"[结果存储] 清理过期结果: {pruned} 页")
+        return _default_store
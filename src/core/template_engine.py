@@ -0,0 +1,184 @@
+"""
+模板渲染模块
+
+使用Jinja2预编译模板渲染课文、词汇、练习和索引文档，支持Markdown和HTML两种输出格式。
+编译后的模板字节码缓存在磁盘上，Markdown转HTML的结果按内容哈希缓存。
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import markdown
+from markdown.extensions import Extension
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined
+
+from ..utils.config import config
+
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates"
+OUTPUT_FORMATS = ("markdown", "html")
+FORMAT_SUFFIXES = {"markdown": ".md", "html": ".html"}
+MARKDOWN_EXTENSIONS = ["tables", "fenced_code", "nl2br"]
+
+
+@lru_cache(maxsize=1)
+def template_digest() -> str:
+    """
+    所有模板源文件的哈希 (进程内只计算一次，与 auto_reload=False 的模板环境一致)
+
+    计入文档的输入哈希，修改任何模板后增量构建会重新生成已有文档。
+    """
+    digest = hashlib.sha256()
+    for path in sorted(TEMPLATE_DIR.glob("*.j2")):
+        digest.update(path.name.encode('utf-8') + b"\0" + path.read_bytes() + b"\0")
+    return digest.hexdigest()[:16]
+
+
+class EscapeRawHtml(Extension):
+    """
+    Markdown中的原始HTML按普通文本转义输出
+
+    识别文本中的 & < > 等字符由Markdown在转换时转义一次 (代码块内外一致)，
+    不在模板渲染时预先转义，否则代码块中的内容会被转义两次。
+    """
+
+    def extendMarkdown(self, md):
+        md.preprocessors.deregister('html_block')
+        md.inlinePatterns.deregister('html')
+        md.inlinePatterns.deregister('entity')
+
+
+class TemplateRenderer:
+    """
+    文档模板渲染器
+
+    模板位于 src/templates/{name}.md.j2，HTML输出先渲染Markdown，
+    再转换为HTML并套用 base.html.j2。
+    生成时间只出现在 base.html.j2 中，相同内容的Markdown转换结果可以跨构建复用。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, html_cache_size: int = 1024):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+        self.env = self._environment("markdown", trim_blocks=True, lstrip_blocks=True)
+        self._html_env = self._environment("html", autoescape=True, undefined=StrictUndefined)
+
+        # 识别文本中的HTML字符由Markdown转换时转义，不会原样进入页面
+        self._markdown = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS + [EscapeRawHtml()])
+        self._markdown_lock = threading.Lock()
+        self._html_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._html_cache_size = html_cache_size
+        self.stats = {'html_hits': 0, 'html_misses': 0}
+
+    def _environment(self, cache_name: str, **options) -> Environment:
+        """
+        创建模板环境
+
+        字节码缓存的键只包含模板名称，不包含环境选项，
+        所以每个环境使用独立的缓存子目录，避免加载到其他转义设置编译出的字节码。
+        """
+        bytecode_cache = None
+        if self.cache_dir:
+            directory = self.cache_dir / cache_name
+            directory.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(directory))
+
+        return Environment(
+            loader=FileSystemLoader(str(TEMPLATE_DIR)),
+            bytecode_cache=bytecode_cache,
+            auto_reload=False,
+            **options
+        )
+
+    def render_markdown(self, name: str, context: Dict[str, Any]) -> str:
+        """
+        渲染Markdown模板
+
+        Args:
+            name: 模板名称 (lesson / vocabulary / exercises / index / index_unit)
+            context: 模板上下文
+
+        Returns:
+            Markdown文本
+        """
+        return self.env.get_template(f"{name}.md.j2").render(context)
+
+    def markdown_to_html(self, md_text: str) -> str:
+        """
+        Markdown转HTML片段，按内容哈希缓存
+
+        Args:
+            md_text: Markdown文本
+
+        Returns:
+            HTML片段
+        """
+        key = hashlib.sha256(md_text.encode('utf-8')).hexdigest()
+
+        with self._markdown_lock:
+            cached = self._html_cache.get(key)
+            if cached is not None:
+                self._html_cache.move_to_end(key)
+                self.stats['html_hits'] += 1
+                return cached
+
+            # markdown.Markdown实例不是线程安全的，转换也放在锁内
+            html = self._markdown.reset().convert(md_text)
+            self._html_cache[key] = html
+            if len(self._html_cache) > self._html_cache_size:
+                self._html_cache.popitem(last=False)
+            self.stats['html_misses'] += 1
+            return html
+
+    def render(self, name: str, context: Dict[str, Any], output_format: str = "markdown",
+               title: str = "") -> str:
+        """
+        按输出格式渲染文档
+
+        Args:
+            name: 模板名称
+            context: 模板上下文
+            output_format: markdown 或 html
+            title: HTML页面标题
+
+        Returns:
+            文档内容
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的文档格式: {output_format} (可选: {', '.join(OUTPUT_FORMATS)})")
+
+        if output_format == "markdown":
+            return self.render_markdown(name, context)
+
+        # 生成时间每次都不同，放在页面外壳中，正文的Markdown只取决于文档内容
+        body = self.markdown_to_html(self.render_markdown(name, {**context, 'generated_at': None}))
+        return self._html_env.get_template("base.html.j2").render(
+            title=title, body=body, generated_at=context.get('generated_at'))
+
+
+_default_renderer: Optional[TemplateRenderer] = None
+_default_renderer_lock = threading.Lock()
+
+
+def get_template_renderer() -> TemplateRenderer:
+    """
+    获取共享的模板渲染器 (字节码缓存位于 paths.cache_dir/templates)
+
+    Returns:
+        模板渲染器实例
+    """
+    global _default_renderer
+    with _default_renderer_lock:
+        if _default_renderer is None:
+            cache_dir = Path(config.get("paths.cache_dir", "./cache")) / "templates"
+            _default_renderer = TemplateRenderer(cache_dir=str(cache_dir))
+        return _default_renderer
+
+
+def output_filename(filename: str, output_format: str) -> str:
+    """将文件名的扩展名替换为输出格式对应的扩展名"""
+    return str(Path(filename).with_suffix(FORMAT_SUFFIXES[output_format]))
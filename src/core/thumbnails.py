@@ -0,0 +1,205 @@
+"""
+缩略图缓存模块
+
+在处理图片时生成一次缩略图，保存在 static/thumbnails 下由Streamlit静态文件服务直接提供，
+结果页面不再为200像素的预览加载图床上的原图。
+磁盘和内存两级缓存都按总大小做LRU淘汰。
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from ..utils.config import config
+from .image_blob import ImageBlob, ImageInput, load_image
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+# Streamlit静态文件服务: 项目根目录下的 static/ 映射到 app/static/
+STATIC_DIR = PROJECT_ROOT / "static"
+STATIC_URL_PREFIX = "app/static"
+THUMBNAIL_SUBDIR = "thumbnails"
+
+
+class ThumbnailCache:
+    """
+    缩略图缓存
+
+    缩略图按原图内容哈希和尺寸命名，同一张图片重复处理时直接复用。
+    磁盘上的文件按最近使用时间 (mtime) 淘汰，内存中保留最近使用的缩略图字节。
+    """
+
+    def __init__(self, directory: Optional[str] = None, size: int = 200,
+                 max_disk_bytes: int = 64 * 1024 * 1024, max_memory_bytes: int = 8 * 1024 * 1024,
+                 quality: int = 80):
+        self.directory = Path(directory) if directory else STATIC_DIR / THUMBNAIL_SUBDIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.size = size
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.quality = quality
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self.stats = {'hits': 0, 'created': 0, 'evicted': 0}
+        self._scan()
+
+    def _scan(self):
+        """按修改时间从旧到新载入磁盘上已有的缩略图"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.jpg'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+
+    def _name(self, blob: ImageBlob) -> str:
+        return f"{blob.digest[:24]}_{self.size}.jpg"
+
+    def create(self, image: ImageInput) -> Optional[str]:
+        """
+        生成缩略图 (已存在时只更新最近使用时间)
+
+        Args:
+            image: 原图 (ImageBlob、字节数据或文件路径)，ImageBlob 复用已计算的内容哈希
+
+        Returns:
+            缩略图文件名，原图无法解码时返回None
+        """
+        blob = load_image(image)
+        name = self._name(blob)
+
+        with self._lock:
+            if name in self._disk and (self.directory / name).exists():
+                self._touch(name)
+                self.stats['hits'] += 1
+                return name
+
+        try:
+            thumbnail = self._render(blob)
+        except Exception as e:
+            print(f"[缩略图] 生成失败: {e}")
+            return None
+
+        path = self.directory / name
+        temp_path = path.with_name(f".{name}.{threading.get_ident()}.tmp")
+        temp_path.write_bytes(thumbnail)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(name, 0)
+            self._disk[name] = len(thumbnail)
+            self._disk_bytes += len(thumbnail)
+            self._remember(name, thumbnail)
+            self.stats['created'] += 1
+            self._evict()
+        return name
+
+    def _render(self, blob: ImageBlob) -> bytes:
+        """缩放为JPEG缩略图"""
+        with blob.open() as img:
+            # JPEG在解码时按1/2、1/4、1/8直接缩小，大图无需完整解码
+            img.draft('RGB', (self.size * 2, self.size * 2))
+            # reducing_gap: 先用reduce()整数倍缩小，再做高质量重采样
+            img.thumbnail((self.size, self.size), Image.LANCZOS, reducing_gap=2.0)
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            buffer = io.BytesIO()
+            img.save(buffer, 'JPEG', quality=self.quality, optimize=True)
+            return buffer.getvalue()
+
+    def _touch(self, name: str):
+        """标记为最近使用 (调用方持有锁)"""
+        self._disk.move_to_end(name)
+        try:
+            os.utime(self.directory / name)
+        except OSError:
+            pass
+
+    def _remember(self, name: str, data: bytes):
+        """加入内存缓存 (调用方持有锁)"""
+        if len(data) > self.max_memory_bytes:
+            return
+        self._memory_bytes -= len(self._memory.pop(name, b""))
+        self._memory[name] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict(self):
+        """删除最久未使用的缩略图，直到磁盘占用不超过上限 (调用方持有锁)"""
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+            name, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._memory_bytes -= len(self._memory.pop(name, b""))
+            try:
+                os.unlink(self.directory / name)
+            except OSError:
+                pass
+            self.stats['evicted'] += 1
+
+    def exists(self, name: Optional[str]) -> bool:
+        """缩略图是否仍在缓存中 (可能已被淘汰)"""
+        if not name:
+            return False
+        with self._lock:
+            if name not in self._disk:
+                return False
+            self._touch(name)
+        return (self.directory / name).exists()
+
+    def read(self, name: str) -> Optional[bytes]:
+        """读取缩略图字节 (优先内存缓存)，不存在时返回None"""
+        with self._lock:
+            data = self._memory.get(name)
+            if data is not None:
+                self._memory.move_to_end(name)
+                return data
+        try:
+            data = (self.directory / name).read_bytes()
+        except OSError:
+            return None
+        with self._lock:
+            self._remember(name, data)
+        return data
+
+    def url(self, name: str) -> str:
+        """静态文件服务URL (相对于应用根路径)"""
+        return f"{STATIC_URL_PREFIX}/{THUMBNAIL_SUBDIR}/{name}"
+
+
+_default_cache: Optional[ThumbnailCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """
+    获取共享的缩略图缓存
+
+    配置项: thumbnails.size / thumbnails.max_disk_mb / thumbnails.max_memory_mb / thumbnails.quality
+
+    Returns:
+        缩略图缓存实例
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ThumbnailCache(
+                size=config.get("thumbnails.size", 200),
+                max_disk_bytes=int(config.get("thumbnails.max_disk_mb", 64) * 1024 * 1024),
+                max_memory_bytes=int(config.get("thumbnails.max_memory_mb", 8) * 1024 * 1024),
+                quality=config.get("thumbnails.quality", 80)
+            )
+        return _default_cache
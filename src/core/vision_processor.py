@@ -8,12 +8,13 @@ AI视觉识别处理模块
 import streamlit as st
 import numpy as np
 from PIL import Image
-import io
 import logging
 from typing import Dict, List, Optional, Tuple, Union
 from pathlib import Path
 
 from .ai_analyzer import ZhipuAIClient
+from .image_blob import ImageBlob, load_image
+from .text_region import crop_to_text
 from ..utils.config import config
 
 
@@ -24,95 +25,93 @@ class VisionProcessor:
         print(f"[VisionProcessor] 初始化GLM-4V-Flash视觉处理器")
         self.ai_client = ZhipuAIClient()
         self.version = "v1.7.0"
+        self.crop_enabled = config.get("page_crop.enabled", True)
         print(f"[VisionProcessor] 版本: {self.version} - 纯AI视觉识别")
     
-    def _prepare_image(self, image_input: Union[str, bytes, Image.Image, np.ndarray]) -> str:
+    def _prepare_image(self, image_input: Union[str, bytes, Image.Image, np.ndarray, ImageBlob]) -> Union[str, ImageBlob]:
         """
-        准备图像数据，保存为临时文件
+        准备图像数据
+        
+        URL (http/https/data URI) 原样返回；本地文件路径读入为 ImageBlob，与内存中的图片一样可以裁剪；
+        字节数据直接包装为 ImageBlob (不重新编码)，PIL图像和numpy数组在内存中编码为JPEG，不写临时文件。
         
         Args:
             image_input: 各种格式的图像输入
             
         Returns:
-            临时图像文件路径
+            URL 或 ImageBlob
+            
+        Raises:
+            OSError: 本地文件读取失败
         """
-        import tempfile
-        import os
-        
         print(f"[VisionProcessor] 准备图像数据，输入类型: {type(image_input)}")
         
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_path = temp_file.name
+        if isinstance(image_input, str) and image_input.startswith(('http://', 'https://', 'data:')):
+            # 已经上传到图床的URL，直接交给识别接口
+            print(f"[VisionProcessor] 使用图片URL: {image_input[:120]}")
+            return image_input
         
         try:
-            if isinstance(image_input, str):
-                # 已经是文件路径
-                print(f"[VisionProcessor] 使用现有文件路径: {image_input}")
-                return image_input
-            
-            elif isinstance(image_input, bytes):
-                # 字节数据
-                print(f"[VisionProcessor] 处理字节数据，大小: {len(image_input)} bytes")
-                image = Image.open(io.BytesIO(image_input))
-                image.save(temp_path, 'JPEG')
-                print(f"[VisionProcessor] 保存临时文件: {temp_path}")
-                return temp_path
-            
-            elif isinstance(image_input, Image.Image):
-                # PIL图像
-                print(f"[VisionProcessor] 处理PIL图像，尺寸: {image_input.size}")
-                image_input.save(temp_path, 'JPEG')
-                print(f"[VisionProcessor] 保存临时文件: {temp_path}")
-                return temp_path
-            
-            elif isinstance(image_input, np.ndarray):
-                # numpy数组
-                print(f"[VisionProcessor] 处理numpy数组，形状: {image_input.shape}")
-                image = Image.fromarray(image_input)
-                image.save(temp_path, 'JPEG')
-                print(f"[VisionProcessor] 保存临时文件: {temp_path}")
-                return temp_path
+            blob = load_image(image_input)
+        except ValueError as e:
+            print(f"[VisionProcessor] 错误: {e}")
+            raise
+        print(f"[VisionProcessor] 图像数据: {blob.size} bytes")
+        return blob
+    
+    def crop_page(self, image_input) -> Tuple[ImageBlob, Optional[List[int]]]:
+        """
+        裁掉页边距、桌面背景和相邻页面，只保留文字区域 (配置项 page_crop.*)
+        
+        Args:
+            image_input: ImageBlob、字节数据、PIL图像或numpy数组
             
-            else:
-                error_msg = f"不支持的图像输入类型: {type(image_input)}"
-                print(f"[VisionProcessor] 错误: {error_msg}")
-                raise ValueError(error_msg)
-                
-        except Exception as e:
-            # 清理临时文件
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-                print(f"[VisionProcessor] 清理临时文件: {temp_path}")
-            print(f"[VisionProcessor] 图像准备失败: {e}")
-            raise e
+        Returns:
+            (裁剪后的图片, 裁剪区域 [左, 上, 右, 下])，未裁剪时裁剪区域为None
+        """
+        blob = load_image(image_input)
+        if not self.crop_enabled:
+            return blob, None
+        try:
+            cropped, crop_box = crop_to_text(
+                blob,
+                padding=config.get("page_crop.padding", 0.02),
+                min_saving=config.get("page_crop.min_saving", 0.15),
+                quality=config.get("page_crop.quality", 90)
+            )
+        except (OSError, ValueError) as e:
+            print(f"[VisionProcessor] 文字区域检测失败，使用原图: {e}")
+            return blob, None
+        if crop_box:
+            print(f"[VisionProcessor] 裁剪到文字区域 {crop_box}: {blob.width}x{blob.height} → "
+                  f"{cropped.width}x{cropped.height}, {blob.size/1024:.0f}KB → {cropped.size/1024:.0f}KB")
+        return cropped, crop_box
     
-    def process_image(self, image_input: Union[str, bytes, Image.Image, np.ndarray], uploaded_file=None) -> Dict:
+    def process_image(self, image_input: Union[str, bytes, Image.Image, np.ndarray, ImageBlob], uploaded_file=None,
+                      crop: bool = True) -> Dict:
         """
         使用GLM-4V-Flash处理图像并进行文字识别
         
         Args:
-            image_input: 图像输入（文件路径、字节数据、PIL图像或numpy数组）
+            image_input: 图像输入（文件路径、URL、ImageBlob、字节数据、PIL图像或numpy数组）
+            crop: 是否先裁剪到文字区域 (URL不裁剪)，调用方已经用 crop_page() 裁剪过时传 False
             
         Returns:
             视觉识别结果字典
         """
-        temp_file = None
-        
         print(f"[VisionProcessor] 开始处理图像")
         
         try:
-            # 准备图像文件
-            image_path = self._prepare_image(image_input)
-            
-            # 如果是临时文件，记录以便清理
-            if not isinstance(image_input, str):
-                temp_file = image_path
+            # 准备图像数据，内存中的图片先裁剪到文字区域
+            image = self._prepare_image(image_input)
+            crop_box = None
+            if crop and isinstance(image, ImageBlob):
+                image, crop_box = self.crop_page(image)
             
             print(f"[VisionProcessor] 调用GLM-4V-Flash进行视觉识别")
             
             # 使用GLM-4V-Flash进行视觉识别，传递uploaded_file参数
-            vision_result = self.ai_client.recognize_image_text(image_path, "英语教材内容", uploaded_file=uploaded_file)
+            vision_result = self.ai_client.recognize_image_text(image, "英语教材内容", uploaded_file=uploaded_file)
             
             print(f"[VisionProcessor] GLM-4V-Flash处理完成，成功: {vision_result['success']}")
             
@@ -125,7 +124,8 @@ class VisionProcessor:
                     'details': vision_result.get('details', []),
                     'method': 'GLM-4V-Flash',
                     'version': self.version,
-                    'vision_model': vision_result.get('vision_model', 'glm-4v-flash')
+                    'vision_model': vision_result.get('vision_model', 'glm-4v-flash'),
+                    'crop_box': crop_box
                 }
                 print(f"[VisionProcessor] 识别成功，文本长度: {len(result['raw_text'])}, 置信度: {result['confidence']}")
                 return result
@@ -136,7 +136,8 @@ class VisionProcessor:
                     'raw_text': '',
                     'confidence': 0.0,
                     'details': [],
-                    'version': self.version
+                    'version': self.version,
+                    'crop_box': crop_box
                 }
                 print(f"[VisionProcessor] 识别失败: {result['error']}")
                 return result
@@ -153,17 +154,6 @@ class VisionProcessor:
                 'details': [],
                 'version': self.version
             }
-        
-        finally:
-            # 清理临时文件
-            if temp_file and temp_file != image_input:
-                try:
-                    import os
-                    if os.path.exists(temp_file):
-                        os.unlink(temp_file)
-                        print(f"[VisionProcessor] 清理临时文件: {temp_file}")
-                except Exception:
-                    pass  # 忽略清理错误
     
     def batch_process(self, image_list: List[Union[str, bytes, Image.Image]], 
                      progress_callback=None) -> List[Dict]:
@@ -0,0 +1,324 @@
+"""
+词汇聚合模块
+
+把所有页面的词汇汇总为 词条 × 页面 的稀疏词频矩阵 (COO格式的NumPy数组，
+安装了SciPy时可转换为CSR矩阵)，词条按规则词形还原后去重，
+在矩阵上向量化计算出现次数、涉及页数、首次出现页面和各单元分布。
+"""
+
+import re
+from array import array
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+
+# 不规则变化 (常见于中小学教材)
+IRREGULAR_FORMS = {
+    'children': 'child', 'men': 'man', 'women': 'woman', 'people': 'person', 'feet': 'foot',
+    'teeth': 'tooth', 'mice': 'mouse', 'geese': 'goose', 'sheep': 'sheep', 'fish': 'fish',
+    'am': 'be', 'is': 'be', 'are': 'be', 'was': 'be', 'were': 'be', 'been': 'be',
+    'has': 'have', 'had': 'have', 'does': 'do', 'did': 'do', 'done': 'do',
+    'went': 'go', 'gone': 'go', 'goes': 'go', 'saw': 'see', 'seen': 'see',
+    'ate': 'eat', 'eaten': 'eat', 'came': 'come', 'took': 'take', 'taken': 'take',
+    'made': 'make', 'got': 'get', 'bought': 'buy', 'brought': 'bring', 'thought': 'think',
+    'taught': 'teach', 'caught': 'catch', 'told': 'tell', 'said': 'say', 'ran': 'run',
+    'swam': 'swim', 'sang': 'sing', 'wrote': 'write', 'written': 'write', 'read': 'read',
+    'knives': 'knife', 'wives': 'wife', 'leaves': 'leaf', 'lives': 'life', 'wolves': 'wolf',
+    'halves': 'half', 'shelves': 'shelf', 'potatoes': 'potato', 'tomatoes': 'tomato', 'heroes': 'hero',
+}
+
+# 以s结尾但不是复数/第三人称单数的词
+S_ENDING_WORDS = {
+    'news', 'yes', 'always', 'series', 'species', 'physics', 'maths', 'politics', 'clothes',
+    'trousers', 'glasses', 'this', 'his', 'its', 'us', 'bus', 'gas', 'plus', 'perhaps', 'christmas',
+}
+
+WORD_PATTERN = re.compile(r"[a-z]+(?:['-][a-z]+)*")
+
+
+def lemmatize(word: str) -> str:
+    """
+    基于规则的英文词形还原
+
+    只处理可以可靠还原的形式: 不规则变化表、名词复数和动词第三人称单数。
+    -ing/-ed 形式规则歧义较大 (morning、evening、red)，保持原样。
+
+    Args:
+        word: 单词
+
+    Returns:
+        词元 (小写)
+    """
+    word = word.lower()
+    if word.endswith("'s"):
+        word = word[:-2]
+    if word in IRREGULAR_FORMS:
+        return IRREGULAR_FORMS[word]
+    if len(word) <= 3 or word in S_ENDING_WORDS or not word.endswith('s'):
+        return word
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('sses', 'xes', 'ches', 'shes', 'zzes')):
+        return word[:-2]
+    if word.endswith(('ss', 'us', 'is')):
+        return word
+    return word[:-1]
+
+
+def vocabulary_key(word: str) -> str:
+    """
+    词条去重键: 小写并逐词词形还原，短语 (如 look after) 保留词序
+
+    Args:
+        word: 单词或短语
+
+    Returns:
+        去重键，无法识别出英文单词时返回空字符串
+    """
+    return " ".join(lemmatize(token) for token in WORD_PATTERN.findall(word.lower()))
+
+
+class TermDocumentMatrix:
+    """
+    词条 × 页面 稀疏词频矩阵
+
+    以COO三元组保存 (rows=词条序号, cols=页面序号, counts=出现次数)，
+    按 (词条, 页面) 排序且无重复。
+    """
+
+    def __init__(self, rows: np.ndarray, cols: np.ndarray, counts: np.ndarray, shape: Tuple[int, int]):
+        self.rows = rows
+        self.cols = cols
+        self.counts = counts
+        self.shape = shape
+
+    @classmethod
+    def from_occurrences(cls, terms: np.ndarray, documents: np.ndarray,
+                         shape: Tuple[int, int]) -> "TermDocumentMatrix":
+        """由每次出现的 (词条, 页面) 序号构建，合并重复项"""
+        linear = terms.astype(np.int64) * max(shape[1], 1) + documents
+        unique, counts = np.unique(linear, return_counts=True)
+        rows, cols = np.divmod(unique, max(shape[1], 1))
+        return cls(rows.astype(np.int32), cols.astype(np.int32), counts.astype(np.int32), shape)
+
+    @property
+    def nnz(self) -> int:
+        return int(self.counts.size)
+
+    def term_frequency(self) -> np.ndarray:
+        """每个词条的总出现次数"""
+        return np.bincount(self.rows, weights=self.counts, minlength=self.shape[0]).astype(np.int64)
+
+    def document_frequency(self) -> np.ndarray:
+        """每个词条出现的页面数"""
+        return np.bincount(self.rows, minlength=self.shape[0])
+
+    def first_document(self) -> np.ndarray:
+        """每个词条首次出现的页面序号 (三元组已按词条、页面排序，取每个词条的第一项)"""
+        starts = np.searchsorted(self.rows, np.arange(self.shape[0]))
+        return self.cols[starts]
+
+    def group_frequency(self, document_groups: np.ndarray, group_count: int) -> np.ndarray:
+        """
+        按页面分组 (例如单元) 汇总的词频
+
+        Args:
+            document_groups: 每个页面所属分组的序号
+            group_count: 分组数量
+
+        Returns:
+            词条 × 分组 的稠密矩阵 (分组数量通常很少)
+        """
+        linear = self.rows.astype(np.int64) * group_count + document_groups[self.cols]
+        totals = np.bincount(linear, weights=self.counts, minlength=self.shape[0] * group_count)
+        return totals.astype(np.int64).reshape(self.shape[0], group_count)
+
+    def to_scipy(self):
+        """转换为SciPy CSR矩阵 (需要安装SciPy)"""
+        if sparse is None:
+            raise ImportError("需要安装scipy才能转换为稀疏矩阵")
+        return sparse.csr_matrix((self.counts, (self.rows, self.cols)), shape=self.shape)
+
+
+class VocabularyAggregator:
+    """
+    跨页面词汇聚合
+
+    按处理顺序调用 add_page() 加入每页的词汇，再调用 vocabulary_data()
+    得到去重后的分级词汇表和统计信息，可直接传给 generate_vocabulary_document / vocabulary_job。
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, int] = {}
+        self._entries: List[Dict[str, Any]] = []
+        self._pages: List[str] = []
+        self._page_units: List[int] = []
+        self._units: Dict[str, int] = {}
+        self._unit_labels: List[Any] = []
+        self._terms = array('i')
+        self._documents = array('i')
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pages)
+
+    @property
+    def term_count(self) -> int:
+        return len(self._entries)
+
+    def add_page(self, filename: str, unit: Any, vocabulary: List[Dict]) -> int:
+        """
+        加入一页的词汇
+
+        Args:
+            filename: 页面文件名 (用于首次出现位置)
+            unit: 页面所属单元
+            vocabulary: 该页的词汇列表 (word / meaning / level / example)
+
+        Returns:
+            页面序号
+        """
+        document = len(self._pages)
+        self._pages.append(filename)
+
+        unit_label = unit if unit not in (None, '') else 'Unknown'
+        unit_index = self._units.setdefault(str(unit_label), len(self._units))
+        if unit_index == len(self._unit_labels):
+            self._unit_labels.append(unit_label)
+        self._page_units.append(unit_index)
+
+        for vocab in vocabulary:
+            if not isinstance(vocab, dict):
+                continue
+            key = vocabulary_key(str(vocab.get('word') or ''))
+            if not key:
+                continue
+
+            term = self._keys.get(key)
+            if term is None:
+                term = self._keys[key] = len(self._entries)
+                self._entries.append({
+                    'word': str(vocab.get('word', '')).strip(),
+                    'meaning': vocab.get('meaning', ''),
+                    'level': 'primary' if vocab.get('level') == 'primary' else 'middle',
+                    'example': vocab.get('example', '')
+                })
+            else:
+                # 优先显示原形，首次出现时缺少的释义和例句用后续页面补全
+                entry = self._entries[term]
+                word = str(vocab.get('word', '')).strip()
+                if word.lower() == key and entry['word'].lower() != key:
+                    entry['word'] = word
+                for field in ('meaning', 'example'):
+                    if not entry[field] and vocab.get(field):
+                        entry[field] = vocab[field]
+
+            self._terms.append(term)
+            self._documents.append(document)
+
+        return document
+
+    def matrix(self) -> TermDocumentMatrix:
+        """词条 × 页面 词频矩阵"""
+        # 复制一份，避免NumPy视图占用array的缓冲区导致之后无法继续追加
+        return TermDocumentMatrix.from_occurrences(
+            np.frombuffer(self._terms, dtype=np.int32).copy(),
+            np.frombuffer(self._documents, dtype=np.int32).copy(),
+            (self.term_count, self.page_count)
+        )
+
+    def vocabulary_data(self, top: int = 10) -> Dict[str, Any]:
+        """
+        去重后的分级词汇表和统计信息
+
+        Args:
+            top: 统计中列出的高频词数量
+
+        Returns:
+            {'primary': [...], 'middle': [...], 'stats': {...}}，
+            每个词条包含 count (出现次数)、pages (涉及页数)、first_page (首次出现页面)
+            和 units (各单元出现次数)
+        """
+        if not self._entries:
+            return {'primary': [], 'middle': [], 'stats': None}
+
+        matrix = self.matrix()
+        term_frequency = matrix.term_frequency()
+        document_frequency = matrix.document_frequency()
+        first_document = matrix.first_document()
+        unit_frequency = matrix.group_frequency(np.asarray(self._page_units, dtype=np.int32), len(self._units))
+
+        vocabulary = {'primary': [], 'middle': []}
+        for term, entry in enumerate(self._entries):
+            unit_counts = unit_frequency[term]
+            vocabulary[entry['level']].append({
+                **entry,
+                'count': int(term_frequency[term]),
+                'pages': int(document_frequency[term]),
+                'first_page': self._pages[first_document[term]],
+                'units': [(self._unit_labels[u], int(unit_counts[u])) for u in np.flatnonzero(unit_counts)]
+            })
+
+        vocabulary['stats'] = self._coverage_stats(
+            term_frequency, first_document, unit_frequency, top
+        )
+        return vocabulary
+
+    def _coverage_stats(self, term_frequency: np.ndarray, first_document: np.ndarray,
+                        unit_frequency: np.ndarray, top: int) -> Dict[str, Any]:
+        """覆盖率统计 (全部在矩阵上向量化计算)"""
+        term_count = self.term_count
+        present = unit_frequency > 0
+        units_per_term = present.sum(axis=1)
+        page_units = np.asarray(self._page_units, dtype=np.int32)
+        first_unit = page_units[first_document]
+
+        # 按页面顺序累计的词汇覆盖率，以及覆盖一半/九成词汇所需的页数
+        new_per_page = np.bincount(first_document, minlength=self.page_count)
+        coverage = np.cumsum(new_per_page) / term_count
+        pages_for = {
+            f"{int(share * 100)}%": int(np.searchsorted(coverage, share - 1e-9) + 1)
+            for share in (0.5, 0.9)
+        }
+
+        units = []
+        for u, label in enumerate(self._unit_labels):
+            units.append({
+                'unit': label,
+                'terms': int(present[:, u].sum()),
+                'occurrences': int(unit_frequency[:, u].sum()),
+                'new_terms': int((first_unit == u).sum()),
+                'exclusive_terms': int((present[:, u] & (units_per_term == 1)).sum())
+            })
+
+        order = np.argsort(-term_frequency, kind='stable')[:top]
+        return {
+            'terms': term_count,
+            'occurrences': int(term_frequency.sum()),
+            'pages': self.page_count,
+            'pages_for_coverage': pages_for,
+            'units': units,
+            'top_terms': [(self._entries[t]['word'], int(term_frequency[t])) for t in order]
+        }
+
+
+def aggregate_vocabulary(pages: List[Tuple[str, Any, List[Dict]]]) -> Dict[str, Any]:
+    """
+    聚合多个页面的词汇
+
+    Args:
+        pages: (文件名, 单元, 词汇列表) 列表
+
+    Returns:
+        VocabularyAggregator.vocabulary_data() 的结果
+    """
+    aggregator = VocabularyAggregator()
+    for filename, unit, vocabulary in pages:
+        aggregator.add_page(filename, unit, vocabulary)
+    return aggregator.vocabulary_data()
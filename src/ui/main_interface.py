@@ -5,18 +5,41 @@
 """
 
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import os
+import html
+import itertools
 import time
-import tempfile
+import uuid
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple, Union
 
 from ..core.vision_processor import create_vision_processor
 from ..core.ai_analyzer import create_ai_enhanced_ocr, test_ai_connection
 from ..core.document_generator import DocumentGenerator
+from ..core.export_archive import StreamingZipExport, read_archive
+from ..core.export_buffer import ExportBuffer
+from ..core.image_blob import MAX_DIMENSION, MAX_FILE_SIZE, ImageBlob
+from ..core.image_hosts import get_image_host
+from ..core.pdf_pages import PDF_SUPPORTED, PDFDocument
+from ..core.folder_scan import FolderManifest
+from ..core.image_gc import start_image_gc
+from ..core.metrics import CACHE_LABELS, STAGE_LABELS, get_metrics, histogram_bar
+from ..core.result_store import PageResult, PageSummary, get_result_store
+from ..core.vocabulary import VocabularyAggregator
+from ..core.thumbnails import get_thumbnail_cache
 from ..utils.config import config
 
 
+# st.fragment (Streamlit 1.37+) 中的交互只重新运行该局部区域，旧版本退化为普通函数 (整页重新运行)
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+# 调试信息中最多列出的失败文件数
+MAX_LISTED_FAILURES = 20
+# 批量处理时性能面板的最小刷新间隔 (秒)
+METRICS_REFRESH_SECONDS = 1.0
+
+
 class EnglishLearningInterface:
     """英语学习助手主界面"""
     
@@ -25,7 +48,9 @@ class EnglishLearningInterface:
         self.vision_processor = None
         self.ai_analyzer = None
         self.doc_generator = None
-        self.processed_results = []  # 存储处理结果
+        self.processed_page_ids = []  # 本会话处理结果的页面ID (内容保存在结果存储中)
+        self._metrics_panel = None  # 侧边栏性能面板的占位区域
+        self._metrics_refreshed = 0.0
         print(f"[EnglishLearningInterface] 初始化界面 {self.version}")
         
     def setup_page_config(self):
@@ -131,12 +156,19 @@ class EnglishLearningInterface:
             
             st.markdown("---")
             
+            # 流水线性能 (批量处理时逐页刷新)
+            st.markdown("### 📈 流水线性能")
+            self._metrics_panel = st.empty()
+            self._render_metrics_panel()
+            
+            st.markdown("---")
+            
             # 关于信息
             with st.expander("ℹ️ 关于", expanded=False):
                 st.markdown(f"""
                 **版本**: {self.version}  
                 **核心技术**: GLM-4V-Flash  
-                **图床**: GitHub  
+                **图床**: {config.get("image_host.backend", "github")}  
                 **功能**: OCR文字识别
                 """)
             
@@ -145,6 +177,66 @@ class EnglishLearningInterface:
                 'max_tokens': 1024
             }
     
+    def _render_metrics_panel(self):
+        """在侧边栏占位区域中显示进程内的流水线指标"""
+        if self._metrics_panel is None:
+            return
+        snapshot = get_metrics().snapshot(st.session_state.get('metrics_batch_id'))
+        stages = {name: stats for name, stats in snapshot['stages'].items() if name in STAGE_LABELS}
+        
+        with self._metrics_panel.container():
+            batch = snapshot.get('batch')
+            if not stages and not batch:
+                st.caption("尚未处理页面")
+                return
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("页/分钟", f"{snapshot['pages_per_minute']:.1f}")
+                st.metric("等待队列", snapshot['queue_depth'])
+            with col2:
+                eta = batch.get('eta_seconds') if batch else None
+                st.metric("预计剩余", "--" if eta is None else f"{int(eta // 60)}:{int(eta % 60):02d}")
+                st.metric("进行中API", snapshot['api_in_flight'])
+            if batch:
+                st.progress(min(1.0, batch['done'] / max(batch['total'], 1)),
+                            text=f"{'当前' if batch['running'] else '上一'}批次 {batch['done']}/{batch['total']} 页"
+                                 + (f"，失败 {batch['failed']} 页" if batch['failed'] else ""))
+            
+            # 限流还是本地处理慢: 429比例高为限流，API耗时占比高为等待API响应
+            counters = snapshot['counters']
+            throttle_rate = snapshot['throttle_rate']
+            api_share = snapshot['api_time_share']
+            if throttle_rate >= 0.05:
+                st.warning(f"⚠️ API限流中: 429比例 {throttle_rate:.0%}")
+            elif stages:
+                bound = "⏳ 主要在等待API响应" if api_share >= 0.5 else "🖥️ 主要在本地处理 (CPU)"
+                st.caption(f"{bound} · API耗时占比 {api_share:.0%}")
+            st.caption(f"最近1分钟 API响应 {snapshot['recent_responses']} 次 · 429 {snapshot['recent_throttled']} 次 "
+                       f"({throttle_rate:.1%}) · 累计错误 {counters.get('api.errors', 0)} 次")
+            
+            hit_rates = snapshot['cache_hit_rates']
+            if hit_rates:
+                st.caption(" · ".join(f"{CACHE_LABELS.get(name, name)} {rate['rate']:.0%} ({rate['hits']}/{rate['total']})"
+                                      for name, rate in hit_rates.items()))
+            
+            if stages:
+                # 分布列: 50ms / 100ms / 250ms / 500ms / 1s / 2.5s / 5s / 10s / 30s / 60s / 更长
+                rows = ["| 阶段 | 次数 | p50 | p95 | 分布 |", "|---|---:|---:|---:|---|"]
+                for name, label in STAGE_LABELS.items():
+                    stats = stages.get(name)
+                    if stats:
+                        rows.append(f"| {label} | {stats['count']} | {stats['p50_ms']:.0f}ms | {stats['p95_ms']:.0f}ms "
+                                    f"| `{histogram_bar(stats['buckets'])}` |")
+                st.markdown("\n".join(rows))
+    
+    def _refresh_metrics_panel(self, force: bool = False):
+        """处理过程中刷新性能面板 (限制刷新频率)"""
+        now = time.time()
+        if force or now - self._metrics_refreshed >= METRICS_REFRESH_SECONDS:
+            self._metrics_refreshed = now
+            self._render_metrics_panel()
+    
     def render_image_upload_section(self, settings: Dict):
         """渲染图像上传区域"""
         st.markdown("### 📷 图像处理")
@@ -158,15 +250,23 @@ class EnglishLearningInterface:
         
         if input_method == "上传图片文件":
             uploaded_files = st.file_uploader(
-                "选择英语教材图片",
-                type=['png', 'jpg', 'jpeg'],
+                "选择英语教材图片" + ("或PDF" if PDF_SUPPORTED else ""),
+                type=['png', 'jpg', 'jpeg'] + (['pdf'] if PDF_SUPPORTED else []),
                 accept_multiple_files=True,
-                help="仅支持JPG、JPEG、PNG格式，每张图片最大5MB，像素不超过6000×6000"
+                help="支持JPG、JPEG、PNG格式，每张图片最大5MB，像素不超过6000×6000"
+                     + ("；PDF逐页渲染后识别" if PDF_SUPPORTED else "")
             )
             
             if uploaded_files:
-                # 简单显示上传的图片，不调用AI
-                return self._display_uploaded_images(uploaded_files)
+                pdf_files = [f for f in uploaded_files if f.name.lower().endswith('.pdf')]
+                image_files = [f for f in uploaded_files if not f.name.lower().endswith('.pdf')]
+                if pdf_files:
+                    pdf_result = self._process_uploaded_pdfs(pdf_files, settings)
+                    if pdf_result:
+                        return pdf_result
+                if image_files:
+                    # 简单显示上传的图片，不调用AI
+                    return self._display_uploaded_images(image_files)
                 
         else:
             folder_path = st.text_input(
@@ -175,12 +275,36 @@ class EnglishLearningInterface:
                 help="输入包含英语教材图片的文件夹完整路径"
             )
             
+            rescan_all = st.checkbox("包括已处理过的图片", value=False,
+                                     help="默认只处理上次扫描后新增或修改的图片")
+            
             if st.button("🔍 扫描文件夹"):
-                if os.path.exists(folder_path):
-                    return self._process_folder(folder_path, settings)
+                if os.path.isdir(folder_path):
+                    self._scan_folder(folder_path, rescan_all)
                 else:
+                    st.session_state.folder_scan = None
                     st.error("文件夹路径不存在，请检查路径是否正确")
+            
+            # 扫描结果保存在会话中，点击"开始批量处理"重新运行页面时仍能取到
+            return self._process_folder(folder_path, settings)
+        
+        return None
+    
+    def _process_uploaded_pdfs(self, pdf_files: List, settings: Dict) -> Optional[Dict]:
+        """显示上传的PDF页数，点击后逐页渲染并批量识别"""
+        total_pages = 0
+        for pdf_file in pdf_files:
+            try:
+                with PDFDocument(pdf_file.getvalue(), name=pdf_file.name) as document:
+                    total_pages += document.page_count
+                    st.write(f"📄 {pdf_file.name}: {document.page_count} 页")
+            except Exception as e:
+                st.error(f"❌ {pdf_file.name}: 无法读取PDF - {e}")
+                return None
         
+        if st.button(f"🚀 开始处理PDF ({total_pages} 页)", type="primary"):
+            documents = [PDFDocument(pdf_file.getvalue(), name=pdf_file.name) for pdf_file in pdf_files]
+            return self._batch_process_images(documents, settings, source='upload')
         return None
     
     def _process_uploaded_files(self, uploaded_files: List, settings: Dict) -> Optional[Dict]:
@@ -206,7 +330,8 @@ class EnglishLearningInterface:
             else:
                 print(f"[处理] 处理器初始化成功")
                 
-            results = []
+            page_ids = []
+            export_buffer = self._get_export_buffer(reset=True)
             progress_bar = st.progress(0)
             status_text = st.empty()
             
@@ -226,7 +351,8 @@ class EnglishLearningInterface:
                     print(f"[第{i+1}步] 🎯 文件类型: {uploaded_file.type}")
                     print(f"[第{i+1}步] 🔄 调用VisionProcessor.process_image()...")
                     
-                    vision_result = self.vision_processor.process_image(uploaded_file.getvalue(), uploaded_file=uploaded_file)
+                    blob = ImageBlob.from_upload(uploaded_file)
+                    vision_result = self.vision_processor.process_image(blob)
                     
                     print(f"[第{i+1}步] ✅ GLM-4V-Flash处理完成")
                     print(f"[第{i+1}步] 🎯 识别成功: {vision_result['success']}")
@@ -255,7 +381,8 @@ class EnglishLearningInterface:
                             st.json(enhanced_result)
                             
                             enhanced_result['filename'] = uploaded_file.name
-                            results.append(enhanced_result)
+                            enhanced_result['crop_box'] = vision_result.get('crop_box')
+                            page_ids.append(self._save_page(enhanced_result, 'upload', export_buffer, image=blob))
                             st.session_state.processed_count += 1
                         except Exception as ai_error:
                             print(f"[处理] AI分析失败: {ai_error}")
@@ -269,7 +396,7 @@ class EnglishLearningInterface:
                                 'analysis': {}
                             }
                             enhanced_result['filename'] = uploaded_file.name
-                            results.append(enhanced_result)
+                            page_ids.append(self._save_page(enhanced_result, 'upload', export_buffer))
                     else:
                         print(f"[处理] 视觉识别失败: {vision_result.get('error', '未知错误')}")
                         st.error(f"视觉识别失败: {vision_result.get('error', '未知错误')}")
@@ -285,134 +412,243 @@ class EnglishLearningInterface:
                 progress_bar.progress((i + 1) / len(uploaded_files))
             
             status_text.text("✅ 处理完成！")
-            return {'results': results, 'source': 'upload'}
+            return {'page_ids': page_ids, 'source': 'upload'}
         
         return None
     
-    def _process_folder(self, folder_path: str, settings: Dict) -> Optional[Dict]:
-        """处理文件夹中的图片"""
+    def _scan_folder(self, folder_path: str, rescan_all: bool = False):
+        """递归扫描文件夹，只保留新增或修改的图片"""
         try:
-            # 扫描图片文件
-            image_extensions = ['.png', '.jpg', '.jpeg', '.bmp', '.tiff']
-            image_files = []
-            
-            for ext in image_extensions:
-                image_files.extend(Path(folder_path).glob(f"*{ext}"))
-                image_files.extend(Path(folder_path).glob(f"*{ext.upper()}"))
-            
-            if not image_files:
-                st.warning("未找到图片文件")
-                return None
-            
-            st.success(f"找到 {len(image_files)} 个图片文件")
-            
-            # 显示文件列表预览
-            with st.expander("📁 文件列表预览"):
-                for file_path in image_files[:10]:  # 只显示前10个
-                    st.text(file_path.name)
-                if len(image_files) > 10:
-                    st.text(f"... 还有 {len(image_files) - 10} 个文件")
-            
-            if st.button("🚀 开始批量处理", type="primary"):
-                return self._batch_process_images(image_files, settings)
-                
+            manifest = FolderManifest(folder_path)
+            if rescan_all:
+                manifest.reset()
+            st.session_state.folder_scan = manifest.scan()
         except Exception as e:
+            st.session_state.folder_scan = None
             st.error(f"扫描文件夹失败: {e}")
+    
+    def _process_folder(self, folder_path: str, settings: Dict) -> Optional[Dict]:
+        """显示扫描结果并批量处理新增或修改的图片"""
+        scan = st.session_state.get('folder_scan')
+        if scan is None or scan.root != os.path.abspath(folder_path):
+            return None
+        
+        image_files = scan.changed
+        if not image_files:
+            st.info(f"没有新增或修改的图片 ({scan.summary()})")
+            return None
+        
+        st.success(f"找到 {len(scan.new)} 个新图片、{len(scan.modified)} 个修改过的图片"
+                   f" (已处理过 {scan.unchanged} 个，扫描耗时 {scan.elapsed:.2f}s)")
+        
+        # 显示文件列表预览
+        with st.expander("📁 文件列表预览"):
+            for file_path in image_files[:10]:  # 只显示前10个
+                st.text(os.path.relpath(file_path, scan.root))
+            if len(image_files) > 10:
+                st.text(f"... 还有 {len(image_files) - 10} 个文件")
+        
+        if st.button("🚀 开始批量处理", type="primary"):
+            manifest = FolderManifest(scan.root)
+            sources = [PDFDocument(path) if path.suffix.lower() == '.pdf' else path for path in image_files]
+            st.session_state.folder_scan = None
+            return self._batch_process_images(sources, settings, manifest=manifest)
         
         return None
     
-    def _batch_process_images(self, image_files: List[Path], settings: Dict) -> Optional[Dict]:
-        """批量处理图片"""
+    def _iter_batch_pages(self, sources: List) -> Iterator[Tuple[str, str, Union[ImageBlob, str]]]:
+        """
+        逐页产生 (页面名称, 来源路径, 图片)
+        
+        图片文件在取到时才读取，PDF在取到该页时才渲染，读取失败的图片文件以路径代替。
+        """
+        for source in sources:
+            if isinstance(source, PDFDocument):
+                with source:
+                    for blob in source.iter_pages():
+                        yield blob.name, source.path or source.name, blob
+                continue
+            try:
+                image = ImageBlob.from_path(source)
+            except OSError as e:
+                print(f"[批量处理] 读取失败: {source.name} - {e}")
+                image = str(source)
+            yield source.name, str(source), image
+    
+    def _batch_process_images(self, sources: List, settings: Dict, source: str = 'folder',
+                              manifest: Optional[FolderManifest] = None) -> Optional[Dict]:
+        """
+        批量处理图片和PDF
+        
+        页面按 processing.batch_size 分批读取 (PDF分批渲染)、裁剪、上传和识别，
+        同时只在内存中保留一批页面。
+        
+        Args:
+            sources: 图片文件路径或 PDFDocument 列表
+            settings: 处理设置
+            source: 结果来源 (folder / upload)
+            manifest: 文件夹清单，文件的所有页面处理成功后记录到清单中
+        """
         if not self._initialize_processors():
             return None
         
-        results = []
+        page_ids = []
+        export_buffer = self._get_export_buffer(reset=True)
         progress_bar = st.progress(0)
         status_text = st.empty()
         
         # 创建处理结果表格
         result_container = st.container()
         
-        for i, image_path in enumerate(image_files):
-            # 详细处理步骤日志
-            status_text.text(f"📁 正在处理文件: {image_path.name} ({i+1}/{len(image_files)})")
+        total = sum(item.page_count if isinstance(item, PDFDocument) else 1 for item in sources)
+        window = max(1, config.get("processing.batch_size", 5))
+        pages = self._iter_batch_pages(sources)
+        metrics = get_metrics()
+        batch_id = st.session_state.metrics_batch_id = metrics.start_batch(total)
+        self._refresh_metrics_panel(force=True)
+        done = 0
+        current_file = None
+        failed_files = set()
+        
+        while True:
+            batch = list(itertools.islice(pages, window))
+            if not batch:
+                break
             
-            try:
-                # 步骤1: GLM-4V-Flash视觉识别
-                status_text.text(f"🔍 步骤1: GLM-4V-Flash视觉识别 - {image_path.name}")
-                print(f"[批量处理] 开始处理文件: {image_path.name}")
-                vision_result = self.vision_processor.process_image(str(image_path), uploaded_file=None)
-                print(f"[批量处理] 视觉识别完成，成功: {vision_result['success']}")
-                
-                # 调试：显示视觉识别结果
+            # 每页只读取一次并裁剪到文字区域，上传、识别和缩略图共用同一份数据
+            images = []
+            crop_boxes = []
+            for name, _, image in batch:
+                crop_box = None
+                if isinstance(image, ImageBlob):
+                    try:
+                        with metrics.timer('crop'):
+                            image, crop_box = self.vision_processor.crop_page(image)
+                    except ValueError as e:
+                        print(f"[批量处理] 裁剪失败: {name} - {e}")
+                images.append(image)
+                crop_boxes.append(crop_box)
+            
+            # 整批上传到图床，上传失败的图片在识别时单独上传
+            status_text.text(f"📤 上传第 {done + 1}-{done + len(batch)} 页到图床 (共 {total} 页)...")
+            with metrics.timer('upload'):
+                image_urls = self._upload_to_image_host(images)
+            
+            for i, (name, filepath, _) in enumerate(batch):
+                # 页面按文件顺序产生，换到下一个文件时上一个文件的所有页面都已处理
+                if filepath != current_file:
+                    if manifest is not None and current_file is not None and current_file not in failed_files:
+                        manifest.mark(current_file)
+                    current_file = filepath
+                done += 1
+                ok = self._process_batch_page(name, filepath, images[i], image_urls[i], crop_boxes[i], source,
+                                              export_buffer, page_ids, result_container, status_text, done, total)
+                if not ok:
+                    failed_files.add(filepath)
+                metrics.page_done(ok, batch_id)
+                progress_bar.progress(done / max(total, 1))
+                self._refresh_metrics_panel()
+            if manifest is not None:
+                manifest.save()
+            # 读取下一批之前释放这一批页面
+            del images, batch
+        
+        if manifest is not None:
+            if current_file is not None and current_file not in failed_files:
+                manifest.mark(current_file)
+            manifest.save()
+        metrics.finish_batch(batch_id)
+        self._refresh_metrics_panel(force=True)
+        status_text.text("✅ 批量处理完成！")
+        return {'page_ids': page_ids, 'source': source}
+    
+    def _process_batch_page(self, name: str, filepath: str, image, image_url: Optional[str],
+                            crop_box: Optional[List[int]], source: str, export_buffer: ExportBuffer,
+                            page_ids: List[str], result_container, status_text, index: int, total: int) -> bool:
+        """识别批量处理中的一页并保存结果，返回是否成功"""
+        # 详细处理步骤日志
+        status_text.text(f"📁 正在处理文件: {name} ({index}/{total})")
+        
+        try:
+            # 步骤1: GLM-4V-Flash视觉识别
+            status_text.text(f"🔍 步骤1: GLM-4V-Flash视觉识别 - {name}")
+            print(f"[批量处理] 开始处理文件: {name}")
+            with get_metrics().timer('vision'):
+                vision_result = self.vision_processor.process_image(image_url or image, uploaded_file=None, crop=False)
+            print(f"[批量处理] 视觉识别完成，成功: {vision_result['success']}")
+            
+            # 调试：显示视觉识别结果 (每页两个JSON块，只在 app.debug 开启时显示)
+            debug = config.get("app.debug", False)
+            if debug:
                 st.write("**调试信息 - GLM-4V-Flash识别结果：**")
                 st.json(vision_result)
+            
+            # 步骤2: AI增强处理
+            if vision_result['success']:
+                status_text.text(f"🤖 步骤2: AI分析和增强 - {name}")
+                st.info(f"识别到的文本长度: {len(vision_result.get('raw_text', ''))}")
+                print(f"[批量处理] 开始AI分析，文本长度: {len(vision_result.get('raw_text', ''))}")
                 
-                # 步骤2: AI增强处理
-                if vision_result['success']:
-                    status_text.text(f"🤖 步骤2: AI分析和增强 - {image_path.name}")
-                    st.info(f"识别到的文本长度: {len(vision_result.get('raw_text', ''))}")
-                    print(f"[批量处理] 开始AI分析，文本长度: {len(vision_result.get('raw_text', ''))}")
-                    time.sleep(0.5)  # 让用户看到处理步骤
-                    
-                    try:
+                try:
+                    with get_metrics().timer('ai'):
                         enhanced_result = self.ai_analyzer.process_image_with_ai(
-                            vision_result, f"英语教材 - {image_path.name}"
+                            vision_result, f"英语教材 - {name}"
                         )
+                    if debug:
                         st.write("**调试信息 - AI增强结果：**")
                         st.json(enhanced_result)
-                    except Exception as ai_error:
-                        print(f"[批量处理] AI分析失败: {ai_error}")
-                        st.error(f"AI处理失败: {ai_error}")
-                        # 创建基本的错误结果
-                        enhanced_result = {
-                            'success': False,
-                            'error': str(ai_error),
-                            'raw_text': vision_result.get('raw_text', ''),
-                            'confidence': vision_result.get('confidence', 0),
-                            'analysis': {}
-                        }
-                else:
-                    print(f"[批量处理] 视觉识别失败: {vision_result.get('error', '未知错误')}")
-                    st.error(f"视觉识别失败: {vision_result.get('error', '未知错误')}")
-                    continue
-                
-                # 步骤3: 整理结果
-                status_text.text(f"📝 步骤3: 整理和分类内容 - {image_path.name}")
-                enhanced_result['filename'] = image_path.name
-                enhanced_result['filepath'] = str(image_path)
-                results.append(enhanced_result)
-                st.session_state.processed_count += 1
-                
-                # 步骤4: 显示完成状态
-                status_text.text(f"✅ 完成处理: {image_path.name}")
-                time.sleep(0.3)
-                
-                # 实时显示处理结果
-                with result_container:
-                    if len(results) == 1:
-                        st.markdown("### 📊 处理结果")
-                    
-                    col1, col2, col3 = st.columns([2, 1, 1])
-                    with col1:
-                        st.text(f"✅ {image_path.name}")
-                    with col2:
-                        st.text(f"置信度: {enhanced_result.get('confidence', 0):.2f}")
-                    with col3:
-                        analysis = enhanced_result.get('analysis', {})
-                        st.text(f"类型: {analysis.get('content_type', '未知')}")
-                
-            except Exception as e:
-                st.error(f"处理 {image_path.name} 失败: {e}")
+                except Exception as ai_error:
+                    print(f"[批量处理] AI分析失败: {ai_error}")
+                    st.error(f"AI处理失败: {ai_error}")
+                    # 创建基本的错误结果
+                    enhanced_result = {
+                        'success': False,
+                        'error': str(ai_error),
+                        'raw_text': vision_result.get('raw_text', ''),
+                        'confidence': vision_result.get('confidence', 0),
+                        'analysis': {}
+                    }
+            else:
+                print(f"[批量处理] 视觉识别失败: {vision_result.get('error', '未知错误')}")
+                st.error(f"视觉识别失败: {vision_result.get('error', '未知错误')}")
+                return False
+            
+            # 步骤3: 整理结果
+            status_text.text(f"📝 步骤3: 整理和分类内容 - {name}")
+            enhanced_result['filename'] = name
+            enhanced_result['filepath'] = filepath
+            enhanced_result['url'] = image_url
+            enhanced_result['crop_box'] = crop_box
+            with get_metrics().timer('save'):
+                page_ids.append(self._save_page(enhanced_result, source, export_buffer, image=image))
+            st.session_state.processed_count += 1
+            
+            # 步骤4: 显示完成状态
+            status_text.text(f"✅ 完成处理: {name}")
+            
+            # 实时显示处理结果
+            with result_container:
+                if len(page_ids) == 1:
+                    st.markdown("### 📊 处理结果")
                 
-            progress_bar.progress((i + 1) / len(image_files))
-        
-        status_text.text("✅ 批量处理完成！")
-        return {'results': results, 'source': 'folder'}
+                col1, col2, col3 = st.columns([2, 1, 1])
+                with col1:
+                    st.text(f"✅ {name}")
+                with col2:
+                    st.text(f"置信度: {enhanced_result.get('confidence', 0):.2f}")
+                with col3:
+                    analysis = enhanced_result.get('analysis', {})
+                    st.text(f"类型: {analysis.get('content_type', '未知')}")
+            return True
+            
+        except Exception as e:
+            st.error(f"处理 {name} 失败: {e}")
+            return False
     
     def _display_uploaded_images(self, uploaded_files: List) -> Dict:
         """准备图片文件并提供AI处理选项"""
         results = []
+        pending = []  # (结果序号, 上传键, 文件) 需要上传的文件
         
         # 现代化简洁显示
         with st.status("📤 正在验证和上传图片...", expanded=True) as status:
@@ -420,8 +656,7 @@ class EnglishLearningInterface:
                 st.write(f"验证 {uploaded_file.name}...")
                 
                 # 验证文件大小 (5MB限制)
-                max_size = 5 * 1024 * 1024  # 5MB
-                if uploaded_file.size > max_size:
+                if uploaded_file.size > MAX_FILE_SIZE:
                     st.error(f"❌ {uploaded_file.name}: 文件过大 ({uploaded_file.size/1024/1024:.1f}MB)，限制5MB")
                     results.append({
                         'filename': uploaded_file.name,
@@ -434,21 +669,19 @@ class EnglishLearningInterface:
                     })
                     continue
                 
-                # 验证图片尺寸
+                # 验证图片尺寸 (只解析文件头，不解码像素)
                 try:
-                    from PIL import Image
-                    img = Image.open(uploaded_file)
-                    width, height = img.size
-                    max_dimension = 6000
+                    blob = ImageBlob.from_upload(uploaded_file)
+                    width, height = blob.width, blob.height
                     
-                    if width > max_dimension or height > max_dimension:
-                        st.error(f"❌ {uploaded_file.name}: 尺寸过大 ({width}×{height})，限制{max_dimension}×{max_dimension}")
+                    if width > MAX_DIMENSION or height > MAX_DIMENSION:
+                        st.error(f"❌ {uploaded_file.name}: 尺寸过大 ({width}×{height})，限制{MAX_DIMENSION}×{MAX_DIMENSION}")
                         results.append({
                             'filename': uploaded_file.name,
                             'size': uploaded_file.size,
                             'type': uploaded_file.type,
                             'url': None,
-                            'error': f'尺寸过大: {width}×{height} (限制{max_dimension}×{max_dimension})',
+                            'error': f'尺寸过大: {width}×{height} (限制{MAX_DIMENSION}×{MAX_DIMENSION})',
                             'displayed': False,
                             'success': False
                         })
@@ -469,10 +702,19 @@ class EnglishLearningInterface:
                     })
                     continue
                 
-                # 上传到GitHub图床
-                st.write(f"上传 {uploaded_file.name} 到GitHub图床...")
-                uploaded_file.seek(0)  # 重置文件指针
-                image_url = self._upload_to_github_and_get_url(uploaded_file)
+                # 同一文件在页面重新运行时复用已上传的URL，其余文件验证完后整批上传
+                if 'uploaded_image_urls' not in st.session_state:
+                    st.session_state.uploaded_image_urls = {}
+                upload_key = getattr(uploaded_file, 'file_id', None) or f"{uploaded_file.name}:{uploaded_file.size}"
+                image_url, crop_box = st.session_state.uploaded_image_urls.get(upload_key, (None, None))
+                if image_url:
+                    st.write(f"♻️ {uploaded_file.name} 已上传，复用图床URL")
+                else:
+                    # 上传前裁剪到文字区域，减少视觉识别处理的像素和字节
+                    if self.vision_processor is None:
+                        self.vision_processor = create_vision_processor()
+                    blob, crop_box = self.vision_processor.crop_page(blob)
+                    pending.append((len(results), upload_key, blob))
                 
                 # 记录结果
                 results.append({
@@ -480,10 +722,23 @@ class EnglishLearningInterface:
                     'size': uploaded_file.size,
                     'type': uploaded_file.type,
                     'url': image_url,
+                    'crop_box': crop_box,
                     'displayed': True,
                     'success': image_url is not None
                 })
             
+            # 整批并发上传到图床 (GitHub图床整批一个提交)
+            if pending:
+                st.write(f"上传 {len(pending)} 张图片到图床...")
+                urls = self._upload_to_image_host([blob for _, _, blob in pending])
+                for (index, upload_key, _), image_url in zip(pending, urls):
+                    results[index]['url'] = image_url
+                    results[index]['success'] = image_url is not None
+                    if image_url:
+                        st.session_state.uploaded_image_urls[upload_key] = (image_url, results[index]['crop_box'])
+                    else:
+                        results[index]['error'] = '图床上传失败'
+            
             status.update(label="✅ 上传完成", state="complete")
         
         # 显示上传结果摘要
@@ -498,7 +753,7 @@ class EnglishLearningInterface:
             st.metric("总大小", f"{total_size//1024} KB")
         
         if successful_uploads == 0:
-            st.error("❌ 没有文件上传成功，请检查网络连接或GitHub配置")
+            st.error("❌ 没有文件上传成功，请检查网络连接或图床配置")
             return None
         
         # 处理按钮
@@ -540,47 +795,14 @@ class EnglishLearningInterface:
     
     # 删除此方法 - 不再使用静态文件保存
     
-    def _upload_to_github_and_get_url(self, uploaded_file) -> Optional[str]:
-        """上传文件到GitHub并获取真实的访问URL"""
+    def _upload_to_image_host(self, images: List) -> List[Optional[str]]:
+        """批量上传图片 (ImageBlob、字节数据或文件路径) 到配置的图床，返回与输入顺序一致的访问URL (失败为None)"""
         try:
-            print(f"[GitHub图床] 开始上传文件到GitHub")
-            
-            # 创建临时文件
-            import tempfile
-            import time
-            import uuid
-            
-            timestamp = int(time.time())
-            file_extension = uploaded_file.name.split('.')[-1] if '.' in uploaded_file.name else 'jpg'
-            unique_id = str(uuid.uuid4())[:8]
-            filename = f"upload_{timestamp}_{unique_id}.{file_extension}"
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as temp_file:
-                temp_file.write(uploaded_file.getvalue())
-                temp_file_path = temp_file.name
-            
-            print(f"[GitHub图床] 临时文件创建: {temp_file_path}")
-            
-            # 使用AI分析器的GitHub上传功能
-            from ..core.ai_analyzer import ZhipuAIClient
-            ai_client = ZhipuAIClient()
-            github_url = ai_client._upload_image_to_github(temp_file_path)
-            
-            # 清理临时文件
-            import os
-            try:
-                os.unlink(temp_file_path)
-                print(f"[GitHub图床] 清理临时文件: {temp_file_path}")
-            except:
-                pass
-            
-            return github_url
-                
+            return get_image_host().upload_many(images)
         except Exception as e:
-            print(f"[GitHub图床] ❌ 上传异常: {e}")
-            import streamlit as st
-            st.error(f"❌ GitHub图床上传异常: {e}")
-            return None
+            print(f"[图床] ❌ 批量上传异常: {e}")
+            st.error(f"❌ 图床上传异常: {e}")
+            return [None] * len(images)
     
     def _process_images_with_ai(self, uploaded_files: List, file_results: List[Dict]) -> Dict:
         """使用AI处理图片"""
@@ -589,7 +811,12 @@ class EnglishLearningInterface:
             st.error("❌ 处理器初始化失败")
             return None
         
-        processed_results = []
+        page_ids = []
+        export_buffer = self._get_export_buffer(reset=True)
+        metrics = get_metrics()
+        batch_id = st.session_state.metrics_batch_id = metrics.start_batch(
+            sum(1 for file_info in file_results if file_info.get('success') and file_info.get('url')))
+        self._refresh_metrics_panel(force=True)
         
         with st.status("🤖 AI识别处理中...", expanded=True) as status:
             for i, (uploaded_file, file_info) in enumerate(zip(uploaded_files, file_results)):
@@ -604,17 +831,20 @@ class EnglishLearningInterface:
                         continue
                     
                     # GLM-4V-Flash视觉识别
-                    vision_result = self.vision_processor.process_image(static_url, uploaded_file=None)
+                    with metrics.timer('vision'):
+                        vision_result = self.vision_processor.process_image(static_url, uploaded_file=None)
                     
                     if vision_result['success']:
                         # AI增强处理
-                        enhanced_result = self.ai_analyzer.process_image_with_ai(
-                            vision_result, f"英语教材 - {uploaded_file.name}"
-                        )
+                        with metrics.timer('ai'):
+                            enhanced_result = self.ai_analyzer.process_image_with_ai(
+                                vision_result, f"英语教材 - {uploaded_file.name}"
+                            )
                         
                         result = {
                             'filename': uploaded_file.name,
                             'static_url': static_url,
+                            'crop_box': file_info.get('crop_box'),
                             'success': True,
                             'vision_result': vision_result,
                             'enhanced_result': enhanced_result
@@ -631,20 +861,27 @@ class EnglishLearningInterface:
                             'error': vision_result.get('error', '识别失败')
                         }
                     
-                    processed_results.append(result)
+                    with metrics.timer('save'):
+                        page_ids.append(self._save_page(result, 'ai_processed', export_buffer,
+                                                        image=ImageBlob.from_upload(uploaded_file)))
+                    metrics.page_done(result['success'], batch_id)
                     
                 except Exception as e:
-                    processed_results.append({
+                    page_ids.append(self._save_page({
                         'filename': uploaded_file.name,
                         'static_url': file_info.get('url'),
                         'success': False,
                         'error': str(e)
-                    })
+                    }, 'ai_processed', export_buffer))
+                    metrics.page_done(False, batch_id)
+                self._refresh_metrics_panel()
             
+            metrics.finish_batch(batch_id)
+            self._refresh_metrics_panel(force=True)
             status.update(label="✅ 处理完成", state="complete")
         
         return {
-            'results': processed_results,
+            'page_ids': page_ids,
             'source': 'ai_processed'
         }
     
@@ -678,10 +915,11 @@ class EnglishLearningInterface:
             print(f"[文件路径] ❌ 获取文件路径失败: {e}")
             return None
     
-    def _cleanup_static_files(self, processed_results: List[Dict]) -> Dict:
+    def _cleanup_static_files(self, page_ids: List[str]) -> Dict:
         """清理处理完成的静态文件（只删除成功处理的文件）"""
+        results = get_result_store().summaries(page_ids)
         cleanup_summary = {
-            'total_files': len(processed_results),
+            'total_files': len(results),
             'deleted_files': 0,
             'skipped_files': 0,
             'failed_deletions': 0,
@@ -690,10 +928,10 @@ class EnglishLearningInterface:
             'failed_list': []
         }
         
-        for result in processed_results:
-            file_path = result.get('file_path')
-            filename = result.get('filename', 'unknown')
-            success = result.get('success', False)
+        for result in results:
+            file_path = result.file_path
+            filename = result.filename or 'unknown'
+            success = result.success
             
             # 只删除成功处理的文件
             if not success:
@@ -761,34 +999,39 @@ class EnglishLearningInterface:
     
     def render_results_section(self, processing_results: Dict):
         """渲染处理结果区域 - 现代化左右分栏布局"""
-        if not processing_results or not processing_results.get('results'):
+        if not processing_results:
             return
         
-        results = processing_results['results']
         source = processing_results.get('source', 'unknown')
         
-        # 存储处理结果到session_state供后续使用（修复导出按钮状态丢失问题）
-        if 'processed_results' not in st.session_state:
-            st.session_state.processed_results = []
-        st.session_state.processed_results = results
-        self.processed_results = results  # 保留实例变量用于兼容
-        
         # 检查是否是纯显示模式（上传但未处理）
         if source == 'upload_display_only':
-            st.info("📋 图片已上传，点击 '🤖 开始AI识别处理' 按钮进行处理")
-            return
+            page_ids = st.session_state.get('processed_page_ids', [])
+            if not page_ids:
+                st.info("📋 图片已上传，点击 '🤖 开始AI识别处理' 按钮进行处理")
+                return
+            # 已有AI识别结果（例如点击导出按钮触发的重新运行），继续显示之前的结果，
+            # 不能用仅上传的结果覆盖，否则导出按钮会在重新运行时消失
+        else:
+            page_ids = processing_results.get('page_ids', [])
+            if not page_ids:
+                return
+            # 会话中只保存页面ID（修复导出按钮状态丢失问题），页面内容保存在结果存储中
+            self._replace_session_pages(page_ids)
+        self.processed_page_ids = page_ids
             
         # restored_from_session类型的结果直接显示，无需特殊处理
         
-        # 显示成功处理的结果
-        successful_results = [r for r in results if r.get('success', False)]
+        # 列表只读取摘要，查看某一页时才读取该页内容
+        results = get_result_store().summaries(page_ids)
+        successful_results = [r for r in results if r.success]
         
-        # 调试：显示所有结果的success状态
-        st.write("🔍 调试信息 - 所有结果的成功状态:")
-        for i, result in enumerate(results):
-            success = result.get('success', False)
-            filename = result.get('filename', f'文件{i+1}')
-            st.write(f"  {i+1}. {filename}: success={success}")
+        # 调试：结果统计 (只列出失败的文件，避免大批量时每次重新运行都输出整个列表)
+        failed = [r.filename for r in results if not r.success]
+        st.write(f"🔍 调试信息 - 共 {len(results)} 个结果，成功 {len(successful_results)} 个，失败 {len(failed)} 个")
+        if failed:
+            more = f" 等{len(failed)}个" if len(failed) > MAX_LISTED_FAILURES else ""
+            st.write(f"  失败文件: {', '.join(failed[:MAX_LISTED_FAILURES])}{more}")
         
         if not successful_results:
             st.error("❌ 没有成功处理的图片")
@@ -805,29 +1048,99 @@ class EnglishLearningInterface:
         with col2:
             # 导出按钮 - 修复状态丢失问题
             if st.button("📄 导出文本", type="primary", use_container_width=True):
-                # 优先使用session_state中的结果，避免状态丢失
-                saved_results = st.session_state.get('processed_results', [])
-                export_results = [r for r in saved_results if r.get('success', False)]
-                if export_results:
-                    self._export_all_text(export_results)
+                if successful_results:
+                    self._export_all_text([r.page_id for r in successful_results])
                 else:
                     st.error("❌ 没有找到已处理的结果，请重新进行AI识别")
         with col3:
             # 统计信息
             st.metric("成功处理", len(successful_results), delta=f"共{len(results)}个")
         
-        # 左右分栏主要内容区域
+        # 左右分栏主要内容区域 (两侧分别是独立的局部区域，切换页面或翻页时只重新运行所在的一侧)
         left_col, right_col = st.columns([3, 2])
         
         with left_col:
             st.markdown("#### 📝 识别文本内容")
-            self._render_text_content(successful_results)
+            self._render_text_panel(successful_results)
         
         with right_col:
             st.markdown("#### 🖼️ 图片列表")
             self._render_image_thumbnails(successful_results)
+        
+        # 学习文档生成
+        st.markdown("---")
+        self._render_document_generation([r.page_id for r in successful_results])
+    
+    @fragment
+    def _render_text_panel(self, results: List[PageSummary]):
+        """文本区域: 全文搜索和当前页面的识别文本 (搜索结果的"查看"按钮切换同一区域中的页面)"""
+        self._render_search(results)
+        self._render_text_content(results)
+    
+    def _paginate(self, total: int, key: str, page_size: Optional[int] = None) -> range:
+        """
+        渲染翻页控件，返回当前页的条目序号范围
+        
+        Args:
+            total: 条目总数
+            key: 保存当前页码的session_state键
+            page_size: 每页条目数，默认 ui.results_page_size
+        """
+        page_size = page_size or config.get("ui.results_page_size", 10)
+        page_count = max(1, -(-total // page_size))
+        # 结果数量变化后页码可能越界
+        page = min(st.session_state.get(key, 0), page_count - 1)
+        st.session_state[key] = page
+        
+        if page_count > 1:
+            def turn(delta: int):
+                st.session_state[key] = min(max(st.session_state.get(key, 0) + delta, 0), page_count - 1)
+            
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                st.button("◀", key=f"{key}_prev", disabled=page == 0, on_click=turn, args=(-1,),
+                          use_container_width=True)
+            with col2:
+                st.caption(f"第 {page + 1}/{page_count} 页 (共 {total} 项)")
+            with col3:
+                st.button("▶", key=f"{key}_next", disabled=page == page_count - 1, on_click=turn, args=(1,),
+                          use_container_width=True)
+        
+        return range(page * page_size, min((page + 1) * page_size, total))
     
-    def _render_text_content(self, results: List[Dict]):
+    def _render_search(self, results: List[PageSummary]):
+        """搜索所有已识别页面的文本、词汇和语法点，点击结果切换到对应页面"""
+        query = st.text_input(
+            "🔎 搜索识别内容",
+            placeholder="输入单词或句子，查找出现在哪一页",
+            key="page_search"
+        )
+        if not query.strip():
+            return
+        
+        positions = {result.page_id: i for i, result in enumerate(results)}
+        start = time.perf_counter()
+        hits = get_result_store().search(query, list(positions), limit=20)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        if not hits:
+            st.info(f"没有找到包含 \"{query}\" 的页面")
+            return
+        
+        st.caption(f"找到 {len(hits)} 个页面 ({elapsed_ms:.1f} ms)")
+        for hit in hits:
+            index = positions[hit.page_id]
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                st.markdown(f"**{index + 1}. {hit.filename}** — {hit.snippet}")
+            with col2:
+                st.button("查看", key=f"search_hit_{hit.page_id}", on_click=self._select_page, args=(index,))
+    
+    def _select_page(self, index: int):
+        """切换文本区域当前显示的页面 (搜索结果按钮的回调)"""
+        st.session_state.text_selector = index
+    
+    def _render_text_content(self, results: List[PageSummary]):
         """渲染左侧文本内容区域"""
         if not results:
             st.info("暂无文本内容")
@@ -838,34 +1151,32 @@ class EnglishLearningInterface:
             selected_index = st.selectbox(
                 "选择文件:",
                 range(len(results)),
-                format_func=lambda x: f"{x+1}. {results[x].get('filename', f'文件{x+1}')}",
+                format_func=lambda x: f"{x+1}. {results[x].filename or f'文件{x+1}'}",
                 key="text_selector"
             )
         else:
             selected_index = 0
         
-        result = results[selected_index]
+        # 只读取当前查看的一页
+        page = get_result_store().get(results[selected_index].page_id)
+        if page is None:
+            st.warning("⚠️ 结果已过期，请重新进行AI识别")
+            return
         
         # 显示文件信息
-        filename = result.get('filename', '未知文件')
-        st.markdown(f"**📄 当前文件**: {filename}")
+        st.markdown(f"**📄 当前文件**: {page.filename or '未知文件'}")
         
         # 获取识别文本 - 优先显示增强结果
-        enhanced_result = result.get('enhanced_result', {})
-        vision_result = result.get('vision_result', {})
-        
-        # 获取文本内容
-        text_content = ""
-        if enhanced_result and enhanced_result.get('corrected_text'):
-            text_content = enhanced_result['corrected_text']
+        if page.corrected_text:
             st.success("✨ AI增强文本")
-        elif vision_result and vision_result.get('raw_text'):
-            text_content = vision_result['raw_text']
+        elif page.raw_text:
             st.info("🔍 原始识别文本")
         else:
             st.warning("⚠️ 暂无文本内容")
             return
         
+        text_content = page.text
+        
         # 显示文本内容
         if text_content:
             # 创建可滚动的文本区域
@@ -886,113 +1197,118 @@ class EnglishLearningInterface:
                 word_count = len(text_content.split()) if text_content else 0
                 st.metric("单词数", word_count)
             with col3:
-                confidence = enhanced_result.get('confidence') or vision_result.get('confidence', 0)
-                st.metric("置信度", f"{confidence:.1%}")
+                st.metric("置信度", f"{page.confidence:.1%}")
     
-    def _render_image_thumbnails(self, results: List[Dict]):
-        """渲染右侧图片缩略图列表"""
+    @fragment
+    def _render_image_thumbnails(self, results: List[PageSummary]):
+        """渲染右侧图片缩略图列表 (分页，只渲染当前页的卡片)"""
         if not results:
             st.info("暂无图片")
             return
         
-        # 创建滚动容器
-        for i, result in enumerate(results):
-            filename = result.get('filename', f'文件{i+1}')
+        for i in self._paginate(len(results), "thumbnail_page"):
+            result = results[i]
+            filename = result.filename or f'文件{i+1}'
             
             # 创建图片卡片
             with st.container():
                 st.markdown(f"**{i+1}. {filename}**")
                 
                 # 显示处理状态
-                success = result.get('success', False)
-                if success:
+                if result.success:
                     st.success("✅ 处理成功", icon="✅")
                 else:
-                    error_msg = result.get('error', '未知错误')
-                    st.error(f"❌ 处理失败: {error_msg}", icon="❌")
+                    st.error(f"❌ 处理失败: {result.error or '未知错误'}", icon="❌")
                 
-                # 如果有GitHub URL，显示缩略图
-                github_url = result.get('static_url') or result.get('url')
-                if github_url and success:
+                # 优先显示本地缩略图，缩略图已被淘汰时才加载图床上的原图
+                if result.success:
                     try:
-                        st.image(github_url, width=200, caption=filename)
+                        self._render_thumbnail(result, filename)
                     except Exception as e:
                         st.error(f"图片加载失败: {e}")
                 
-                # 显示基本信息
-                if 'size' in result:
-                    st.caption(f"大小: {result['size']:,} bytes")
-                
                 st.markdown("---")
     
-    def _export_all_text(self, results: List[Dict]):
-        """导出所有识别文本为一个文档"""
-        if not results:
+    def _render_thumbnail(self, result: PageSummary, filename: str):
+        """显示一页的缩略图"""
+        cache = get_thumbnail_cache()
+        if cache.exists(result.thumbnail):
+            if st.get_option("server.enableStaticServing"):
+                # 通过静态文件服务提供，浏览器直接缓存，不经过WebSocket传输图片数据
+                st.markdown(
+                    f'<img src="{cache.url(result.thumbnail)}" width="{cache.size}" '
+                    f'alt="{html.escape(filename)}" loading="lazy">',
+                    unsafe_allow_html=True
+                )
+                st.caption(filename)
+            else:
+                st.image(cache.read(result.thumbnail), width=cache.size, caption=filename)
+        elif result.image_url:
+            st.image(result.image_url, width=200, caption=filename)
+    
+    def _save_page(self, result: Dict, source: str, export_buffer: ExportBuffer, image=None) -> str:
+        """
+        将一页处理结果转换为统一结构保存到结果存储，成功的页面同时追加到导出缓冲
+        
+        image为原图 (ImageBlob、字节数据或文件路径) 时同时生成缩略图，结果页面不再加载原图
+        """
+        if image is not None:
+            try:
+                result['thumbnail'] = get_thumbnail_cache().create(image)
+            except Exception as e:
+                print(f"[缩略图] {result.get('filename', '')} 生成失败: {e}")
+        page = PageResult.from_processing(result, source)
+        get_result_store().put(page)
+        if page.success:
+            export_buffer.append_page(page)
+        return page.page_id
+    
+    def _replace_session_pages(self, page_ids: List[str]):
+        """记录本会话的结果页面ID，并删除上一轮处理中不再引用的页面"""
+        previous = st.session_state.get('processed_page_ids', [])
+        current = set(page_ids)
+        stale = [page_id for page_id in previous if page_id not in current]
+        if stale:
+            get_result_store().delete(stale)
+        st.session_state.processed_page_ids = page_ids
+    
+    def _get_export_buffer(self, reset: bool = False) -> ExportBuffer:
+        """会话的导出缓冲，开始新一轮处理时清空"""
+        buffer = st.session_state.get('export_buffer')
+        if buffer is None:
+            buffer = st.session_state.export_buffer = ExportBuffer()
+        elif reset:
+            buffer.clear()
+        return buffer
+    
+    def _lazy_download_button(self, load, **button_args):
+        """下载按钮，内容在点击时才生成 (旧版本Streamlit不支持时立即生成)"""
+        try:
+            st.download_button(data=load, **button_args)
+        except StreamlitAPIException:
+            st.download_button(data=load(), **button_args)
+    
+    def _export_all_text(self, page_ids: List[str]):
+        """导出所有识别文本为一个文档 (内容在处理过程中已逐页追加到导出缓冲)"""
+        if not page_ids:
             st.warning("没有可导出的内容")
             return
         
-        # 调试：显示结果结构
-        st.write("🔍 调试信息 - 结果数据结构:")
-        for i, result in enumerate(results):
-            with st.expander(f"文件 {i+1}: {result.get('filename', 'Unknown')}"):
-                st.json(result)
-        
-        # 收集所有文本
-        all_text = []
-        export_time = time.strftime("%Y-%m-%d %H:%M:%S")
-        
-        all_text.append(f"# 英语学习助手 - 文本识别结果")
-        all_text.append(f"**导出时间**: {export_time}")
-        all_text.append(f"**导出版本**: {self.version}")
-        all_text.append(f"**成功处理**: {len(results)} 个文件")
-        all_text.append("")
-        
-        for i, result in enumerate(results):
-            filename = result.get('filename', f'文件{i+1}')
-            all_text.append(f"## {i+1}. {filename}")
-            
-            # 获取文本内容 - 改进逻辑，支持多种数据结构
-            enhanced_result = result.get('enhanced_result', {})
-            vision_result = result.get('vision_result', {})
-            
-            text_content = "无文本内容"
-            confidence = 0
-            source_info = "识别失败"
-            
-            # 尝试从不同位置获取文本
-            if enhanced_result and enhanced_result.get('corrected_text'):
-                text_content = enhanced_result['corrected_text']
-                confidence = enhanced_result.get('confidence', 0)
-                source_info = f"AI增强识别 (置信度: {confidence:.1%})"
-            elif enhanced_result and enhanced_result.get('raw_ocr'):
-                text_content = enhanced_result['raw_ocr']
-                confidence = enhanced_result.get('confidence', 0)
-                source_info = f"AI处理原文 (置信度: {confidence:.1%})"
-            elif vision_result and vision_result.get('raw_text'):
-                text_content = vision_result['raw_text']
-                confidence = vision_result.get('confidence', 0)
-                source_info = f"原始识别 (置信度: {confidence:.1%})"
-            elif result.get('raw_text'):  # 直接在结果中
-                text_content = result['raw_text']
-                confidence = result.get('confidence', 0)
-                source_info = f"直接文本 (置信度: {confidence:.1%})"
-            
-            all_text.append(f"**文本来源**: {source_info}")
-            all_text.append("")
-            all_text.append("### 识别文本:")
-            all_text.append(text_content)
-            all_text.append("")
-            all_text.append("---")
-            all_text.append("")
-        
-        # 生成下载内容
-        export_content = "\n".join(all_text)
+        buffer = st.session_state.get('export_buffer')
+        if buffer is None or buffer.page_count != len(page_ids):
+            # 结果不是在本会话的处理过程中产生的 (例如会话恢复)，从结果存储重建一次缓冲
+            if buffer is not None:
+                buffer.delete()
+            buffer = st.session_state.export_buffer = ExportBuffer.from_pages(
+                get_result_store().iter_pages(page_ids)
+            )
+        
         filename = f"english_learning_export_{int(time.time())}.md"
         
         # 提供下载
-        st.download_button(
+        self._lazy_download_button(
+            lambda: buffer.export_bytes(self.version),
             label="💾 下载文本文件",
-            data=export_content,
             file_name=filename,
             mime="text/markdown",
             type="primary",
@@ -1000,23 +1316,25 @@ class EnglishLearningInterface:
         )
         
         st.success(f"✅ 已准备下载文件: {filename}")
-        st.info(f"📊 导出统计: {len(results)} 个文件, 总计 {len(export_content)} 个字符")
+        st.info(f"📊 导出统计: {buffer.page_count} 个文件, 总计 {buffer.export_size() / 1024:.1f} KB")
     
-    def _render_overview_mode(self, results: List[Dict]):
-        """渲染概览模式"""
-        for i, result in enumerate(results):
-            with st.expander(f"📄 {result.get('filename', f'文件{i+1}')}"):
+    @fragment
+    def _render_overview_mode(self, results: List[PageSummary]):
+        """渲染概览模式 (分页，只读取当前页的内容)"""
+        visible = [results[i].page_id for i in self._paginate(len(results), "overview_page")]
+        for i, page in enumerate(get_result_store().iter_pages(visible)):
+            with st.expander(f"📄 {page.filename or f'文件{i+1}'}"):
                 col1, col2 = st.columns([2, 1])
                 
                 with col1:
                     st.markdown("**识别文本预览：**")
-                    text = result.get('corrected_text', '')
+                    text = page.corrected_text
                     preview = text[:200] + "..." if len(text) > 200 else text
-                    st.text_area("", preview, height=100, disabled=True)
+                    st.text_area("", preview, height=100, disabled=True, key=f"overview_{page.page_id}")
                 
                 with col2:
                     st.markdown("**分析信息：**")
-                    analysis = result.get('analysis', {})
+                    analysis = page.analysis
                     st.write(f"- 标题: {analysis.get('title', '未知')}")
                     st.write(f"- 类型: {analysis.get('content_type', '未知')}")
                     st.write(f"- 单元: {analysis.get('unit', '未知')}")
@@ -1026,15 +1344,20 @@ class EnglishLearningInterface:
                     st.write(f"- 词汇数: {vocab_count}")
                     st.write(f"- 语法点: {grammar_count}")
     
-    def _render_detailed_mode(self, results: List[Dict]):
-        """渲染详细模式"""
+    @fragment
+    def _render_detailed_mode(self, results: List[PageSummary]):
+        """渲染详细模式 (只读取选中的页面)"""
         selected_file = st.selectbox(
             "选择要查看的文件：",
             range(len(results)),
-            format_func=lambda x: results[x].get('filename', f'文件{x+1}')
+            format_func=lambda x: results[x].filename or f'文件{x+1}'
         )
         
-        result = results[selected_file]
+        page = get_result_store().get(results[selected_file].page_id)
+        if page is None:
+            st.warning("⚠️ 结果已过期，请重新进行AI识别")
+            return
+        result = page.to_dict()
         
         # 基本信息
         st.markdown("#### 📊 基本信息")
@@ -1084,8 +1407,9 @@ class EnglishLearningInterface:
                 for point in grammar_points:
                     st.markdown(f"- {point}")
     
-    def _render_document_generation(self, results: List[Dict]):
-        """渲染文档生成模式"""
+    @fragment
+    def _render_document_generation(self, page_ids: List[str]):
+        """渲染文档生成模式 (设置项的修改只重新运行本区域)"""
         st.markdown("#### 📚 文档生成设置")
         
         col1, col2 = st.columns(2)
@@ -1099,7 +1423,7 @@ class EnglishLearningInterface:
         with col2:
             doc_format = st.selectbox(
                 "文档格式",
-                ["markdown", "html", "pdf"],
+                ["markdown", "html"],
                 help="选择生成文档的格式"
             )
         
@@ -1116,121 +1440,144 @@ class EnglishLearningInterface:
             gen_index = st.checkbox("索引目录", value=True)
         
         if st.button("🎯 生成文档", type="primary"):
-            if not self.doc_generator:
-                self.doc_generator = DocumentGenerator()
+            if gen_exercises and not self._initialize_processors():
+                return
             
             try:
                 with st.spinner("正在生成文档..."):
-                    # 组织数据
-                    lessons = []
-                    vocabulary = []
-                    
-                    for result in results:
-                        analysis = result.get('analysis', {})
-                        
-                        # 课文数据
-                        lesson_data = {
-                            'unit': analysis.get('unit'),
-                            'title': analysis.get('title', result.get('filename', '')),
-                            'content_type': analysis.get('content_type'),
-                            'content': result.get('corrected_text', ''),
-                            'vocabulary': analysis.get('vocabulary', []),
-                            'grammar_points': analysis.get('grammar_points', [])
-                        }
-                        lessons.append(lesson_data)
-                        
-                        # 词汇数据
-                        vocab_list = analysis.get('vocabulary', [])
-                        for vocab in vocab_list:
-                            vocab['unit'] = analysis.get('unit')
-                            vocabulary.append(vocab)
-                    
-                    # 生成文档
-                    generated_files = []
-                    
-                    if gen_lessons:
-                        lesson_file = self.doc_generator.generate_lesson_document(
-                            lessons, output_dir, doc_format
-                        )
-                        if lesson_file:
-                            generated_files.append(lesson_file)
-                    
-                    if gen_vocab:
-                        vocab_file = self.doc_generator.generate_vocabulary_document(
-                            vocabulary, output_dir, doc_format
-                        )
-                        if vocab_file:
-                            generated_files.append(vocab_file)
-                    
-                    if gen_exercises:
-                        # 生成练习题需要AI
-                        exercises_data = []
-                        for lesson in lessons:
-                            exercises = self.ai_ocr.analyzer.generate_exercises(
-                                lesson['content'], lesson['vocabulary']
-                            )
-                            exercises_data.append({
-                                'unit': lesson['unit'],
-                                'title': lesson['title'],
-                                'exercises': exercises
-                            })
-                        
-                        exercise_file = self.doc_generator.generate_exercise_document(
-                            exercises_data, output_dir, doc_format
+                    doc_generator = DocumentGenerator(output_dir)
+                    # 文档生成的同时写入ZIP，不需要在下载时再打包整个输出目录
+                    # 每个会话写入自己的目录，多个会话同时生成时不会互相覆盖压缩包
+                    if 'export_session' not in st.session_state:
+                        st.session_state.export_session = uuid.uuid4().hex[:12]
+                    archive_path = (Path(output_dir) / "exports" / st.session_state.export_session
+                                    / "english_learning_documents.zip")
+                    with StreamingZipExport(str(archive_path)) as archive:
+                        documents = self._build_documents(
+                            doc_generator, page_ids, doc_format,
+                            gen_lessons, gen_vocab, gen_exercises, gen_index, archive
                         )
-                        if exercise_file:
-                            generated_files.append(exercise_file)
-                    
-                    if gen_index and generated_files:
-                        index_file = self.doc_generator.generate_index_document(
-                            generated_files, output_dir, doc_format
-                        )
-                        if index_file:
-                            generated_files.append(index_file)
-                    
-                    # 显示结果
-                    st.success(f"✅ 成功生成 {len(generated_files)} 个文档！")
-                    st.session_state.generated_docs += len(generated_files)
-                    
-                    # 添加下载功能
-                    st.markdown("### 📥 下载生成的文档")
-                    
-                    for file_path in generated_files:
-                        if os.path.exists(file_path):
-                            filename = os.path.basename(file_path)
-                            
-                            # 读取文件内容
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                file_content = f.read()
-                            
-                            col1, col2 = st.columns([3, 1])
-                            with col1:
-                                st.markdown(f"📄 **{filename}**")
-                                # 显示文件预览
-                                with st.expander(f"预览 {filename}"):
-                                    if filename.endswith('.md'):
-                                        st.markdown(file_content)
-                                    else:
-                                        st.text(file_content)
-                            
-                            with col2:
-                                # 添加下载按钮
-                                st.download_button(
-                                    label="💾 下载",
-                                    data=file_content,
-                                    file_name=filename,
-                                    mime="text/markdown" if filename.endswith('.md') else "text/plain",
-                                    key=f"download_{filename}"
-                                )
-                        else:
-                            st.warning(f"⚠️ 文件不存在: {file_path}")
+                    st.session_state.generated_archive = str(archive_path)
+                
+                # 会话中只保留文档路径，预览和下载时才从磁盘读取，内存占用不随文档数量增长
+                st.session_state.generated_documents = [
+                    {'relative_path': document.relative_path, 'path': document.path} for document in documents
+                ]
+                written = sum(1 for d in documents if not d.skipped)
+                st.success(f"✅ 成功生成 {len(documents)} 个文档！(更新 {written} 个，未变化 {len(documents) - written} 个)")
+                st.session_state.generated_docs += len(documents)
                 
             except Exception as e:
                 st.error(f"文档生成失败: {e}")
+        
+        documents = st.session_state.get('generated_documents')
+        if documents:
+            # 添加下载功能
+            st.markdown("### 📥 下载生成的文档")
+            self._render_archive_download(st.session_state.get('generated_archive'))
+            
+            st.caption(f"共 {len(documents)} 个文档，也可以单独预览和下载:")
+            for i in self._paginate(len(documents), "generated_documents_page"):
+                self._render_document_item(documents[i])
+    
+    def _render_document_item(self, document: Dict):
+        """单个生成文档: 勾选预览时才读取内容，下载按钮在点击时才读取文件"""
+        path = document['path']
+        filename = os.path.basename(path)
+        if not os.path.exists(path):
+            st.caption(f"📄 {document['relative_path']} (文件已不存在)")
+            return
+        is_markdown = filename.endswith('.md')
+        
+        def read_document() -> str:
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.markdown(f"📄 **{document['relative_path']}** ({os.path.getsize(path) / 1024:.1f} KB)")
+            # 显示文件预览
+            if st.checkbox(f"预览 {filename}", key=f"preview_{document['relative_path']}"):
+                if is_markdown:
+                    st.markdown(read_document())
+                else:
+                    st.text(read_document())
+        
+        with col2:
+            # 添加下载按钮
+            self._lazy_download_button(
+                read_document,
+                label="💾 下载",
+                file_name=filename,
+                mime="text/markdown" if is_markdown else "text/html",
+                key=f"download_{document['relative_path']}"
+            )
+    
+    def _render_archive_download(self, archive_path: Optional[str]):
+        """全部文档的ZIP下载按钮，压缩包在点击时才读取"""
+        if not archive_path or not os.path.exists(archive_path):
+            return
+        
+        size_kb = os.path.getsize(archive_path) / 1024
+        self._lazy_download_button(
+            lambda: read_archive(archive_path),
+            label=f"📦 下载全部文档 (ZIP, {size_kb:.0f} KB)",
+            file_name=os.path.basename(archive_path),
+            mime="application/zip",
+            key="download_all_documents",
+            type="primary"
+        )
+    
+    def _build_documents(self, doc_generator, page_ids: List[str], doc_format: str,
+                         gen_lessons: bool, gen_vocab: bool, gen_exercises: bool, gen_index: bool,
+                         archive: Optional[StreamingZipExport] = None) -> List:
+        """组织识别结果并批量构建文档"""
+        jobs = []
+        index_entries = []
+        vocabulary = VocabularyAggregator()
+        lessons_by_unit = {}
+        
+        for i, page in enumerate(get_result_store().iter_pages(page_ids)):
+            enhanced = page.to_dict()
+            analysis = page.analysis
+            stem = Path(page.filename).stem or f"lesson_{i + 1}"
+            
+            lesson_job = doc_generator.lesson_job(enhanced, f"{stem}.md", doc_format)
+            if gen_lessons:
+                jobs.append(lesson_job)
+            
+            entry = {'analysis': analysis, 'lesson_path': lesson_job.relative_path if gen_lessons else ''}
+            index_entries.append(entry)
+            lessons_by_unit.setdefault(analysis.get('unit') or 1, []).append((enhanced, entry))
+            
+            # 词汇数据 (按词形还原后的词条去重，统计频次和首次出现页面)
+            vocabulary.add_page(page.filename, analysis.get('unit'), analysis.get('vocabulary', []))
+        
+        if gen_exercises:
+            # 生成练习题需要AI，每个单元调用一次
+            for unit, items in lessons_by_unit.items():
+                content = '\n'.join(enhanced.get('corrected_text', '') for enhanced, _ in items)
+                unit_vocabulary = [v for enhanced, _ in items for v in enhanced.get('analysis', {}).get('vocabulary', [])]
+                exercises = self.ai_analyzer.analyzer.generate_exercises(content, unit_vocabulary)
+                
+                exercise_job = doc_generator.exercise_job(exercises, unit, output_format=doc_format)
+                jobs.append(exercise_job)
+                for _, entry in items:
+                    entry['exercise_path'] = exercise_job.relative_path
+        
+        if gen_vocab:
+            jobs.append(doc_generator.vocabulary_job(vocabulary.vocabulary_data(), output_format=doc_format))
+        
+        if gen_index and jobs:
+            jobs.append(doc_generator.index_job(index_entries, doc_format))
+        
+        with get_metrics().timer('documents'):
+            return doc_generator.bulk_build(jobs, archive=archive)
     
     def run(self):
         """运行主界面"""
         self.setup_page_config()
+        start_image_gc()
         self.render_header()
         
         # 渲染侧边栏
@@ -1247,12 +1594,12 @@ class EnglishLearningInterface:
             self.render_results_section(processing_results)
         else:
             # 检查是否有之前保存的处理结果（修复导出按钮问题）
-            saved_results = st.session_state.get('processed_results', [])
-            if saved_results:
-                print(f"[主界面] 发现保存的结果，重新显示: {len(saved_results)}个文件")
+            saved_page_ids = st.session_state.get('processed_page_ids', [])
+            if saved_page_ids:
+                print(f"[主界面] 发现保存的结果，重新显示: {len(saved_page_ids)}个文件")
                 # 重新构造processing_results格式
                 restored_results = {
-                    'results': saved_results,
+                    'page_ids': saved_page_ids,
                     'source': 'restored_from_session'
                 }
                 self.render_results_section(restored_results)
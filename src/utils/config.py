@@ -16,6 +16,7 @@ class Config:
         self.config_path = Path(config_path)
         self._config = self._load_config()
         self._load_secrets()
+        self._load_env_overrides()
     
     def _load_config(self) -> Dict[str, Any]:
         """加载配置文件"""
@@ -55,6 +56,22 @@ class Config:
                 "top_p": 0.8,
                 "max_tokens": 2000,
                 "timeout": 30,
+                "retry_times": 3,
+                "cassette": {
+                    "mode": "off",
+                    "path": "./cassettes",
+                    "timing": "original",
+                    "speed": 0.1
+                }
+            },
+            "github": {
+                "api_url": "https://api.github.com",
+                "owner": "siqi-2025",
+                "repo": "English-girl-learning",
+                "branch": "main",
+                "raw_url": "https://raw.githubusercontent.com",
+                "upload_workers": 8,
+                "timeout": 30,
                 "retry_times": 3
             },
             "processing": {
@@ -63,6 +80,59 @@ class Config:
                 "max_file_size": 10,
                 "supported_formats": ["jpg", "jpeg", "png", "bmp"]
             },
+            "pdf": {
+                "dpi": 150,
+                "quality": 85
+            },
+            "watch": {
+                "workers": 2,
+                "debounce_seconds": 2.0,
+                "poll_interval": 2.0,
+                "use_polling": False,
+                "rebuild_interval": 2.0,
+                "doc_format": "markdown"
+            },
+            "page_crop": {
+                "enabled": True,
+                "padding": 0.02,
+                "min_saving": 0.15,
+                "quality": 90
+            },
+            "image_host": {
+                "backend": "github",
+                "upload_workers": 8,
+                "local": {
+                    "base_url": "",
+                    "host": "127.0.0.1",
+                    "port": 0
+                },
+                "s3": {
+                    "endpoint_url": "",
+                    "bucket": "",
+                    "region": "us-east-1",
+                    "prefix": "temp_images",
+                    "public_base_url": ""
+                }
+            },
+            "image_gc": {
+                "ttl_hours": 24,
+                "delete_processed": False,
+                "processed_min_age_hours": 1,
+                "background": False,
+                "interval_minutes": 360
+            },
+            "results": {
+                "retention_days": 7
+            },
+            "ui": {
+                "results_page_size": 10
+            },
+            "thumbnails": {
+                "size": 200,
+                "max_disk_mb": 64,
+                "max_memory_mb": 8,
+                "quality": 80
+            },
             "paths": {
                 "output_base": "./output",
                 "cache_dir": "./cache",
@@ -100,6 +170,23 @@ class Config:
         else:
             st.warning("⚠️ 未找到AI API密钥 (ENGLISH_LEARNING_ZHIPU_API_KEY)，部分功能可能无法使用")
     
+    def _load_env_overrides(self):
+        """加载环境变量覆盖 (用于指向本地模拟服务等场景)"""
+        overrides = {
+            "ENGLISH_LEARNING_AI_BASE_URL": "ai.base_url",
+            "ENGLISH_LEARNING_GITHUB_API_URL": "github.api_url",
+            "ENGLISH_LEARNING_GITHUB_RAW_URL": "github.raw_url",
+            "ENGLISH_LEARNING_IMAGE_HOST": "image_host.backend",
+            "ENGLISH_LEARNING_CASSETTE_MODE": "ai.cassette.mode",
+            "ENGLISH_LEARNING_CASSETTE_PATH": "ai.cassette.path",
+            "ENGLISH_LEARNING_CASSETTE_TIMING": "ai.cassette.timing",
+        }
+        for env_name, key_path in overrides.items():
+            value = os.getenv(env_name)
+            if value:
+                self.set(key_path, value)
+                print(f"DEBUG - Config override: {key_path} <- {env_name}")
+    
     def get(self, key_path: str, default: Any = None) -> Any:
         """
         获取配置值
@@ -122,6 +209,24 @@ class Config:
                 
         return value
     
+    def set(self, key_path: str, value: Any):
+        """
+        设置配置值 (仅修改内存中的配置)
+        
+        Args:
+            key_path: 配置路径，如 'ai.base_url'
+            value: 配置值
+        """
+        keys = key_path.split('.')
+        node = self._config
+        
+        for key in keys[:-1]:
+            if not isinstance(node.get(key), dict):
+                node[key] = {}
+            node = node[key]
+            
+        node[keys[-1]] = value
+    
     def has_api_key(self) -> bool:
         """检查是否配置了API密钥"""
         return bool(self.get("ai.api_key"))
@@ -0,0 +1,977 @@
+"""
+本地模拟API服务
+
+离线替代智普AI chat/completions接口 (文本 + 视觉，支持流式/非流式)、
+GitHub Contents API、Git Data API (blob / tree / commit / ref) 和S3兼容对象存储 (PUT/HEAD/GET)，用于在无网络的CI环境中进行确定性的性能基准测试。
+
+使用方式:
+    python -m src.utils.mock_server --port 8765 --vision-latency lognormal:1.5:0.3 --rate-429 0.05
+
+然后设置环境变量让应用指向模拟服务:
+    ENGLISH_LEARNING_AI_BASE_URL=http://127.0.0.1:8765/api/paas/v4/chat/completions
+    ENGLISH_LEARNING_GITHUB_API_URL=http://127.0.0.1:8765
+    ENGLISH_LEARNING_GITHUB_RAW_URL=http://127.0.0.1:8765/raw
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+
+CHAT_COMPLETIONS_PATH = "/api/paas/v4/chat/completions"
+
+# 模拟视觉识别返回的教材文本片段
+_TEXTBOOK_LINES = [
+    "Starter Unit {unit} Hello!",
+    "Section A, 2b",
+    "Ms Gao: Good morning, class.",
+    "Class: Good morning, Ms Gao.",
+    "Peter: Hi, everyone! I'm Peter Brown.",
+    "Emma: Good morning. My name is Emma.",
+    "Fu Xing: Nice to meet you, Emma.",
+    "What's this in English? It's an orange.",
+    "Spell it, please. O-R-A-N-G-E.",
+    "What color is the key? It's yellow.",
+    "This is my friend. Her name is Helen.",
+    "I like apples. She reads books. We sit on chairs.",
+    "Where is my schoolbag? It's under the table.",
+    "Do you have a soccer ball? Yes, I do.",
+]
+
+
+@dataclass
+class LatencyModel:
+    """
+    延迟分布模型
+
+    kind取值:
+        fixed: 固定延迟 mean 秒
+        uniform: [low, high] 均匀分布
+        normal: 均值mean、标准差sigma的正态分布 (截断为非负)
+        lognormal: 中位数mean、对数标准差sigma的对数正态分布
+    """
+    kind: str = "fixed"
+    mean: float = 0.0
+    sigma: float = 0.0
+    low: float = 0.0
+    high: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """
+        解析命令行延迟描述
+
+        Args:
+            spec: 如 'fixed:0.2'、'uniform:0.1:0.5'、'normal:0.8:0.2'、'lognormal:1.5:0.3'
+
+        Returns:
+            延迟模型
+        """
+        parts = spec.split(':')
+        kind = parts[0]
+        values = [float(v) for v in parts[1:]]
+
+        if kind == "fixed":
+            return cls(kind, mean=values[0] if values else 0.0)
+        if kind == "uniform":
+            return cls(kind, low=values[0], high=values[1])
+        if kind in ("normal", "lognormal"):
+            return cls(kind, mean=values[0], sigma=values[1] if len(values) > 1 else 0.0)
+        raise ValueError(f"不支持的延迟分布: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        """按分布采样一次延迟 (秒)"""
+        if self.kind == "uniform":
+            return rng.uniform(self.low, self.high)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(self.mean, self.sigma))
+        if self.kind == "lognormal":
+            if self.mean <= 0:
+                return 0.0
+            return rng.lognormvariate(math.log(self.mean), self.sigma)
+        return max(0.0, self.mean)
+
+
+@dataclass
+class MockServerSettings:
+    """模拟服务配置"""
+    host: str = "127.0.0.1"
+    port: int = 0  # 0 表示自动分配端口
+    seed: int = 42
+    chat_latency: LatencyModel = field(default_factory=LatencyModel)
+    vision_latency: LatencyModel = field(default_factory=LatencyModel)
+    github_latency: LatencyModel = field(default_factory=LatencyModel)
+    s3_latency: LatencyModel = field(default_factory=LatencyModel)
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    image_tokens: int = 1024  # 每张图片计入的prompt token数
+    stream_chunk_chars: int = 16
+    owner: str = "siqi-2025"
+    repo: str = "English-girl-learning"
+    branch: str = "main"
+    s3_bucket: str = "mock-bucket"
+    s3_access_key: str = "mock-access-key"
+    s3_secret_key: str = "mock-secret-key"
+
+
+def _estimate_tokens(text: str) -> int:
+    """粗略估算token数 (约4字符/token，至少1)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _git_blob_sha(data: bytes) -> str:
+    """计算与git一致的blob SHA-1"""
+    header = f"blob {len(data)}\0".encode('utf-8')
+    return hashlib.sha1(header + data).hexdigest()
+
+
+def _object_sha(kind: str, payload: Any) -> str:
+    """为模拟的tree/commit对象生成SHA (内容相同则SHA相同)"""
+    body = json.dumps(payload, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(f"{kind} {len(body)}\0".encode('utf-8') + body).hexdigest()
+
+
+class MockAPIState:
+    """
+    模拟服务的共享状态: 仓库文件、git对象、随机数和统计信息
+
+    files 是分支最新提交的工作区视图。git对象简化为:
+    blobs (sha -> 字节)、trees (sha -> {路径: blob sha}，已展开为完整路径)、
+    commits (sha -> {'tree', 'parents', 'message'})，head 为分支指向的提交。
+    """
+
+    def __init__(self, settings: MockServerSettings):
+        self.settings = settings
+        self.lock = threading.RLock()
+        self.rng = random.Random(settings.seed)
+        self.files: Dict[str, Dict[str, Any]] = {}  # path -> {'data', 'sha', 'created_at'}
+        self.objects: Dict[str, Tuple[bytes, str]] = {}  # S3对象键 -> (数据, Content-Type)
+        self.blobs: Dict[str, bytes] = {}
+        self.trees: Dict[str, Dict[str, str]] = {}
+        self.commits: Dict[str, Dict[str, Any]] = {}
+        self.head = self.create_commit(self.create_tree({}), [], "Initial commit")
+        self.reset_stats()
+
+    # ---- git对象 (调用方持有锁或在初始化阶段调用) ----
+
+    def create_blob(self, data: bytes) -> str:
+        sha = _git_blob_sha(data)
+        self.blobs[sha] = data
+        return sha
+
+    def create_tree(self, entries: Dict[str, str]) -> str:
+        sha = _object_sha('tree', entries)
+        self.trees[sha] = dict(entries)
+        return sha
+
+    def create_commit(self, tree: str, parents: List[str], message: str) -> str:
+        commit = {'tree': tree, 'parents': list(parents), 'message': message}
+        sha = _object_sha('commit', {**commit, 'time': time.time(), 'nonce': len(self.commits)})
+        self.commits[sha] = commit
+        return sha
+
+    def is_ancestor(self, ancestor: str, commit: str) -> bool:
+        """ancestor 是否在 commit 的历史中 (用于判断快进)"""
+        pending = [commit]
+        seen = set()
+        while pending:
+            sha = pending.pop()
+            if sha == ancestor:
+                return True
+            if sha in seen or sha not in self.commits:
+                continue
+            seen.add(sha)
+            pending.extend(self.commits[sha]['parents'])
+        return False
+
+    def move_head(self, commit: str):
+        """移动分支并按新提交的tree刷新工作区视图"""
+        self.head = commit
+        tree = self.trees[self.commits[commit]['tree']]
+        now = time.time()
+        files = {}
+        for path, sha in tree.items():
+            existing = self.files.get(path)
+            created_at = existing['created_at'] if existing and existing['sha'] == sha else now
+            files[path] = {'data': self.blobs[sha], 'sha': sha, 'created_at': created_at}
+        # 原地替换，处理中的Contents请求持有的仍是同一个字典
+        self.files.clear()
+        self.files.update(files)
+
+    def commit_files(self, message: str):
+        """Contents API 修改文件后提交当前工作区 (每次请求一个提交，与GitHub一致)"""
+        for entry in self.files.values():
+            self.blobs.setdefault(entry['sha'], entry['data'])
+        tree = self.create_tree({path: entry['sha'] for path, entry in self.files.items()})
+        self.head = self.create_commit(tree, [self.head], message)
+
+    def reset_stats(self):
+        """清空统计信息"""
+        with self.lock:
+            self.stats = {
+                'requests': {},
+                'status_codes': {},
+                'injected_errors': {'429': 0, '5xx': 0},
+                'tokens': {'prompt': 0, 'completion': 0, 'total': 0},
+                'vision_calls': 0,
+                'chat_calls': 0,
+                'stream_calls': 0,
+                'uploaded_bytes': 0,
+                'simulated_latency_seconds': 0.0,
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取统计信息快照"""
+        with self.lock:
+            snapshot = json.loads(json.dumps(self.stats))
+            snapshot['hosted_files'] = len(self.files)
+            snapshot['s3_objects'] = len(self.objects)
+            snapshot['commits'] = len(self.commits) - 1  # 不含初始提交
+            return snapshot
+
+    def count_request(self, endpoint: str):
+        with self.lock:
+            self.stats['requests'][endpoint] = self.stats['requests'].get(endpoint, 0) + 1
+
+    def count_status(self, status: int):
+        with self.lock:
+            key = str(status)
+            self.stats['status_codes'][key] = self.stats['status_codes'].get(key, 0) + 1
+
+    def sample_latency(self, model: LatencyModel) -> float:
+        with self.lock:
+            delay = model.sample(self.rng)
+            self.stats['simulated_latency_seconds'] += delay
+            return delay
+
+    def draw_fault(self) -> Optional[int]:
+        """
+        按配置的比例抽取注入错误
+
+        Returns:
+            需要注入的HTTP状态码，不注入时返回None
+        """
+        with self.lock:
+            roll = self.rng.random()
+            if roll < self.settings.rate_429:
+                self.stats['injected_errors']['429'] += 1
+                return 429
+            if roll < self.settings.rate_429 + self.settings.rate_5xx:
+                self.stats['injected_errors']['5xx'] += 1
+                return self.rng.choice([500, 502, 503])
+            return None
+
+    def add_usage(self, prompt_tokens: int, completion_tokens: int):
+        with self.lock:
+            self.stats['tokens']['prompt'] += prompt_tokens
+            self.stats['tokens']['completion'] += completion_tokens
+            self.stats['tokens']['total'] += prompt_tokens + completion_tokens
+
+
+class MockResponder:
+    """根据请求内容生成确定性的模型回复"""
+
+    @staticmethod
+    def vision_text(image_url: str) -> str:
+        """根据图片URL生成确定性的“识别文本”"""
+        digest = hashlib.sha256(image_url.encode('utf-8')).digest()
+        unit = digest[0] % 9 + 1
+        line_count = 4 + digest[1] % 8
+        lines = []
+        for i in range(line_count):
+            template = _TEXTBOOK_LINES[digest[2 + i] % len(_TEXTBOOK_LINES)]
+            lines.append(template.format(unit=unit))
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _section(prompt: str, start: str, end: str) -> str:
+        """截取提示词中两个标记之间的文本"""
+        begin = prompt.find(start)
+        if begin < 0:
+            return ""
+        begin += len(start)
+        finish = prompt.find(end, begin)
+        return prompt[begin:finish if finish >= 0 else None].strip()
+
+    @staticmethod
+    def _words(text: str, limit: int) -> List[str]:
+        """提取去重后的英文单词"""
+        seen = []
+        for word in re.findall(r"[A-Za-z]{3,}", text):
+            lower = word.lower()
+            if lower not in seen:
+                seen.append(lower)
+            if len(seen) >= limit:
+                break
+        return seen
+
+    @classmethod
+    def chat_text(cls, prompt: str) -> str:
+        """根据AIAnalyzer的提示词类型返回对应格式的JSON"""
+        if '"corrected_text"' in prompt:
+            raw_text = cls._section(prompt, "OCR原文：", "请执行以下任务")
+            return json.dumps({
+                "corrected_text": raw_text,
+                "confidence": 0.96,
+                "corrections": []
+            }, ensure_ascii=False)
+
+        if '"grammar_points"' in prompt:
+            text = cls._section(prompt, "文本内容：", "请提取以下信息")
+            unit_match = re.search(r"Unit\s+(\d+)", text)
+            words = cls._words(text, 8)
+            return json.dumps({
+                "unit": int(unit_match.group(1)) if unit_match else 1,
+                "title": text.split('\n')[0][:40] if text else "Mock Lesson",
+                "content_type": "dialog" if ':' in text else "reading",
+                "main_content": f"模拟分析: 共{len(text.split())}个单词",
+                "vocabulary": [
+                    {
+                        "word": word,
+                        "meaning": f"{word}的释义",
+                        "level": "primary" if len(word) <= 5 else "middle",
+                        "example": f"This is {word}."
+                    }
+                    for word in words
+                ],
+                "grammar_points": ["一般现在时", "be动词用法"]
+            }, ensure_ascii=False)
+
+        if '"letter_filling"' in prompt:
+            words = cls._words(cls._section(prompt, "词汇列表：", "请生成"), 5)
+            return json.dumps({
+                "translation": [{"question": f"{w}的释义", "answer": w, "type": "zh_to_en"} for w in words],
+                "letter_filling": [{"question": w[0] + "_" + w[2:], "answer": w} for w in words],
+                "phrase_filling": [{"question": f"I have ___ {w}.", "answer": "a"} for w in words[:3]],
+                "dictation": [{"chinese": "早上好，同学们。", "english": "Good morning, class."}]
+            }, ensure_ascii=False)
+
+        if '"primary": [' in prompt:
+            words = [w.strip() for w in cls._section(prompt, "单词列表：", "对每个单词").split(',') if w.strip()]
+            result = {"primary": [], "middle": []}
+            for word in words:
+                level = "primary" if len(word) <= 5 else "middle"
+                result[level].append({"word": word, "meaning": f"{word}的释义", "example": f"I see {word}."})
+            return json.dumps(result, ensure_ascii=False)
+
+        return "OK"
+
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    """模拟API请求处理器"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "MockZhipuGitHub/1.0"
+
+    @property
+    def state(self) -> MockAPIState:
+        return self.server.state
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def log_message(self, format, *args):
+        """静默默认的访问日志"""
+        pass
+
+    # ---- 通用工具 ----
+
+    def _read_body(self) -> bytes:
+        """读取请求体 (每个请求只读取一次)"""
+        if self._body_read:
+            return b""
+        self._body_read = True
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _read_json(self) -> Dict[str, Any]:
+        data = self._read_body()
+        if not data:
+            return {}
+        return json.loads(data.decode('utf-8'))
+
+    def _drain_body(self):
+        """
+        响应前读掉未读取的请求体
+
+        keep-alive连接上提前返回 (注入的429/5xx、鉴权失败等) 时，未读取的请求体
+        会被当作下一个请求解析
+        """
+        self._read_body()
+
+    def _send_json(self, status: int, payload: Any, head_only: bool = False):
+        self._drain_body()
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.state.count_status(status)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def _send_bytes(self, status: int, data: bytes, content_type: str, head_only: bool = False,
+                    headers: Optional[Dict[str, str]] = None):
+        self._drain_body()
+        self.state.count_status(status)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(data)
+
+    def _inject(self, endpoint: str, latency: LatencyModel) -> bool:
+        """
+        模拟网络延迟并按比例注入错误
+
+        Returns:
+            是否已经返回了注入的错误响应
+        """
+        self.state.count_request(endpoint)
+        time.sleep(self.state.sample_latency(latency))
+
+        status = self.state.draw_fault()
+        if status is None:
+            return False
+
+        message = "请求过于频繁 (模拟限流)" if status == 429 else "服务暂不可用 (模拟故障)"
+        self._send_json(status, {"error": {"code": str(status), "message": message}})
+        return True
+
+    def _split_path(self) -> Tuple[str, List[str]]:
+        path = unquote(urlparse(self.path).path)
+        return path, [p for p in path.split('/') if p]
+
+    # ---- 路由 ----
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_HEAD(self):
+        self._route('HEAD')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def do_PUT(self):
+        self._route('PUT')
+
+    def do_DELETE(self):
+        self._route('DELETE')
+
+    def do_PATCH(self):
+        self._route('PATCH')
+
+    def _route(self, method: str):
+        self._body_read = False
+        path, parts = self._split_path()
+
+        try:
+            if path.rstrip('/') == CHAT_COMPLETIONS_PATH and method == 'POST':
+                return self._handle_chat()
+
+            if parts[:1] == ['raw'] and method in ('GET', 'HEAD'):
+                return self._handle_raw(parts[1:], head_only=(method == 'HEAD'))
+
+            if parts[:1] == ['repos'] and len(parts) >= 4 and parts[3] == 'contents':
+                return self._handle_contents(method, '/'.join(parts[4:]))
+
+            if parts[:1] == ['repos'] and len(parts) >= 5 and parts[3] == 'git':
+                return self._handle_git(method, parts[4], parts[5:])
+
+            if parts[:1] == [self.state.settings.s3_bucket] and len(parts) > 1:
+                return self._handle_s3(method, '/'.join(parts[1:]))
+
+            if path == '/mock/stats' and method == 'GET':
+                return self._send_json(200, self.state.snapshot())
+
+            if path == '/mock/reset' and method == 'POST':
+                self.state.reset_stats()
+                return self._send_json(200, {"reset": True})
+
+            self._send_json(404, {"message": "Not Found"}, head_only=(method == 'HEAD'))
+
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"message": f"Bad Request: {e}"})
+
+    # ---- 智普AI ----
+
+    def _handle_chat(self):
+        payload = self._read_json()
+        messages = payload.get('messages', [])
+
+        image_urls = []
+        prompt_parts = []
+        for message in messages:
+            content = message.get('content')
+            if isinstance(content, str):
+                prompt_parts.append(content)
+            elif isinstance(content, list):
+                for part in content:
+                    if part.get('type') == 'text':
+                        prompt_parts.append(part.get('text', ''))
+                    elif part.get('type') == 'image_url':
+                        image_urls.append(part.get('image_url', {}).get('url', ''))
+
+        is_vision = bool(image_urls)
+        latency = self.state.settings.vision_latency if is_vision else self.state.settings.chat_latency
+        if self._inject('vision' if is_vision else 'chat', latency):
+            return
+
+        if is_vision:
+            text = '\n'.join(MockResponder.vision_text(url) for url in image_urls)
+        else:
+            text = MockResponder.chat_text('\n'.join(prompt_parts))
+
+        prompt_tokens = _estimate_tokens('\n'.join(prompt_parts)) + len(image_urls) * self.state.settings.image_tokens
+        completion_tokens = _estimate_tokens(text)
+        self.state.add_usage(prompt_tokens, completion_tokens)
+        with self.state.lock:
+            self.state.stats['vision_calls' if is_vision else 'chat_calls'] += 1
+
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        completion_id = f"mock-{hashlib.md5(text.encode('utf-8')).hexdigest()[:16]}"
+        model = payload.get('model', 'glm-4-flash')
+        created = int(time.time())
+
+        if payload.get('stream'):
+            return self._stream_chat(completion_id, model, created, text, usage)
+
+        self._send_json(200, {
+            "id": completion_id,
+            "request_id": completion_id,
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": text}
+            }],
+            "usage": usage
+        })
+
+    def _stream_chat(self, completion_id: str, model: str, created: int, text: str, usage: Dict):
+        """以SSE格式分块返回 (与官方流式接口一致)"""
+        with self.state.lock:
+            self.state.stats['stream_calls'] += 1
+        self.state.count_status(200)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        step = max(1, self.state.settings.stream_chunk_chars)
+        chunks = [text[i:i + step] for i in range(0, len(text), step)] or [""]
+        for i, piece in enumerate(chunks):
+            is_last = i == len(chunks) - 1
+            event = {
+                "id": completion_id,
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": piece},
+                    "finish_reason": "stop" if is_last else None
+                }]
+            }
+            if is_last:
+                event["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    # ---- GitHub ----
+
+    def _file_metadata(self, path: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        settings = self.state.settings
+        return {
+            "name": path.split('/')[-1],
+            "path": path,
+            "sha": entry['sha'],
+            "size": len(entry['data']),
+            "type": "file",
+            "download_url": f"{self.base_url}/raw/{settings.owner}/{settings.repo}/{settings.branch}/{path}"
+        }
+
+    def _handle_contents(self, method: str, path: str):
+        if self._inject('github_contents', self.state.settings.github_latency):
+            return
+
+        files = self.state.files
+
+        if method in ('GET', 'HEAD'):
+            with self.state.lock:
+                entry = files.get(path)
+                if entry is not None:
+                    payload = self._file_metadata(path, entry)
+                    payload['content'] = base64.b64encode(entry['data']).decode('ascii')
+                    payload['encoding'] = 'base64'
+                else:
+                    prefix = path.rstrip('/') + '/' if path else ''
+                    payload = [
+                        self._file_metadata(p, e) for p, e in sorted(files.items())
+                        if p.startswith(prefix) and '/' not in p[len(prefix):]
+                    ] or None
+            if payload is None:
+                return self._send_json(404, {"message": "Not Found"}, head_only=(method == 'HEAD'))
+            return self._send_json(200, payload, head_only=(method == 'HEAD'))
+
+        if method == 'PUT':
+            body = self._read_json()
+            data = base64.b64decode(body['content'])
+            with self.state.lock:
+                existing = files.get(path)
+                if existing is not None and body.get('sha') != existing['sha']:
+                    conflict = True
+                else:
+                    conflict = False
+                    files[path] = {'data': data, 'sha': _git_blob_sha(data), 'created_at': time.time()}
+                    self.state.stats['uploaded_bytes'] += len(data)
+                    self.state.commit_files(body.get('message', ''))
+                    commit_sha = self.state.head
+            if conflict:
+                return self._send_json(422, {"message": "Invalid request.\n\n\"sha\" wasn't supplied."})
+
+            status = 200 if existing is not None else 201
+            return self._send_json(status, {
+                "content": self._file_metadata(path, files[path]),
+                "commit": {"sha": commit_sha, "message": body.get('message', '')}
+            })
+
+        if method == 'DELETE':
+            body = self._read_json()
+            with self.state.lock:
+                existing = files.get(path)
+                if existing is None:
+                    missing = True
+                elif body.get('sha') != existing['sha']:
+                    return self._send_json(409, {"message": "sha does not match"})
+                else:
+                    missing = False
+                    del files[path]
+                    self.state.commit_files(body.get('message', ''))
+                    commit_sha = self.state.head
+            if missing:
+                return self._send_json(404, {"message": "Not Found"})
+            return self._send_json(200, {"content": None, "commit": {"sha": commit_sha}})
+
+        self._send_json(405, {"message": "Method Not Allowed"})
+
+    def _handle_git(self, method: str, kind: str, rest: List[str]):
+        """
+        模拟 Git Data API
+
+        支持: GET ref/heads/{branch}、PATCH refs/heads/{branch}、
+        POST blobs、POST/GET trees、POST commits、GET commits/{sha}
+        """
+        if self._inject('github_git', self.state.settings.github_latency):
+            return
+
+        state = self.state
+        branch_ref = ['heads', state.settings.branch]
+
+        if kind == 'ref' and method == 'GET' and rest == branch_ref:
+            with state.lock:
+                head = state.head
+            return self._send_json(200, {
+                "ref": f"refs/heads/{state.settings.branch}",
+                "object": {"sha": head, "type": "commit"}
+            })
+
+        if kind == 'refs' and method == 'PATCH' and rest == branch_ref:
+            body = self._read_json()
+            sha = body['sha']
+            with state.lock:
+                if sha not in state.commits:
+                    return self._send_json(422, {"message": "Object does not exist"})
+                if not body.get('force') and not state.is_ancestor(state.head, sha):
+                    return self._send_json(422, {"message": "Update is not a fast forward"})
+                state.move_head(sha)
+            return self._send_json(200, {
+                "ref": f"refs/heads/{state.settings.branch}",
+                "object": {"sha": sha, "type": "commit"}
+            })
+
+        if kind == 'blobs' and method == 'POST' and not rest:
+            body = self._read_json()
+            if body.get('encoding') == 'base64':
+                data = base64.b64decode(body['content'])
+            else:
+                data = body['content'].encode('utf-8')
+            with state.lock:
+                sha = state.create_blob(data)
+                state.stats['uploaded_bytes'] += len(data)
+            return self._send_json(201, {"sha": sha, "size": len(data)})
+
+        if kind == 'trees' and method == 'POST' and not rest:
+            body = self._read_json()
+            with state.lock:
+                base_tree = body.get('base_tree')
+                if base_tree and base_tree not in state.trees:
+                    return self._send_json(422, {"message": "base_tree does not exist"})
+                entries = dict(state.trees[base_tree]) if base_tree else {}
+                for item in body['tree']:
+                    if item.get('sha') is None:
+                        entries.pop(item['path'], None)  # sha为null表示删除
+                    elif item['sha'] not in state.blobs:
+                        return self._send_json(422, {"message": f"Invalid sha for {item['path']}"})
+                    else:
+                        entries[item['path']] = item['sha']
+                sha = state.create_tree(entries)
+            return self._send_json(201, {
+                "sha": sha,
+                "tree": [{"path": p, "mode": "100644", "type": "blob", "sha": s} for p, s in sorted(entries.items())]
+            })
+
+        if kind == 'trees' and method == 'GET' and len(rest) == 1:
+            # 模拟的tree已按完整路径展开，相当于 recursive=1
+            with state.lock:
+                entries = state.trees.get(rest[0])
+                tree = None if entries is None else [
+                    {"path": p, "mode": "100644", "type": "blob", "sha": s, "size": len(state.blobs[s])}
+                    for p, s in sorted(entries.items())
+                ]
+            if tree is None:
+                return self._send_json(404, {"message": "Not Found"})
+            return self._send_json(200, {"sha": rest[0], "tree": tree, "truncated": False})
+
+        if kind == 'commits' and method == 'POST' and not rest:
+            body = self._read_json()
+            with state.lock:
+                if body['tree'] not in state.trees:
+                    return self._send_json(422, {"message": "Tree does not exist"})
+                sha = state.create_commit(body['tree'], body.get('parents', []), body.get('message', ''))
+            return self._send_json(201, {"sha": sha, "tree": {"sha": body['tree']}, "message": body.get('message', '')})
+
+        if kind == 'commits' and method == 'GET' and len(rest) == 1:
+            with state.lock:
+                commit = state.commits.get(rest[0])
+            if commit is None:
+                return self._send_json(404, {"message": "Not Found"})
+            return self._send_json(200, {
+                "sha": rest[0],
+                "tree": {"sha": commit['tree']},
+                "parents": [{"sha": p} for p in commit['parents']],
+                "message": commit['message']
+            })
+
+        self._send_json(404, {"message": "Not Found"}, head_only=(method == 'HEAD'))
+
+    # ---- S3 ----
+
+    def _handle_s3(self, method: str, key: str):
+        """
+        模拟S3兼容对象存储 (路径式地址 /{bucket}/{key})
+
+        写入要求SigV4格式的Authorization头和与请求体一致的 x-amz-content-sha256 (不校验签名本身)，
+        读取允许匿名访问 (相当于公开读取的存储桶)。
+        """
+        if self._inject('s3', self.state.settings.s3_latency):
+            return
+        head_only = method == 'HEAD'
+
+        if method == 'PUT':
+            credential = f"AWS4-HMAC-SHA256 Credential={self.state.settings.s3_access_key}/"
+            if not (self.headers.get('Authorization') or '').startswith(credential):
+                return self._send_bytes(403, b"<Error><Code>AccessDenied</Code></Error>", 'application/xml')
+            data = self._read_body()
+            if self.headers.get('x-amz-content-sha256') != hashlib.sha256(data).hexdigest():
+                return self._send_bytes(400, b"<Error><Code>XAmzContentSHA256Mismatch</Code></Error>",
+                                        'application/xml')
+            with self.state.lock:
+                self.state.objects[key] = (data, self.headers.get('Content-Type') or 'binary/octet-stream')
+                self.state.stats['uploaded_bytes'] += len(data)
+            return self._send_bytes(200, b"", 'application/xml', headers={'ETag': f'"{hashlib.md5(data).hexdigest()}"'})
+
+        if method in ('GET', 'HEAD'):
+            with self.state.lock:
+                stored = self.state.objects.get(key)
+            if stored is None:
+                return self._send_bytes(404, b"<Error><Code>NoSuchKey</Code></Error>", 'application/xml', head_only)
+            data, content_type = stored
+            return self._send_bytes(200, data, content_type, head_only, {'ETag': f'"{hashlib.md5(data).hexdigest()}"'})
+
+        self._send_bytes(405, b"<Error><Code>MethodNotAllowed</Code></Error>", 'application/xml', head_only)
+
+    def _handle_raw(self, parts: List[str], head_only: bool):
+        """模拟 raw.githubusercontent.com 的文件下载 (支持ETag条件请求)"""
+        self.state.count_request('raw')
+        path = '/'.join(parts[3:])  # owner/repo/branch/path
+        with self.state.lock:
+            entry = self.state.files.get(path)
+        if entry is None:
+            return self._send_bytes(404, b"404: Not Found", 'text/plain', head_only)
+
+        etag = f'"{entry["sha"]}"'
+        if self.headers.get('If-None-Match') == etag:
+            return self._send_bytes(304, b"", 'text/plain', head_only, {'ETag': etag})
+        content_type = 'image/png' if path.lower().endswith('.png') else 'image/jpeg'
+        self._send_bytes(200, entry['data'], content_type, head_only, {'ETag': etag})
+
+
+class MockAPIServer:
+    """
+    本地模拟API服务
+
+    在后台线程中运行，可作为上下文管理器使用:
+
+        with MockAPIServer(settings) as server:
+            server.apply_to_config()
+            ...
+            print(server.stats())
+    """
+
+    def __init__(self, settings: Optional[MockServerSettings] = None):
+        self.settings = settings or MockServerSettings()
+        self.state = MockAPIState(self.settings)
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """服务根地址"""
+        if not self._httpd:
+            raise RuntimeError("模拟服务尚未启动")
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def chat_completions_url(self) -> str:
+        """可直接用于 ai.base_url 的地址"""
+        return f"{self.url}{CHAT_COMPLETIONS_PATH}"
+
+    def start(self) -> "MockAPIServer":
+        """启动服务 (后台线程)"""
+        self._httpd = ThreadingHTTPServer((self.settings.host, self.settings.port), MockAPIHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.state = self.state
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-api-server", daemon=True)
+        self._thread.start()
+        print(f"[MockServer] 已启动: {self.url}")
+        return self
+
+    def stop(self):
+        """停止服务"""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            print(f"[MockServer] 已停止")
+        self._httpd = None
+        self._thread = None
+
+    def __enter__(self) -> "MockAPIServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取统计信息 (请求数、状态码、token用量、注入错误数等)"""
+        return self.state.snapshot()
+
+    def reset_stats(self):
+        """清空统计信息"""
+        self.state.reset_stats()
+
+    def environment(self) -> Dict[str, str]:
+        """让应用指向模拟服务所需的环境变量"""
+        return {
+            "ENGLISH_LEARNING_AI_BASE_URL": self.chat_completions_url,
+            "ENGLISH_LEARNING_GITHUB_API_URL": self.url,
+            "ENGLISH_LEARNING_GITHUB_RAW_URL": f"{self.url}/raw",
+            "ENGLISH_LEARNING_ZHIPU_API_KEY": "mock-id.mock-secret",
+            "GITHUB_TOKEN": "mock-github-token",
+            "AWS_ACCESS_KEY_ID": self.settings.s3_access_key,
+            "AWS_SECRET_ACCESS_KEY": self.settings.s3_secret_key,
+        }
+
+    def apply_to_config(self, app_config=None):
+        """
+        将当前进程的配置和环境变量指向模拟服务
+
+        Args:
+            app_config: 配置实例，默认使用全局config
+        """
+        import os
+
+        if app_config is None:
+            from .config import config as app_config
+
+        env = self.environment()
+        os.environ.update(env)
+        app_config.set("ai.base_url", env["ENGLISH_LEARNING_AI_BASE_URL"])
+        app_config.set("github.api_url", env["ENGLISH_LEARNING_GITHUB_API_URL"])
+        app_config.set("github.raw_url", env["ENGLISH_LEARNING_GITHUB_RAW_URL"])
+        app_config.set("github.owner", self.settings.owner)
+        app_config.set("github.repo", self.settings.repo)
+        app_config.set("github.branch", self.settings.branch)
+        app_config.set("image_host.s3.endpoint_url", self.url)
+        app_config.set("image_host.s3.bucket", self.settings.s3_bucket)
+        app_config.set("ai.api_key", env["ENGLISH_LEARNING_ZHIPU_API_KEY"])
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="本地模拟智普AI与GitHub API服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42, help="随机种子，保证延迟和错误注入可复现")
+    parser.add_argument("--chat-latency", default="fixed:0", help="文本接口延迟分布，如 lognormal:0.8:0.3")
+    parser.add_argument("--vision-latency", default="fixed:0", help="视觉接口延迟分布，如 lognormal:1.5:0.3")
+    parser.add_argument("--github-latency", default="fixed:0", help="GitHub接口延迟分布，如 uniform:0.1:0.4")
+    parser.add_argument("--s3-latency", default="fixed:0", help="S3对象存储接口延迟分布")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="注入429限流的比例 (0-1)")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="注入5xx错误的比例 (0-1)")
+    parser.add_argument("--image-tokens", type=int, default=1024, help="每张图片计入的prompt token数")
+    args = parser.parse_args()
+
+    settings = MockServerSettings(
+        host=args.host,
+        port=args.port,
+        seed=args.seed,
+        chat_latency=LatencyModel.parse(args.chat_latency),
+        vision_latency=LatencyModel.parse(args.vision_latency),
+        github_latency=LatencyModel.parse(args.github_latency),
+        s3_latency=LatencyModel.parse(args.s3_latency),
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        image_tokens=args.image_tokens,
+    )
+
+    server = MockAPIServer(settings).start()
+    print("[MockServer] 设置以下环境变量让应用使用模拟服务:")
+    for name, value in server.environment().items():
+        print(f"  {name}={value}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"[MockServer] 统计信息: {json.dumps(server.stats(), ensure_ascii=False)}")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()